@@ -0,0 +1,75 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of :meth:`iqm.cirq_iqm.IQMDevice.decompose_circuit` on deep H+CNOT circuits on IQM Aphrodite,
+comparing the default path, which repacks the decomposed operations using the Circuit constructor,
+with the moment-preserving streaming path (``preserve_moments=True``).
+
+Usage::
+
+    python benchmarks/decompose_circuit.py [--ops N [N ...]]
+"""
+import argparse
+import time
+
+import cirq
+
+from iqm.cirq_iqm import Aphrodite
+
+
+def h_cnot_circuit(device: Aphrodite, num_ops: int) -> cirq.Circuit:
+    """Alternating moments of Hadamards and CNOTs on the edges of the device, with about ``num_ops`` operations."""
+    qubits = device.qubits
+    edges = [tuple(edge) for edge in device.metadata.nx_graph.edges]
+    moments = []
+    count = 0
+    layer = 0
+    while count < num_ops:
+        moments.append(cirq.Moment(cirq.H(q) for q in qubits))
+        used: set[cirq.Qid] = set()
+        cnots = []
+        for a, b in edges[layer % 2 :: 2]:
+            if a not in used and b not in used:
+                used |= {a, b}
+                cnots.append(cirq.CNOT(a, b))
+        moments.append(cirq.Moment(cnots))
+        count += len(qubits) + len(cnots)
+        layer += 1
+    return cirq.Circuit(moments)
+
+
+def main() -> None:
+    """Runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ops', type=int, nargs='+', default=[100_000, 300_000, 1_000_000])
+    args = parser.parse_args()
+
+    device = Aphrodite()
+    for num_ops in args.ops:
+        circuit = h_cnot_circuit(device, num_ops)
+        actual_ops = sum(1 for _ in circuit.all_operations())
+        timings = {}
+        for preserve_moments in (False, True):
+            device.decomposition_cache.clear()
+            start = time.perf_counter()
+            device.decompose_circuit(circuit, preserve_moments=preserve_moments)
+            timings[preserve_moments] = time.perf_counter() - start
+        print(
+            f'{actual_ops:>9} ops: repacking {timings[False]:6.1f} s, streaming {timings[True]:6.1f} s '
+            f'({timings[False] / timings[True]:.2f}x)'
+        )
+
+
+if __name__ == '__main__':
+    main()
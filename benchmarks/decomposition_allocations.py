@@ -0,0 +1,186 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of the memory allocations of :meth:`iqm.cirq_iqm.IQMDevice.operation_decomposer` per operation,
+compared to the isinstance chain it replaced, which created its constant gates on every call.
+
+For each path, reports measured with :mod:`tracemalloc`:
+
+* the memory blocks and bytes allocated per operation and still held by the decompositions (snapshot diff),
+* the peak memory allocated during a single call, averaged over the operations.
+
+Also reports the peak memory of decomposing the operations as a whole circuit using
+:meth:`iqm.cirq_iqm.IQMDevice.decompose_circuit`, in its default mode and with ``preserve_moments=True``,
+compared to repacking the decomposed operations using the :class:`cirq.Circuit` constructor as before.
+
+Usage::
+
+    python benchmarks/decomposition_allocations.py [--ops N]
+"""
+import argparse
+from math import pi as PI
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+import cirq
+from cirq import ops
+
+from iqm.cirq_iqm import Apollo
+
+
+def legacy_operation_decomposer(op: cirq.Operation) -> Optional[list[cirq.Operation]]:
+    """The decomposer used before the rule registry, kept here as the baseline."""
+    # pylint: disable=invalid-name
+    PI_2 = PI / 2
+    CZ = ops.CZPowGate()
+    Lx = ops.rx(PI_2)
+    Lxi = ops.rx(-PI_2)
+    Ly = ops.ry(PI_2)
+    Lyi = ops.ry(-PI_2)
+
+    if isinstance(op.gate, ops.CZPowGate):
+        t = op.gate.exponent
+        s = op.gate.global_shift
+        L = ops.rz(t / 2 * PI)
+        return [
+            ops.ZZPowGate(exponent=-0.5 * t, global_shift=-2 * s - 1).on(*op.qubits),
+            L.on(op.qubits[0]),
+            L.on(op.qubits[1]),
+        ]
+    if isinstance(op.gate, ops.ZZPowGate):
+        t = op.gate.exponent
+        s = op.gate.global_shift
+        return [
+            Lyi.on(op.qubits[1]),
+            CZ.on(*op.qubits),
+            ops.XPowGate(exponent=-t, global_shift=-1 - s).on(op.qubits[1]),
+            CZ.on(*op.qubits),
+            Ly.on(op.qubits[1]),
+        ]
+    if isinstance(op.gate, ops.ISwapPowGate):
+        t = op.gate.exponent
+        s = op.gate.global_shift
+        x = -0.5 * t
+        return [
+            Lxi.on(op.qubits[0]),
+            Lxi.on(op.qubits[1]),
+            Lyi.on(op.qubits[1]),
+            CZ.on(*op.qubits),
+            ops.XPowGate(exponent=x, global_shift=-0.5 - 2 * s).on(op.qubits[0]),
+            ops.XPowGate(exponent=-x, global_shift=-0.5).on(op.qubits[1]),
+            CZ.on(*op.qubits),
+            Ly.on(op.qubits[1]),
+            Lx.on(op.qubits[0]),
+            Lx.on(op.qubits[1]),
+        ]
+    if isinstance(op.gate, ops.ZPowGate):
+        q = op.qubits[0]
+        return [
+            ops.XPowGate(exponent=-0.5).on(q),
+            ops.YPowGate(exponent=op.gate.exponent).on(q),
+            ops.XPowGate(exponent=0.5).on(q),
+        ]
+    return None
+
+
+def operations(num_ops: int) -> list[cirq.Operation]:
+    """Mix of the gates handled by the decomposition rules, with varying exponents, on neighbouring qubits."""
+    qubits = Apollo().qubits
+    gates = [
+        lambda t: ops.ZZPowGate(exponent=t),
+        lambda t: ops.ISwapPowGate(exponent=t),
+        lambda t: ops.CZPowGate(exponent=t),
+        lambda t: ops.ZPowGate(exponent=t),
+    ]
+    result = []
+    for i in range(num_ops):
+        gate = gates[i % len(gates)]((i % 97) / 97)
+        a = qubits[i % (len(qubits) - 1)]
+        b = qubits[i % (len(qubits) - 1) + 1]
+        result.append(gate.on(a) if gate.num_qubits() == 1 else gate.on(a, b))
+    return result
+
+
+def measure(decomposer: Callable[[cirq.Operation], Optional[list[cirq.Operation]]], ops_list) -> None:
+    """Prints the allocations of decomposing the given operations."""
+    num_ops = len(ops_list)
+    decomposer(ops_list[0])  # warm up the caches of the decomposer
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    peak_total = 0
+    results = []
+    for op in ops_list:
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        results.append(decomposer(op))
+        peak_total += tracemalloc.get_traced_memory()[1] - current
+    elapsed = time.perf_counter() - start
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, 'filename')
+    blocks = sum(stat.count_diff for stat in diff)
+    size = sum(stat.size_diff for stat in diff)
+    print(
+        f'  retained: {blocks / num_ops:6.1f} blocks/op {size / num_ops:8.1f} B/op   '
+        f'peak per call: {peak_total / num_ops:8.1f} B/op   time under tracemalloc: {elapsed:.1f} s'
+    )
+    del results
+
+
+def measure_circuit(decompose: Callable[[cirq.Circuit], cirq.Circuit], circuit: cirq.Circuit) -> None:
+    """Prints the peak memory of decomposing the given circuit."""
+    num_ops = sum(len(moment) for moment in circuit)
+    tracemalloc.start()
+    start = time.perf_counter()
+    decomposed = decompose(circuit)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(
+        f'  {len(decomposed)} moments   peak: {peak / num_ops:8.1f} B/op   ' f'time under tracemalloc: {elapsed:.1f} s'
+    )
+
+
+def main() -> None:
+    """Runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ops', type=int, default=100_000)
+    args = parser.parse_args()
+
+    ops_list = operations(args.ops)
+    print(f'{len(ops_list)} operations')
+    print('isinstance chain (before):')
+    measure(legacy_operation_decomposer, ops_list)
+    print('rule registry (after):')
+    measure(Apollo().operation_decomposer, ops_list)
+
+    device = Apollo()
+    circuit = cirq.Circuit(ops_list)
+    device.decompose_circuit(circuit[:1])  # warm up the caches of the decomposer
+    print(f'whole circuit of {len(circuit)} moments:')
+    print('repacking with the cirq.Circuit constructor (before):')
+    measure_circuit(
+        lambda c: cirq.Circuit(ops.transform_op_tree(c.moments, device.decompose_operation, preserve_moments=False)),
+        circuit,
+    )
+    print('decompose_circuit (after):')
+    measure_circuit(device.decompose_circuit, circuit)
+    print('decompose_circuit, preserve_moments=True (after):')
+    measure_circuit(lambda c: device.decompose_circuit(c, preserve_moments=True), circuit)
+
+
+if __name__ == '__main__':
+    main()
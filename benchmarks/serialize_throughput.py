@@ -0,0 +1,69 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Microbenchmark of the serialization throughput of native Cirq circuits, in operations per second.
+
+Usage::
+
+    python benchmarks/serialize_throughput.py [--layers N] [--repeat R]
+"""
+import argparse
+import time
+
+import cirq
+
+from iqm.cirq_iqm import Apollo
+from iqm.cirq_iqm.serialize import serialize_circuit
+
+
+def native_circuit(layers: int) -> cirq.Circuit:
+    """Layers of prx gates and CZs on Apollo, followed by a measurement of every qubit."""
+    device = Apollo()
+    qubits = device.qubits
+    edges = [tuple(edge) for edge in device.metadata.nx_graph.edges]
+    moments = []
+    for layer in range(layers):
+        moments.append(cirq.Moment(cirq.PhasedXPowGate(exponent=0.5, phase_exponent=0.1 * layer).on(q) for q in qubits))
+        used: set[cirq.Qid] = set()
+        czs = []
+        for a, b in edges[layer % 2 :: 2]:
+            if a not in used and b not in used:
+                used |= {a, b}
+                czs.append(cirq.CZ(a, b))
+        moments.append(cirq.Moment(czs))
+    moments.append(cirq.Moment(cirq.measure(q, key=f'm{i}') for i, q in enumerate(qubits)))
+    return cirq.Circuit(moments)
+
+
+def main() -> None:
+    """Runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--layers', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    circuit = native_circuit(args.layers)
+    num_ops = sum(1 for _ in circuit.all_operations())
+    print(f'{num_ops} operations')
+    for validate in (True, False):
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            serialize_circuit(circuit, validate=validate)
+            best = min(best, time.perf_counter() - start)
+        print(f'validate={validate}: {num_ops / best:,.0f} ops/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of :func:`iqm.cirq_iqm.optimizers.simplify_circuit` on deep QAOA and QFT circuits
+decomposed to the native gates of IQM Apollo.
+
+Usage::
+
+    python benchmarks/simplify_circuit.py [--qubits N] [--layers P]
+"""
+import argparse
+import time
+
+import cirq
+import numpy as np
+
+from iqm.cirq_iqm import Apollo
+from iqm.cirq_iqm.optimizers import SimplifyStats, simplify_circuit
+
+
+def qaoa(num_qubits: int, layers: int, seed: int = 0) -> cirq.Circuit:
+    """MaxCut QAOA circuit on a ring with chords."""
+    rng = np.random.default_rng(seed)
+    qubits = cirq.LineQubit.range(num_qubits)
+    edges = [(i, (i + 1) % num_qubits) for i in range(num_qubits)]
+    edges += [(i, (i + 3) % num_qubits) for i in range(0, num_qubits, 2)]
+    circuit = cirq.Circuit(cirq.H.on_each(*qubits))
+    for _ in range(layers):
+        gamma, beta = rng.uniform(0, 1, 2)
+        circuit.append(cirq.ZZPowGate(exponent=gamma)(qubits[i], qubits[j]) for i, j in edges)
+        circuit.append(cirq.rx(beta)(q) for q in qubits)
+    circuit.append(cirq.measure(*qubits, key='m'))
+    return circuit
+
+
+def qft(num_qubits: int) -> cirq.Circuit:
+    """Quantum Fourier transform followed by a measurement."""
+    qubits = cirq.LineQubit.range(num_qubits)
+    circuit = cirq.Circuit(cirq.decompose(cirq.qft(*qubits, without_reverse=True)))
+    circuit.append(cirq.measure(*qubits, key='m'))
+    return circuit
+
+
+def main() -> None:
+    """Runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--qubits', type=int, default=16)
+    parser.add_argument('--layers', type=int, default=20)
+    args = parser.parse_args()
+
+    device = Apollo()
+    for name, circuit in [('QAOA', qaoa(args.qubits, args.layers)), ('QFT', qft(args.qubits))]:
+        native = device.decompose_circuit(circuit)
+        stats = SimplifyStats()
+        start = time.perf_counter()
+        simplified = simplify_circuit(native, stats=stats)
+        elapsed = time.perf_counter() - start
+        num_ops = sum(1 for _ in native.all_operations())
+        num_simplified = sum(1 for _ in simplified.all_operations())
+        print(f'{name}: {num_ops} -> {num_simplified} operations in {elapsed:.2f} s')
+        print(f'  {stats.iterations} rounds, converged: {stats.converged}')
+        for pass_name, wall_time in stats.wall_time_by_pass().items():
+            print(f'  {pass_name}: {wall_time:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -24,7 +24,6 @@ import cirq.linalg
 import numpy as np
 
 from iqm.cirq_iqm import IQMDevice
-from iqm.cirq_iqm.optimizers import simplify_circuit
 
 np.set_printoptions(precision=3)
 
@@ -153,23 +152,12 @@ def demo(device: IQMDevice, circuit: cirq.Circuit, *, use_qsim: bool = False) ->
     print(circuit)
     pause()
 
-    # decompose non-native gates and simplify the circuit
-    circuit_decomposed = device.decompose_circuit(circuit)
-    circuit_simplified = simplify_circuit(circuit_decomposed)  # NOTE: will discard Rz:s before measurements
-    print('\nSimplified circuit:')
-    print(circuit_simplified)
-    pause()
-
-    # map the circuit qubits to device qubits
-    circuit_mapped, initial_mapping, final_mapping = device.route_circuit(circuit_simplified)
-
-    print('\nRouted simplified circuit:')
-    print(circuit_mapped)
-    pause()
-
-    # Decompose any non-native gates which might have been
-    # introduced since the last decomposition.
-    circuit_transformed = device.decompose_circuit(circuit_mapped)
+    # Decompose non-native gates, simplify the circuit, map the circuit qubits to device qubits,
+    # and decompose any non-native gates which might have been introduced by the routing.
+    result = device.compile(circuit)  # NOTE: simplification will discard Rz:s before measurements
+    print(f'\nCompilation stages: {", ".join(result.stages)}')
+    print(f'Initial mapping: {result.initial_mapping}')
+    circuit_transformed = result.circuit
     print('\nFinal transformed circuit:')
     print(circuit_transformed)
     pause()
@@ -192,7 +180,7 @@ def demo(device: IQMDevice, circuit: cirq.Circuit, *, use_qsim: bool = False) ->
     print('\n  Transformed circuit:')
     state_1 = simulate_without_measurements(sim, circuit_transformed)
 
-    # Overlap won't be perfect due to use of simplify_circuit above, which may eliminate Rz gates
+    # Overlap won't be perfect due to the simplification in device.compile, which may eliminate Rz gates
     # overlap = np.abs(np.vdot(state_0, state_1))
     # print('\noverlap = |<original|transformed>| =', overlap)
     # assert np.abs(overlap - 1.0) < 1e-6, 'Circuits are not equivalent!'
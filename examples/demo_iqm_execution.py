@@ -30,7 +30,6 @@ import cirq
 import numpy as np
 
 from iqm.cirq_iqm.iqm_sampler import IQMSampler
-from iqm.cirq_iqm.optimizers import simplify_circuit
 
 
 def fold_func(x: np.ndarray) -> str:
@@ -50,9 +49,8 @@ def demo_run_circuit() -> None:
 
     sampler = IQMSampler(os.environ['IQM_SERVER_URL'])
 
-    circuit_routed, _, _ = sampler.device.route_circuit(circuit)
-    circuit_decomposed = sampler.device.decompose_circuit(circuit_routed)
-    circuit = simplify_circuit(circuit_decomposed)
+    # decompose, simplify and route the circuit for the device
+    circuit = sampler.device.compile(circuit).circuit
     print('\nTranspiled and routed circuit:\n')
     print(circuit)
     print('\n')
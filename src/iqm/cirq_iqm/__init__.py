@@ -26,8 +26,9 @@ except PackageNotFoundError:
 finally:
     del version, PackageNotFoundError
 # pylint: disable=wrong-import-position
+from .compilation import CompilationPipeline, CompilationResult
 from .iqm_gates import *
-from .transpiler import transpile_insert_moves_into_circuit
+from .transpiler import InsertMoves, transpile_insert_moves_into_circuit
 
 warnings.warn(
     DeprecationWarning(
@@ -0,0 +1,239 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Caching of the dynamic quantum architectures fetched from IQM servers."""
+from __future__ import annotations
+
+from importlib.metadata import version
+import hashlib
+import os
+from pathlib import Path
+import pickle
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
+from uuid import UUID
+import warnings
+import weakref
+
+from iqm.cirq_iqm.devices.iqm_device_metadata import IQMDeviceMetadata
+from iqm.iqm_client import DynamicQuantumArchitecture
+
+ArchitectureListener = Callable[[DynamicQuantumArchitecture, DynamicQuantumArchitecture], None]
+"""called with the previous and the new architecture when the calibration set has changed"""
+
+
+class ArchitectureCache:
+    """Caches a dynamic quantum architecture fetched from an IQM server for a limited time.
+
+    The architecture is fetched again when it is requested using :meth:`get` more than ``ttl`` seconds after it was
+    last fetched, or explicitly using :meth:`refresh`. Alternatively, :meth:`start_refreshing` refreshes it
+    periodically in a background thread, in which case :meth:`get` never fetches it.
+
+    Listeners added using :meth:`add_listener` are notified whenever a refresh finds that the calibration set of the
+    architecture has changed, which can happen e.g. when the architecture of the default calibration set of the
+    server is cached.
+
+    Args:
+        fetch: fetches the architecture from the server
+        ttl: time in seconds for which a fetched architecture is used. If ``None``, it is used until refreshed.
+        architecture: Architecture obtained by other means, e.g. loaded from an :class:`ArchitectureStore`.
+            It is used until the first call to :meth:`get`, which fetches the architecture from the server.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], DynamicQuantumArchitecture],
+        ttl: Optional[float] = 60.0,
+        architecture: Optional[DynamicQuantumArchitecture] = None,
+    ):
+        if ttl is not None and ttl < 0:
+            raise ValueError(f'ttl must be non-negative, got {ttl}.')
+        self._fetch = fetch
+        self._ttl = ttl
+        self._architecture = architecture
+        self._fetched_at = -float('inf')
+        self._listeners: list[ArchitectureListener] = []
+        self._lock = threading.Lock()
+        self._stop_refreshing: Optional[threading.Event] = None
+
+    @property
+    def ttl(self) -> Optional[float]:
+        """Time in seconds for which a fetched architecture is used."""
+        return self._ttl
+
+    @property
+    def architecture(self) -> Optional[DynamicQuantumArchitecture]:
+        """Cached architecture, or None if there is none yet. Does not fetch it."""
+        return self._architecture
+
+    def get(self) -> DynamicQuantumArchitecture:
+        """Returns the cached architecture, fetching it first if it has expired."""
+        with self._lock:
+            architecture = self._architecture
+            expired = self._fetched_at == -float('inf') or (
+                self._ttl is not None and time.monotonic() - self._fetched_at >= self._ttl
+            )
+            if architecture is not None and (self._stop_refreshing is not None or not expired):
+                return architecture
+        return self.refresh()
+
+    def refresh(self) -> DynamicQuantumArchitecture:
+        """Fetches the architecture from the server, and notifies the listeners if the calibration set has changed.
+
+        Returns:
+            the fetched architecture
+        """
+        architecture = self._fetch()
+        with self._lock:
+            previous = self._architecture
+            self._architecture = architecture
+            self._fetched_at = time.monotonic()
+            listeners = list(self._listeners)
+        if previous is not None and previous.calibration_set_id != architecture.calibration_set_id:
+            for listener in listeners:
+                listener(previous, architecture)
+        return architecture
+
+    def add_listener(self, listener: ArchitectureListener) -> None:
+        """Calls ``listener`` with the previous and the new architecture whenever the calibration set changes.
+
+        The listeners are called in the thread that refreshed the architecture.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def start_refreshing(self, interval: float) -> None:
+        """Starts refreshing the architecture every ``interval`` seconds in a background thread.
+
+        Failures to fetch the architecture are reported as warnings, and the cached architecture is kept.
+        Does nothing if the architecture is already being refreshed.
+
+        The thread runs until :meth:`stop_refreshing` is called or the cache is garbage collected, since it only
+        holds a weak reference to the cache. A cache that is no longer used thus does not keep polling the server,
+        as long as ``fetch`` and the listeners do not refer to the cache.
+        """
+        if interval <= 0:
+            raise ValueError(f'interval must be positive, got {interval}.')
+        with self._lock:
+            if self._stop_refreshing is not None:
+                return
+            self._stop_refreshing = stop = threading.Event()
+        weakref.finalize(self, stop.set)
+        threading.Thread(
+            target=_refresh_until,
+            args=(weakref.ref(self), stop, interval),
+            name='IQM architecture refresher',
+            daemon=True,
+        ).start()
+
+    def stop_refreshing(self) -> None:
+        """Stops refreshing the architecture in the background, see :meth:`start_refreshing`."""
+        with self._lock:
+            stop, self._stop_refreshing = self._stop_refreshing, None
+        if stop is not None:
+            stop.set()
+
+
+def _refresh_until(cache_ref: weakref.ref[ArchitectureCache], stop: threading.Event, interval: float) -> None:
+    """Refreshes the referenced cache every ``interval`` seconds until ``stop`` is set or the cache is gone."""
+    while not stop.wait(interval):
+        cache = cache_ref()
+        if cache is None:
+            return
+        try:
+            cache.refresh()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            warnings.warn(f'Failed to refresh the dynamic quantum architecture: {e}')
+        del cache
+
+
+class ArchitectureStore:
+    """Persistent on-disk cache of dynamic quantum architectures and the device metadata derived from them.
+
+    The entries are keyed by the URL of the IQM server and the ID of the calibration set, where the ID ``None``
+    stands for the default calibration set of the server at the time the entry was saved. Loading an entry is much
+    faster than fetching the architecture and deriving the device metadata from it, which makes it possible to
+    create an :class:`.IQMSampler` without querying the server for the architecture.
+
+    The entries are stored as pickle files, so the directory must not be writable by untrusted users.
+    Entries saved by another version of Cirq on IQM, and entries that cannot be read, are ignored.
+
+    Args:
+        directory: directory for the entries, created when the first entry is saved
+    """
+
+    def __init__(self, directory: str | os.PathLike):
+        self._directory = Path(directory).expanduser()
+        self._version = version('cirq-iqm')
+
+    @property
+    def directory(self) -> Path:
+        """Directory of the entries."""
+        return self._directory
+
+    def load(self, url: str, calibration_set_id: Optional[UUID]) -> Optional[IQMDeviceMetadata]:
+        """Loads the device metadata saved for the given server and calibration set.
+
+        Args:
+            url: URL of the IQM server
+            calibration_set_id: ID of the calibration set, or None for the default calibration set
+
+        Returns:
+            saved device metadata including the architecture it was derived from, or None if there is no usable entry
+        """
+        try:
+            with open(self._path(url, calibration_set_id), 'rb') as file:
+                entry = pickle.load(file)
+        except Exception:  # pylint: disable=broad-exception-caught
+            return None  # the entry is missing or corrupt, or refers to classes that no longer exist
+        if not isinstance(entry, dict) or entry.get('version') != self._version:
+            return None
+        metadata = entry.get('metadata')
+        if not isinstance(metadata, IQMDeviceMetadata) or metadata.architecture is None:
+            return None
+        return metadata
+
+    def save(self, url: str, calibration_set_id: Optional[UUID], metadata: IQMDeviceMetadata) -> None:
+        """Saves the device metadata for the given server and calibration set, replacing any earlier entry.
+
+        The entry is written atomically, so concurrent processes never load a partially written entry.
+        Failures to write the entry are reported as warnings, and leave no temporary files behind.
+
+        Args:
+            url: URL of the IQM server
+            calibration_set_id: ID of the calibration set, or None for the default calibration set
+            metadata: device metadata including the architecture it was derived from
+        """
+        if metadata.architecture is None:
+            raise ValueError('Device metadata without an architecture cannot be saved.')
+        path = self._path(url, calibration_set_id)
+        temp_name: Optional[str] = None
+        try:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile('wb', dir=self._directory, suffix='.tmp', delete=False) as file:
+                temp_name = file.name
+                pickle.dump({'version': self._version, 'metadata': metadata}, file)
+            os.replace(temp_name, path)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            if temp_name is not None:
+                try:
+                    os.unlink(temp_name)
+                except OSError:
+                    pass
+            warnings.warn(f'Failed to save the dynamic quantum architecture to {path}: {e}')
+
+    def _path(self, url: str, calibration_set_id: Optional[UUID]) -> Path:
+        server = hashlib.sha256(url.rstrip('/').encode()).hexdigest()[:16]
+        return self._directory / f'{server}-{calibration_set_id or "default"}.pickle'
@@ -0,0 +1,81 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Fast construction of Cirq circuits from moments and operations."""
+from __future__ import annotations
+
+from typing import Iterable
+
+import cirq
+
+from iqm.cirq_iqm.iqm_gates import IQMMoveGate
+
+# gates without measurement or control keys
+_KEYLESS_GATES = (cirq.PhasedXPowGate, cirq.XPowGate, cirq.YPowGate, cirq.ZPowGate, cirq.CZPowGate, IQMMoveGate)
+
+
+def circuit_from_moments(moments: Iterable[cirq.Moment]) -> cirq.Circuit:
+    """Circuit consisting of the given moments, as they are.
+
+    Equivalent to ``cirq.Circuit(moments)``, but without placing the operations of the moments one by one.
+    """
+    # Circuit._from_moments is private in Cirq, but it is the implementation of an abstract method of
+    # cirq.AbstractCircuit for creating circuits from moments, and much faster than the constructor.
+    # This is the only place using it, and the constructor is used if a Cirq release removes it.
+    if '_from_moments' not in vars(cirq.Circuit):
+        return cirq.Circuit(moments)
+    return cirq.Circuit._from_moments(moments)
+
+
+def earliest_circuit(operations: Iterable[cirq.Operation]) -> cirq.Circuit:
+    """Circuit of the given operations, placed into moments like the :class:`cirq.Circuit` constructor does.
+
+    Uses the earliest insertion strategy in a single pass over the operations. The measurement and control keys of
+    the native operations are found using their gate types, and those of other operations using Cirq protocols.
+    """
+    # index of the latest moment using each qubit, measurement key, and control key
+    qubit_indices: dict[cirq.Qid, int] = {}
+    mkey_indices: dict[cirq.MeasurementKey, int] = {}
+    ckey_indices: dict[cirq.MeasurementKey, int] = {}
+    moments: list[list[cirq.Operation]] = []
+    for op in operations:
+        gate = op.gate
+        if type(gate) in _KEYLESS_GATES:
+            mkeys: Iterable[cirq.MeasurementKey] = ()
+            ckeys: Iterable[cirq.MeasurementKey] = ()
+        elif isinstance(gate, cirq.MeasurementGate):
+            mkeys = (gate.mkey,)
+            ckeys = ()
+        else:
+            mkeys = cirq.measurement_key_objs(op)
+            ckeys = cirq.control_keys(op)
+
+        last_conflict = max((qubit_indices.get(qubit, -1) for qubit in op.qubits), default=-1)
+        for key in mkeys:
+            last_conflict = max(last_conflict, mkey_indices.get(key, -1), ckey_indices.get(key, -1))
+        for key in ckeys:
+            last_conflict = max(last_conflict, mkey_indices.get(key, -1))
+
+        index = last_conflict + 1
+        for qubit in op.qubits:
+            qubit_indices[qubit] = index
+        for key in mkeys:
+            mkey_indices[key] = index
+        for key in ckeys:
+            ckey_indices[key] = index
+        if index == len(moments):
+            moments.append([op])
+        else:
+            moments[index].append(op)
+
+    return circuit_from_moments(cirq.Moment.from_ops(*ops) for ops in moments)
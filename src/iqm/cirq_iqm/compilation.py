@@ -0,0 +1,194 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compilation of circuits for execution on IQM devices."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence
+
+import cirq
+
+from iqm.cirq_iqm.optimizers import simplify_circuit
+
+if TYPE_CHECKING:
+    from iqm.cirq_iqm.devices import IQMDevice
+
+# output circuit of a compilation stage, and the qubit mappings produced by routing
+_StageOutput = tuple[cirq.AbstractCircuit, Any]
+
+
+@dataclass
+class CompilationResult:
+    """Result of compiling a circuit with :class:`CompilationPipeline`."""
+
+    circuit: cirq.Circuit
+    """compiled circuit"""
+    initial_mapping: Optional[dict[cirq.Qid, cirq.Qid]]
+    """initial mapping from the circuit qubits to the device qubits, or None if the circuit was not routed"""
+    final_mapping: Optional[dict[cirq.Qid, cirq.Qid]]
+    """final mapping from physical qubits to physical qubits, or None if the circuit was not routed"""
+    stages: tuple[str, ...]
+    """names of the stages run, in order"""
+    cached_stages: tuple[str, ...]
+    """names of the stages whose output was found in the compilation cache of the device"""
+
+
+class CompilationPipeline:
+    """Compiles circuits for execution on an IQM device.
+
+    The pipeline consists of the following stages, in order:
+
+    * ``decompose``: decomposes the circuit to the native gate set using :meth:`.IQMDevice.decompose_circuit`
+    * ``simplify``: optimizes the circuit using :func:`.simplify_circuit`
+    * ``route``: routes the circuit to the device qubits using :meth:`.IQMDevice.route_circuit`
+    * ``decompose_routed``: decomposes the gates introduced by the routing, such as SWAPs and the z rotations left
+      by ``simplify``. Skipped on devices with computational resonators, since the routing decomposes the circuit
+      before inserting the MOVE gates.
+    * ``validate``: validates the compiled circuit using :meth:`.IQMDevice.validate_circuit`
+
+    The intermediate circuits are passed from one stage to the next without copying.
+    If the compilation cache of the device is enabled (see ``compilation_cache_size`` in :class:`.IQMDevice`),
+    the output of each stage is cached keyed on the contents of its input circuit and the options of the stage.
+    Compiling a circuit equal to one compiled before then only requires hashing the input circuit, and a circuit
+    validated before is not validated again.
+
+    Args:
+        device: device to compile the circuits for
+        decompose: iff True, decompose the circuit before simplifying it
+        simplify: iff True, simplify the circuit before routing it
+        drop_final_rz: iff True, ``simplify`` drops z rotations that have no successor operations
+        route: iff True, route the circuit, otherwise it must already use the device qubits
+        initial_mapper: initial mapping used for routing, see :meth:`.IQMDevice.route_circuit`
+        qubit_subset: restrict the routing to this subset of the device qubits
+        validate: iff True, validate the compiled circuit
+    """
+
+    def __init__(
+        self,
+        device: IQMDevice,
+        *,
+        decompose: bool = True,
+        simplify: bool = True,
+        drop_final_rz: bool = False,
+        route: bool = True,
+        initial_mapper: Optional[cirq.AbstractInitialMapper] = None,
+        qubit_subset: Optional[Sequence[cirq.Qid]] = None,
+        validate: bool = True,
+    ):
+        self.device = device
+        self.drop_final_rz = drop_final_rz
+        self.initial_mapper = initial_mapper
+        self.qubit_subset = qubit_subset
+        # stage name, options that the stage output depends on, and the stage function
+        stages: list[tuple[str, Any, Callable[[cirq.AbstractCircuit], _StageOutput]]] = []
+        if decompose:
+            stages.append(('decompose', (), self._decompose))
+        if simplify:
+            stages.append(('simplify', (drop_final_rz,), self._simplify))
+        if route:
+            subset = frozenset(qubit_subset) if qubit_subset is not None else None
+            stages.append(('route', (initial_mapper, subset), self._route))
+            if not device.resonators:
+                stages.append(('decompose_routed', (), self._decompose))
+        if validate:
+            stages.append(('validate', (), self._validate))
+        self._stages = stages
+
+    @property
+    def stages(self) -> tuple[str, ...]:
+        """Names of the stages of the pipeline, in order."""
+        return tuple(name for name, _, _ in self._stages)
+
+    def __call__(self, circuit: cirq.AbstractCircuit) -> CompilationResult:
+        """Compiles the given circuit.
+
+        Adds the attribute ``iqm_calibration_set_id`` to the compiled circuit, with value taken from
+        ``self.device.metadata.architecture.calibration_set_id`` if available, otherwise None.
+
+        Args:
+            circuit: circuit to compile
+
+        Returns:
+            compilation result
+
+        Raises:
+            ValueError: the circuit cannot be routed, or the compiled circuit is not valid for the device
+        """
+        original = circuit
+        if self.device.compilation_cache.maxsize > 0:
+            # The cache keys are frozen circuits. The input circuit is frozen once here, and the stage outputs
+            # when they are cached, so the frozen circuits are passed from one stage to the next without copying.
+            circuit = circuit.freeze()
+        mappings = None
+        cached_stages = []
+        for name, options, stage in self._stages:
+            (circuit, extra), cached = self._run_stage(name, options, stage, circuit)
+            if extra is not None:
+                mappings = extra
+            if cached:
+                cached_stages.append(name)
+
+        # circuits from the compilation cache are frozen, so only the input circuit needs to be copied
+        compiled = circuit.unfreeze(copy=circuit is original)
+        architecture = self.device.metadata.architecture
+        compiled.iqm_calibration_set_id = (  # type: ignore
+            architecture.calibration_set_id if architecture is not None else None
+        )
+        initial_mapping, final_mapping = (dict(m) for m in mappings) if mappings is not None else (None, None)
+        return CompilationResult(compiled, initial_mapping, final_mapping, self.stages, tuple(cached_stages))
+
+    def _run_stage(
+        self,
+        name: str,
+        options: Any,
+        stage: Callable[[cirq.AbstractCircuit], _StageOutput],
+        circuit: cirq.AbstractCircuit,
+    ) -> tuple[_StageOutput, bool]:
+        """Runs a stage of the pipeline using the compilation cache of the device.
+
+        If the cache is enabled, ``circuit`` must be frozen, and so is the output circuit.
+
+        Returns:
+            output of the stage, True iff it was found in the cache
+        """
+        cache = self.device.compilation_cache
+        if cache.maxsize <= 0:
+            return stage(circuit), False
+        key = (name, options, circuit)
+        try:
+            output = cache.get(key)
+        except TypeError:  # unhashable initial mapper
+            return stage(circuit), False
+        if output is not None:
+            return output, True
+        output_circuit, extra = stage(circuit)
+        output = (output_circuit.freeze(), extra)
+        cache.put(key, output)
+        return output, False
+
+    def _decompose(self, circuit: cirq.AbstractCircuit) -> _StageOutput:
+        return self.device.decompose_circuit(circuit), None
+
+    def _simplify(self, circuit: cirq.AbstractCircuit) -> _StageOutput:
+        return simplify_circuit(circuit, drop_final_rz=self.drop_final_rz), None
+
+    def _route(self, circuit: cirq.AbstractCircuit) -> _StageOutput:
+        routed, initial_mapping, final_mapping = self.device.route_circuit(
+            circuit, initial_mapper=self.initial_mapper, qubit_subset=self.qubit_subset
+        )
+        return routed, (initial_mapping, final_mapping)
+
+    def _validate(self, circuit: cirq.AbstractCircuit) -> _StageOutput:
+        self.device.validate_circuit(circuit)
+        return circuit, None
@@ -17,19 +17,26 @@ Describes IQM quantum architectures in the Cirq framework.
 The description includes the qubit connectivity, the native gate set, and the gate decompositions
 to use with the architecture.
 """
-# pylint: disable=protected-access,no-self-use
+# pylint: disable=protected-access,no-self-use,too-many-instance-attributes,too-many-public-methods
 from __future__ import annotations
 
+from collections import OrderedDict
 import collections.abc as ca
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import functools
 from math import pi as PI
-from typing import Optional, Sequence, cast
+from typing import Any, Callable, Optional, Sequence, cast
+import weakref
 
 import cirq
 from cirq import devices, ops, protocols
 from cirq.contrib.routing.router import nx
 
+from iqm.cirq_iqm.circuit_builder import earliest_circuit
+from iqm.cirq_iqm.compilation import CompilationPipeline, CompilationResult
 from iqm.cirq_iqm.iqm_gates import IQMMoveGate
-from iqm.cirq_iqm.transpiler import transpile_insert_moves_into_circuit
+from iqm.cirq_iqm.transpiler import InsertMoves
 
 from .iqm_device_metadata import IQMDeviceMetadata
 
@@ -45,6 +52,212 @@ def _verify_unique_measurement_keys(operations: ca.Iterable[cirq.Operation]) ->
             seen_keys.add(key)
 
 
+DecompositionRule = Callable[[cirq.Gate, Sequence[cirq.Qid]], Optional[list[cirq.Operation]]]
+"""Decomposes a gate acting on the given qubits, or returns None to pass it to Cirq native decompositions."""
+
+# All the decompositions below keep track of global phase (required for decomposing controlled gates).
+# It seems that Cirq native decompositions ignore global phase entirely?
+
+_PI_2 = PI / 2
+
+# common gates used in gate decompositions
+_CZ = ops.CZPowGate()
+_Lx = ops.rx(_PI_2)
+_Lxi = ops.rx(-_PI_2)
+_Ly = ops.ry(_PI_2)
+_Lyi = ops.ry(-_PI_2)
+_X_HALF = ops.XPowGate(exponent=0.5)
+_X_HALF_INV = ops.XPowGate(exponent=-0.5)
+
+
+def _decompose_cz_pow(gate: cirq.Gate, qubits: Sequence[cirq.Qid]) -> list[cirq.Operation]:
+    """Decomposes CZPowGate using ZZPowGate."""
+    gate = cast(ops.CZPowGate, gate)
+    t = gate.exponent
+    s = gate.global_shift
+    L = ops.rz(t / 2 * PI)
+    return [
+        ops.ZZPowGate(exponent=-0.5 * t, global_shift=-2 * s - 1).on(*qubits),
+        L.on(qubits[0]),
+        L.on(qubits[1]),
+    ]
+
+
+def _decompose_zz_pow(gate: cirq.Gate, qubits: Sequence[cirq.Qid]) -> list[cirq.Operation]:
+    """Decomposes ZZPowGate using two CZs."""
+    gate = cast(ops.ZZPowGate, gate)
+    t = gate.exponent
+    s = gate.global_shift
+    return [
+        _Lyi.on(qubits[1]),
+        _CZ.on(*qubits),
+        ops.XPowGate(exponent=-t, global_shift=-1 - s).on(qubits[1]),
+        _CZ.on(*qubits),
+        _Ly.on(qubits[1]),
+    ]
+
+
+def _decompose_iswap_pow(gate: cirq.Gate, qubits: Sequence[cirq.Qid]) -> list[cirq.Operation]:
+    """Decomposes ISwapPowGate using two CZs."""
+    gate = cast(ops.ISwapPowGate, gate)
+    t = gate.exponent
+    s = gate.global_shift
+    x = -0.5 * t
+    return [
+        _Lxi.on(qubits[0]),
+        _Lxi.on(qubits[1]),
+        _Lyi.on(qubits[1]),
+        _CZ.on(*qubits),
+        ops.XPowGate(exponent=x, global_shift=-0.5 - 2 * s).on(qubits[0]),
+        ops.XPowGate(exponent=-x, global_shift=-0.5).on(qubits[1]),
+        _CZ.on(*qubits),
+        _Ly.on(qubits[1]),
+        _Lx.on(qubits[0]),
+        _Lx.on(qubits[1]),
+    ]
+
+
+def _decompose_z_pow(gate: cirq.Gate, qubits: Sequence[cirq.Qid]) -> list[cirq.Operation]:
+    """Decomposes Rz using Rx, Ry."""
+    gate = cast(ops.ZPowGate, gate)
+    q = qubits[0]
+    return [
+        _X_HALF_INV.on(q),
+        ops.YPowGate(exponent=gate.exponent).on(q),
+        _X_HALF.on(q),
+    ]
+
+
+DEFAULT_DECOMPOSITION_RULES: dict[type[cirq.Gate], DecompositionRule] = {
+    ops.CZPowGate: _decompose_cz_pow,
+    ops.ZZPowGate: _decompose_zz_pow,
+    ops.ISwapPowGate: _decompose_iswap_pow,
+    ops.ZPowGate: _decompose_z_pow,
+}
+"""Decomposition rules used by all IQM devices, keyed by gate type."""
+
+
+class LRUCache:
+    """Least recently used cache with hit and miss statistics.
+
+    Args:
+        maxsize: maximum number of cached entries, 0 disables caching
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[ca.Hashable, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Removes all the cached entries and resets the statistics."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: ca.Hashable) -> Any:
+        """Returns the entry stored under ``key``, or None if there is none."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: ca.Hashable, entry: Any) -> None:
+        """Stores an entry under ``key``, evicting the least recently used one if needed."""
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class DecompositionCache(LRUCache):
+    """LRU cache for gate decompositions.
+
+    The decompositions are stored as templates acting on placeholder qubits :class:`cirq.LineQid` ``0, 1, ...``,
+    and are rebound to the actual qubits of the operation on a cache hit.
+
+    Args:
+        maxsize: maximum number of cached decompositions, 0 disables caching
+    """
+
+
+@dataclass(frozen=True)
+class _RoutingSlot:
+    """Tag marking the placeholder of the ``index``-th operation of a circuit in its routing skeleton."""
+
+    index: int
+
+
+def _routing_skeleton(circuit: cirq.AbstractCircuit) -> tuple[cirq.FrozenCircuit, list[cirq.Operation]]:
+    """Replaces the unitary operations of the circuit with parameter-free placeholders.
+
+    The routing of a circuit by :class:`cirq.RouteCQC` only depends on the qubits the operations act on and on
+    their classical dependencies, so circuits with the same skeleton are routed identically. Measurements and
+    classically controlled operations are kept as is.
+
+    Returns:
+        skeleton circuit, operations replaced by the placeholders in the order of their slot indices
+    """
+    slots: list[cirq.Operation] = []
+
+    def to_placeholder(op: cirq.Operation) -> cirq.Operation:
+        if len(op.qubits) > 2 or protocols.is_measurement(op) or protocols.control_keys(op):
+            return op
+        slots.append(op)
+        return (
+            ops.IdentityGate(qid_shape=protocols.qid_shape(op)).on(*op.qubits).with_tags(_RoutingSlot(len(slots) - 1))
+        )
+
+    skeleton = cirq.FrozenCircuit.from_moments(*(cirq.Moment(map(to_placeholder, moment)) for moment in circuit))
+    return skeleton, slots
+
+
+def _splice_routing_skeleton(routed_skeleton: cirq.AbstractCircuit, slots: list[cirq.Operation]) -> cirq.Circuit:
+    """Replaces the placeholders in a routed skeleton with the original operations, acting on the routed qubits."""
+
+    def from_placeholder(op: cirq.Operation) -> cirq.Operation:
+        if isinstance(op, ops.TaggedOperation) and isinstance(op.tags[0], _RoutingSlot):
+            return slots[op.tags[0].index].with_qubits(*op.qubits)
+        return op
+
+    return cirq.Circuit.from_moments(*(cirq.Moment(map(from_placeholder, moment)) for moment in routed_skeleton))
+
+
+# decomposition caches shared between devices of the same type with equal metadata
+_SHARED_DECOMPOSITION_CACHES: weakref.WeakValueDictionary[
+    tuple[type, IQMDeviceMetadata], DecompositionCache
+] = weakref.WeakValueDictionary()
+
+
+# device used for routing in a worker process of IQMDevice.route_circuits
+_worker_device: Optional[IQMDevice] = None
+_worker_routing_args: dict[str, Any] = {}
+
+
+def _init_routing_worker(device: IQMDevice, routing_args: dict[str, Any]) -> None:
+    """Initializes a worker process of :meth:`IQMDevice.route_circuits`."""
+    global _worker_device, _worker_routing_args  # pylint: disable=global-statement
+    _worker_device = device
+    _worker_routing_args = routing_args
+
+
+def _route_in_worker(
+    circuit: cirq.Circuit,
+) -> tuple[cirq.Circuit, dict[cirq.Qid, cirq.Qid], dict[cirq.Qid, cirq.Qid]]:
+    """Routes a circuit using the device of the worker process."""
+    assert _worker_device is not None
+    return _worker_device.route_circuit(circuit, **_worker_routing_args)
+
+
 class IQMDevice(devices.Device):
     """ABC for the properties of a specific IQM quantum architecture.
 
@@ -53,13 +266,76 @@ class IQMDevice(devices.Device):
 
     Args:
         metadata: device metadata which contains the qubits, their connectivity, and the native gateset
+        decomposition_cache_size: maximum number of gate decompositions cached by :meth:`decompose_operation`,
+            0 disables the cache
+        share_decomposition_cache: iff True, the decomposition cache is shared with other devices of the same type
+            with equal metadata
+        routing_cache_size: Maximum number of routing results cached by :meth:`route_circuit`, 0 disables the cache.
+            The cache is keyed on the multi-qubit interaction pattern and measurement placement of the circuit,
+            so circuits differing only in gate parameters reuse the same qubit mapping and SWAP gates.
+        compilation_cache_size: Maximum number of compilation stage outputs cached by :meth:`compile`,
+            0 disables the cache.
     """
 
-    def __init__(self, metadata: IQMDeviceMetadata):
+    NATIVE_OPERATION_CACHE_SIZE: int = 1024
+    """maximum number of entries in the per-device cache of :meth:`is_native_operation` results"""
+
+    def __init__(
+        self,
+        metadata: IQMDeviceMetadata,
+        *,
+        decomposition_cache_size: int = 1024,
+        share_decomposition_cache: bool = False,
+        routing_cache_size: int = 0,
+        compilation_cache_size: int = 0,
+    ):
         self._metadata = metadata
         self.qubits = tuple(sorted(self._metadata.qubit_set))
         self.resonators = tuple(sorted(self._metadata.resonator_set))
         self.supported_operations = self._metadata.operations
+        self._build_operation_target_index()
+        # If the gateset consists of gate type families only, native checks depend only on the gate class
+        # (and the CZPowGate exponent), otherwise they are cached using the gate value itself as the key.
+        gate_families = self._metadata.gateset.gates
+        self._native_gate_types: Optional[tuple[type[cirq.Gate], ...]] = (
+            tuple(cast(type[cirq.Gate], gf.gate) for gf in gate_families)
+            if all(isinstance(gf.gate, type) for gf in gate_families)
+            else None
+        )
+        self._is_native_gate = functools.lru_cache(maxsize=self.NATIVE_OPERATION_CACHE_SIZE)(self._check_native_gate)
+        self._routing_graph: Optional[nx.Graph] = None
+        self._routers: dict[Optional[frozenset[cirq.Qid]], cirq.RouteCQC] = {}
+        self._move_inserter: Optional[InsertMoves] = None
+        self._routing_cache = LRUCache(routing_cache_size)
+        self._compilation_cache = LRUCache(compilation_cache_size)
+        self._decomposition_rules: dict[type[cirq.Gate], DecompositionRule] = dict(DEFAULT_DECOMPOSITION_RULES)
+        # maps concrete gate classes to their decomposition rules, filled in lazily
+        self._decomposition_rule_for_class: dict[type[cirq.Gate], Optional[DecompositionRule]] = {}
+        if share_decomposition_cache:
+            cache_key = (type(self), metadata)
+            cache = _SHARED_DECOMPOSITION_CACHES.get(cache_key)
+            if cache is None:
+                cache = DecompositionCache(decomposition_cache_size)
+                _SHARED_DECOMPOSITION_CACHES[cache_key] = cache
+            self._decomposition_cache = cache
+        else:
+            self._decomposition_cache = DecompositionCache(decomposition_cache_size)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # the caches are not pickled, the unpickled device starts with empty caches of the same sizes
+        state = self.__dict__.copy()
+        del state['_is_native_gate']
+        state['_routing_graph'] = None
+        state['_routers'] = {}
+        state['_move_inserter'] = None
+        state['_routing_cache'] = LRUCache(self._routing_cache.maxsize)
+        state['_compilation_cache'] = LRUCache(self._compilation_cache.maxsize)
+        state['_decomposition_cache'] = DecompositionCache(self._decomposition_cache.maxsize)
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._is_native_gate = functools.lru_cache(maxsize=self.NATIVE_OPERATION_CACHE_SIZE)(self._check_native_gate)
 
     @property
     def metadata(self) -> IQMDeviceMetadata:
@@ -82,36 +358,110 @@ class IQMDevice(devices.Device):
 
     def is_native_operation(self, op: cirq.Operation) -> bool:
         """Predicate, True iff the given operation is considered native for the architecture."""
-        check = (
-            isinstance(op, (ops.GateOperation, ops.TaggedOperation))
-            and (op.gate is not None)
-            and (op.gate in self._metadata.gateset)
-        )
-        if check and isinstance(op.gate, ops.CZPowGate):
-            return op.gate.exponent == 1
-        return check
+        if not isinstance(op, (ops.GateOperation, ops.TaggedOperation)) or op.gate is None:
+            return False
+        gate = op.gate
+        key: ca.Hashable
+        if self._native_gate_types is not None:
+            key = (type(gate), gate.exponent if isinstance(gate, ops.CZPowGate) else None)
+        else:
+            key = gate
+        try:
+            return self._is_native_gate(key)
+        except TypeError:  # unhashable gate
+            return self._check_native_gate(gate)
+
+    def _check_native_gate(self, key: ca.Hashable) -> bool:
+        """Uncached native gate check, ``key`` is as computed in :meth:`is_native_operation`."""
+        if self._native_gate_types is None:
+            gate = cast(cirq.Gate, key)
+            if isinstance(gate, ops.CZPowGate) and gate.exponent != 1:
+                return False
+            return gate in self._metadata.gateset
+        gate_class, cz_exponent = cast(tuple[type[cirq.Gate], object], key)
+        if issubclass(gate_class, ops.CZPowGate) and cz_exponent != 1:
+            return False
+        return issubclass(gate_class, self._native_gate_types)
+
+    def native_operation_cache_info(self) -> functools._CacheInfo:
+        """Hit and miss statistics of the cache used by :meth:`is_native_operation`."""
+        return self._is_native_gate.cache_info()
+
+    def _build_operation_target_index(self) -> None:
+        """Precomputes hashed lookup tables for :meth:`has_valid_operation_targets`.
+
+        For every supported gate type the valid loci are stored as a set: of qubits for measurements, of
+        frozensets of qubits for gates with interchangeable qubits, and of qubit tuples for all other gates.
+        """
+        self._valid_targets: dict[type[cirq.Gate], ca.Set] = {}
+        for gate_type, loci in self.supported_operations.items():
+            if gate_type == cirq.MeasurementGate:  # Measurements can be done on any available qubits
+                self._valid_targets[gate_type] = frozenset(q for locus in loci for q in locus)
+            elif issubclass(gate_type, cirq.InterchangeableQubitsGate):
+                self._valid_targets[gate_type] = frozenset(frozenset(locus) for locus in loci)
+            else:
+                self._valid_targets[gate_type] = frozenset(tuple(locus) for locus in loci)
+        # maps concrete gate classes to the first matching key of supported_operations, filled in lazily
+        self._supported_gate_types: dict[type[cirq.Gate], Optional[type[cirq.Gate]]] = {}
+
+    def _supported_gate_type(self, gate: cirq.Gate) -> Optional[type[cirq.Gate]]:
+        """The key of :attr:`supported_operations` the given gate belongs to, or None if it is not supported."""
+        gate_class = type(gate)
+        try:
+            return self._supported_gate_types[gate_class]
+        except KeyError:
+            match = next((g for g in self.supported_operations if issubclass(gate_class, g)), None)
+            self._supported_gate_types[gate_class] = match
+            return match
 
     def has_valid_operation_targets(self, op: cirq.Operation) -> bool:
         """Predicate, True iff the given operation is native and its targets are valid."""
-        matched_support = [
-            (g, loci)
-            for g, loci in self.supported_operations.items()
-            if op.gate is not None and op.gate in cirq.GateFamily(g)
-        ]
-        if len(matched_support) > 0:
-            gf, valid_loci = matched_support[0]
-            if gf == cirq.MeasurementGate:  # Measurements can be done on any available qubits
-                valid_qubits = set(q for locus in valid_loci for q in locus)
-                return all(q in valid_qubits for q in op.qubits)
-            if issubclass(gf, cirq.InterchangeableQubitsGate):
-                return any(set(t) == set(op.qubits) for t in valid_loci)
-            return op.qubits in valid_loci
-        return False
+        if op.gate is None:
+            return False
+        gate_type = self._supported_gate_type(op.gate)
+        if gate_type is None:
+            return False
+        valid_targets = self._valid_targets[gate_type]
+        if gate_type == cirq.MeasurementGate:
+            return all(q in valid_targets for q in op.qubits)
+        if issubclass(gate_type, cirq.InterchangeableQubitsGate):
+            return frozenset(op.qubits) in valid_targets
+        return op.qubits in valid_targets
+
+    def register_decomposition_rule(self, gate_type: type[cirq.Gate], rule: DecompositionRule) -> None:
+        """Registers a decomposition rule used by :meth:`operation_decomposer` for the given gate type.
+
+        The rule applies to instances of ``gate_type`` and its subclasses, unless a more specific rule has been
+        registered for the subclass. It replaces any rule previously registered for ``gate_type`` on this device.
+        Registering a rule detaches the device from a shared decomposition cache, and clears the compilation cache.
+
+        Args:
+            gate_type: gate class the rule decomposes
+            rule: function that takes the gate and the qubits it acts on, and returns the decomposition,
+                or None to pass the operation to the Cirq native decomposition machinery instead
+        """
+        self._decomposition_rules[gate_type] = rule
+        self._decomposition_rule_for_class.clear()
+        self._decomposition_cache = DecompositionCache(self._decomposition_cache.maxsize)
+        self._compilation_cache.clear()
+
+    def _decomposition_rule(self, gate: cirq.Gate) -> Optional[DecompositionRule]:
+        """The decomposition rule for the given gate, or None if there is none."""
+        gate_class = type(gate)
+        try:
+            return self._decomposition_rule_for_class[gate_class]
+        except KeyError:
+            rule = next(
+                (self._decomposition_rules[c] for c in gate_class.__mro__ if c in self._decomposition_rules), None
+            )
+            self._decomposition_rule_for_class[gate_class] = rule
+            return rule
 
     def operation_decomposer(self, op: cirq.Operation) -> Optional[list[cirq.Operation]]:
         """Decomposes operations into the native operation set.
 
-        All the decompositions below keep track of global phase (required for decomposing controlled gates).
+        The decomposition rule is chosen based on the gate type, see :data:`DEFAULT_DECOMPOSITION_RULES` and
+        :meth:`register_decomposition_rule`.
 
         Args:
             op: operation to decompose
@@ -119,71 +469,49 @@ class IQMDevice(devices.Device):
         Returns:
             decomposition, or None to pass ``op`` to the Cirq native decomposition machinery instead
         """
+        if op.gate is None:
+            return None
+        rule = self._decomposition_rule(op.gate)
+        if rule is None:
+            return None
+        return rule(op.gate, op.qubits)
 
-        # It seems that Cirq native decompositions ignore global phase entirely?
-
-        PI_2 = PI / 2
-
-        # common gates used in gate decompositions
-        CZ = ops.CZPowGate()
-        Lx = ops.rx(PI_2)
-        Lxi = ops.rx(-PI_2)
-        Ly = ops.ry(PI_2)
-        Lyi = ops.ry(-PI_2)
-
-        if isinstance(op.gate, ops.CZPowGate):
-            # decompose CZPowGate using ZZPowGate
-            t = op.gate.exponent
-            s = op.gate.global_shift
-            L = ops.rz(t / 2 * PI)
-            return [
-                ops.ZZPowGate(exponent=-0.5 * t, global_shift=-2 * s - 1).on(*op.qubits),
-                L.on(op.qubits[0]),
-                L.on(op.qubits[1]),
-            ]
-        if isinstance(op.gate, ops.ZZPowGate):
-            # decompose ZZPowGate using two CZs
-            t = op.gate.exponent
-            s = op.gate.global_shift
-            return [
-                Lyi.on(op.qubits[1]),
-                CZ.on(*op.qubits),
-                ops.XPowGate(exponent=-t, global_shift=-1 - s).on(op.qubits[1]),
-                CZ.on(*op.qubits),
-                Ly.on(op.qubits[1]),
-            ]
-        if isinstance(op.gate, ops.ISwapPowGate):
-            # decompose ISwapPowGate using two CZs
-            t = op.gate.exponent
-            s = op.gate.global_shift
-            x = -0.5 * t
-            return [
-                Lxi.on(op.qubits[0]),
-                Lxi.on(op.qubits[1]),
-                Lyi.on(op.qubits[1]),
-                CZ.on(*op.qubits),
-                ops.XPowGate(exponent=x, global_shift=-0.5 - 2 * s).on(op.qubits[0]),
-                ops.XPowGate(exponent=-x, global_shift=-0.5).on(op.qubits[1]),
-                CZ.on(*op.qubits),
-                Ly.on(op.qubits[1]),
-                Lx.on(op.qubits[0]),
-                Lx.on(op.qubits[1]),
-            ]
-        if isinstance(op.gate, ops.ZPowGate):
-            # Rz using Rx, Ry
-            q = op.qubits[0]
-            return [
-                ops.XPowGate(exponent=-0.5).on(q),
-                ops.YPowGate(exponent=op.gate.exponent).on(q),
-                ops.XPowGate(exponent=0.5).on(q),
-            ]
-        return None
+    @property
+    def decomposition_cache(self) -> DecompositionCache:
+        """Returns the cache used by :meth:`decompose_operation`."""
+        return self._decomposition_cache
 
     def decompose_operation(self, operation: cirq.Operation) -> cirq.OP_TREE:
-        """Decompose a single quantum operation into the native operation set."""
+        """Decompose a single quantum operation into the native operation set.
+
+        Decompositions of plain gate operations are cached in :attr:`decomposition_cache`, keyed on the gate
+        and the shape of the qubits it acts on.
+        """
         if self.is_native_operation(operation):
             return operation
 
+        if not isinstance(operation, ops.GateOperation) or self._decomposition_cache.maxsize <= 0:
+            return self._decompose_operation(operation)
+
+        key = (operation.gate, protocols.qid_shape(operation))
+        try:
+            template = self._decomposition_cache.get(key)
+        except TypeError:  # unhashable gate
+            return self._decompose_operation(operation)
+
+        qubits = operation.qubits
+        if template is None:
+            placeholders = cirq.LineQid.for_qid_shape(key[1])
+            decomposition = self._decompose_operation(operation.with_qubits(*placeholders))
+            template = tuple(decomposition)
+            if not set(q for op in template for q in op.qubits) <= set(placeholders):
+                # the decomposition introduced ancillas, it cannot be rebound
+                return self._decompose_operation(operation)
+            self._decomposition_cache.put(key, template)
+        return [op.with_qubits(*(qubits[cast(cirq.LineQid, q).x] for q in op.qubits)) for op in template]
+
+    def _decompose_operation(self, operation: cirq.Operation) -> list[cirq.Operation]:
+        """Decompose a single non-native quantum operation into the native operation set, without caching."""
         return protocols.decompose(
             operation,
             intercepting_decomposer=self.operation_decomposer,
@@ -191,9 +519,45 @@ class IQMDevice(devices.Device):
             on_stuck_raise=None,
         )
 
+    @property
+    def routing_graph(self) -> nx.Graph:
+        """Qubit connectivity graph used for routing circuits on the device.
+
+        If the device has computational resonators, this is a modified connectivity graph with edges between all
+        qubits connected to the same resonator. The graph is built on first access and cached.
+        """
+        if self._routing_graph is None:
+            self._routing_graph = self._build_routing_graph()
+        return self._routing_graph
+
+    def _build_routing_graph(self) -> nx.Graph:
+        """Builds the graph returned by :attr:`routing_graph`."""
+        if not self.metadata.resonator_set:
+            return self._metadata.nx_graph
+        graph = nx.Graph()
+        for edge in self.metadata.nx_graph.edges:
+            q, r = edge if edge[1] in self.resonators else edge[::-1]
+            if r not in self.resonators:
+                graph.add_edge(*edge)
+            else:
+                for n in self.metadata.nx_graph.neighbors(r):
+                    if n != q and not graph.has_edge(q, n) and not graph.has_edge(n, q):
+                        graph.add_edge(q, n)
+        return graph
+
+    def _router(self, qubit_subset: Optional[Sequence[cirq.Qid]] = None) -> cirq.RouteCQC:
+        """Cached router for the routing graph, restricted to ``qubit_subset`` if given."""
+        key = frozenset(qubit_subset) if qubit_subset is not None else None
+        router = self._routers.get(key)
+        if router is None:
+            graph = self.routing_graph if key is None else self.routing_graph.subgraph(key)
+            router = cirq.RouteCQC(graph)
+            self._routers[key] = router
+        return router
+
     def route_circuit(
         self,
-        circuit: cirq.Circuit,
+        circuit: cirq.AbstractCircuit,
         *,
         initial_mapper: Optional[cirq.AbstractInitialMapper] = None,
         qubit_subset: Optional[Sequence[cirq.Qid]] = None,
@@ -221,34 +585,18 @@ class IQMDevice(devices.Device):
         Raises:
             ValueError: routing is impossible
         """
-        modified_circuit = circuit.copy()
-
-        if self.metadata.resonator_set:
-            # If the device has computational resonators, we use a modified connection graph for routing
-            # by adding edges between all qubits connected to the same resonator.
-            move_routing = True
-            graph = nx.Graph()
-            for edge in self.metadata.nx_graph.edges:
-                q, r = edge if edge[1] in self.resonators else edge[::-1]
-                if r not in self.resonators:
-                    graph.add_edge(*edge)
-                else:
-                    for n in self.metadata.nx_graph.neighbors(r):
-                        if n != q and not graph.has_edge(q, n) and not graph.has_edge(n, q):
-                            graph.add_edge(q, n)
+        # If the device has computational resonators, qubits are routed using MOVE gates.
+        move_routing = bool(self.metadata.resonator_set)
+
+        # Route the circuit, the router does not modify it.
+        router = self._router(qubit_subset)
+        if self._routing_cache.maxsize > 0:
+            routed_circuit, initial_mapping, final_mapping = self._route_with_cache(
+                router, circuit, initial_mapper, qubit_subset
+            )
         else:
-            graph = self._metadata.nx_graph
-            move_routing = False
-
-        if qubit_subset is not None:
-            graph = graph.subgraph(qubit_subset)
-
-        # Route the modified circuit.
-        router = cirq.RouteCQC(graph)
-        routed_circuit, initial_mapping, final_mapping = router.route_circuit(
-            modified_circuit, initial_mapper=initial_mapper
-        )
-        routed_circuit = cast(cirq.Circuit, routed_circuit)
+            routed, initial_mapping, final_mapping = router.route_circuit(circuit, initial_mapper=initial_mapper)
+            routed_circuit = cast(cirq.Circuit, routed)
         # TODO routing can apply SWAP gates even after formerly terminal single-qubit measurements.
         # It would make sense to commute single-qubit measurements through SWAPs as far towards the
         # end of the circuit as possible.
@@ -257,7 +605,9 @@ class IQMDevice(devices.Device):
             # Decompose the SWAP  gates to the native gate set.
             routed_circuit = self.decompose_circuit(routed_circuit)
             # Insert IQMMoveGates into the circuit.
-            routed_circuit = transpile_insert_moves_into_circuit(routed_circuit, self)
+            if self._move_inserter is None:
+                self._move_inserter = InsertMoves(self)
+            routed_circuit = self._move_inserter(routed_circuit)
 
         routed_circuit.iqm_calibration_set_id = (  # type: ignore
             self._metadata.architecture.calibration_set_id if self._metadata.architecture is not None else None
@@ -265,7 +615,74 @@ class IQMDevice(devices.Device):
 
         return routed_circuit, initial_mapping, final_mapping
 
-    def decompose_circuit(self, circuit: cirq.Circuit) -> cirq.Circuit:
+    @property
+    def routing_cache(self) -> LRUCache:
+        """Returns the cache used by :meth:`route_circuit`."""
+        return self._routing_cache
+
+    def _route_with_cache(
+        self,
+        router: cirq.RouteCQC,
+        circuit: cirq.AbstractCircuit,
+        initial_mapper: Optional[cirq.AbstractInitialMapper],
+        qubit_subset: Optional[Sequence[cirq.Qid]],
+    ) -> tuple[cirq.Circuit, dict[cirq.Qid, cirq.Qid], dict[cirq.Qid, cirq.Qid]]:
+        """Routes the circuit using :attr:`routing_cache`, see :meth:`route_circuit`."""
+        skeleton, slots = _routing_skeleton(circuit)
+        key = (skeleton, initial_mapper, frozenset(qubit_subset) if qubit_subset is not None else None)
+        try:
+            cached = self._routing_cache.get(key)
+        except TypeError:  # unhashable initial mapper
+            routed, initial_mapping, final_mapping = router.route_circuit(circuit, initial_mapper=initial_mapper)
+            return cast(cirq.Circuit, routed), initial_mapping, final_mapping
+        if cached is None:
+            cached = router.route_circuit(skeleton, initial_mapper=initial_mapper)
+            self._routing_cache.put(key, cached)
+        routed_skeleton, initial_mapping, final_mapping = cached
+        return _splice_routing_skeleton(routed_skeleton, slots), dict(initial_mapping), dict(final_mapping)
+
+    def route_circuits(
+        self,
+        circuits: Sequence[cirq.Circuit],
+        *,
+        max_workers: Optional[int] = None,
+        initial_mapper: Optional[cirq.AbstractInitialMapper] = None,
+        qubit_subset: Optional[Sequence[cirq.Qid]] = None,
+    ) -> list[tuple[cirq.Circuit, dict[cirq.Qid, cirq.Qid], dict[cirq.Qid, cirq.Qid]]]:
+        """Routes the given circuits to the device connectivity and qubit names, in parallel.
+
+        Each circuit is routed as in :meth:`route_circuit`, in a pool of worker processes.
+        The device and the routing arguments are sent to each worker once, so they must be picklable, including
+        ``initial_mapper`` and the registered decomposition rules. The device is pickled with its type, so the
+        workers route the circuits exactly like this device, but starting with empty caches.
+
+        Args:
+            circuits: Circuits to route.
+            max_workers: Maximum number of worker processes. If ``None``, use the number of processors on the machine.
+                If 1, the circuits are routed in the current process.
+            initial_mapper: Initial mapping from circuit qubits to device qubits, used for all the circuits.
+                ``None`` means it will be generated automatically for each circuit.
+            qubit_subset: Restrict the routing to this subset of the device qubits. If ``None``,
+                use the entire device.
+
+        Returns:
+            for each circuit, in order, the same tuple that :meth:`route_circuit` returns
+
+        Raises:
+            ValueError: routing is impossible for one of the circuits
+        """
+        routing_args: dict[str, Any] = {'initial_mapper': initial_mapper, 'qubit_subset': qubit_subset}
+        if max_workers == 1 or len(circuits) <= 1:
+            return [self.route_circuit(circuit, **routing_args) for circuit in circuits]
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_routing_worker,
+            initargs=(self, routing_args),
+        ) as executor:
+            return list(executor.map(_route_in_worker, circuits))
+
+    def decompose_circuit(self, circuit: cirq.AbstractCircuit, *, preserve_moments: bool = False) -> cirq.Circuit:
         """Decomposes the given circuit to the native gate set of the device.
 
         Adds the attribute ``iqm_calibration_set_id`` to the decomposed circuit, with value taken from
@@ -273,21 +690,102 @@ class IQMDevice(devices.Device):
 
         Args:
             circuit: circuit to decompose
+            preserve_moments: Iff False, the decomposed operations are repacked into moments using
+                :attr:`cirq.InsertStrategy.EARLIEST`. Iff True, the circuit is decomposed moment by moment,
+                and each moment is replaced by the moments containing its decomposition.
+                Either way the decomposed operations are streamed into the new circuit in a single linear pass.
 
         Returns:
             decomposed circuit
         """
-        moments = ops.transform_op_tree(
-            circuit.moments,
-            self.decompose_operation,
-            preserve_moments=False,
-        )
-        decomposed_circuit = cirq.Circuit(moments)
+        if preserve_moments:
+            decomposed_circuit = cirq.Circuit.from_moments(
+                *(new_moment for moment in circuit for new_moment in self._decompose_moment(moment))
+            )
+        else:
+            decomposed_circuit = earliest_circuit(
+                new_op for op in circuit.all_operations() for new_op in ops.flatten_to_ops(self.decompose_operation(op))
+            )
         decomposed_circuit.iqm_calibration_set_id = (  # type: ignore
             self._metadata.architecture.calibration_set_id if self._metadata.architecture is not None else None
         )
         return decomposed_circuit
 
+    def _decompose_moment(self, moment: cirq.Moment) -> list[cirq.Moment]:
+        """Decomposes the operations in the given moment, packing the result into as few moments as possible.
+
+        Returns:
+            Moments containing the decomposition of ``moment``. If ``moment`` is empty or decomposes to nothing,
+            a single empty moment.
+        """
+        layers: list[list[cirq.Operation]] = []
+        # next free layer for each qubit and classical measurement key
+        frontier: dict[ca.Hashable, int] = {}
+        for op in moment:
+            for new_op in ops.flatten_to_ops(self.decompose_operation(op)):
+                dependencies: tuple[ca.Hashable, ...] = new_op.qubits
+                if not isinstance(new_op, ops.GateOperation) or isinstance(new_op.gate, ops.MeasurementGate):
+                    dependencies += tuple(protocols.measurement_key_objs(new_op) | protocols.control_keys(new_op))
+                index = max((frontier.get(d, 0) for d in dependencies), default=0)
+                if index == len(layers):
+                    layers.append([])
+                layers[index].append(new_op)
+                for d in dependencies:
+                    frontier[d] = index + 1
+        if not layers:
+            return [cirq.Moment()]
+        return [cirq.Moment(layer) for layer in layers]
+
+    @property
+    def compilation_cache(self) -> LRUCache:
+        """Returns the cache used by :meth:`compile`."""
+        return self._compilation_cache
+
+    def compile(
+        self,
+        circuit: cirq.AbstractCircuit,
+        *,
+        decompose: bool = True,
+        simplify: bool = True,
+        drop_final_rz: bool = False,
+        route: bool = True,
+        initial_mapper: Optional[cirq.AbstractInitialMapper] = None,
+        qubit_subset: Optional[Sequence[cirq.Qid]] = None,
+        validate: bool = True,
+    ) -> CompilationResult:
+        """Compiles the given circuit for execution on the device.
+
+        Decomposes, simplifies, routes, decomposes again and validates the circuit, using
+        :class:`.CompilationPipeline` and :attr:`compilation_cache`.
+
+        Args:
+            circuit: circuit to compile
+            decompose: iff True, decompose the circuit before simplifying it
+            simplify: iff True, simplify the circuit before routing it
+            drop_final_rz: iff True, drop z rotations that have no successor operations when simplifying
+            route: iff True, route the circuit, otherwise it must already use the device qubits
+            initial_mapper: initial mapping used for routing, see :meth:`route_circuit`
+            qubit_subset: restrict the routing to this subset of the device qubits
+            validate: iff True, validate the compiled circuit
+
+        Returns:
+            compiled circuit, and the qubit mappings if it was routed
+
+        Raises:
+            ValueError: routing is impossible, or the compiled circuit is not valid for the device
+        """
+        pipeline = CompilationPipeline(
+            self,
+            decompose=decompose,
+            simplify=simplify,
+            drop_final_rz=drop_final_rz,
+            route=route,
+            initial_mapper=initial_mapper,
+            qubit_subset=qubit_subset,
+            validate=validate,
+        )
+        return pipeline(circuit)
+
     def validate_circuit(self, circuit: cirq.AbstractCircuit) -> None:
         super().validate_circuit(circuit)
         _verify_unique_measurement_keys(circuit.all_operations())
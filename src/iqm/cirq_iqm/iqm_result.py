@@ -0,0 +1,329 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Results of executing quantum circuits on an IQM quantum computer."""
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Mapping, Optional, Union
+from uuid import UUID
+
+import cirq
+import numpy as np
+import pandas as pd  # type: ignore
+
+from iqm.iqm_client import Counts, RunRequest
+
+TMeasurementKey = Union[str, cirq.Qid, Iterable[cirq.Qid]]
+
+# largest number of bits for which histograms are computed using np.bincount instead of np.unique
+_MAX_BINCOUNT_BITS = 16
+
+
+@dataclass(eq=False)
+class PackedBits:
+    """Measurement results of one measurement key, with the bits of each shot packed together.
+
+    Shots of at most 64 bits are stored as big-endian unsigned integers of the smallest sufficient dtype.
+    Longer shots are stored as bytes packed using :func:`numpy.packbits`.
+    """
+
+    data: np.ndarray
+    """shots as integers of shape ``(repetitions,)``, or packed bytes of shape ``(repetitions, ceil(num_bits / 8))``"""
+    num_bits: int
+    """number of bits in each shot"""
+
+    @classmethod
+    def pack(cls, bits: np.ndarray) -> PackedBits:
+        """Packs the given array of bits of shape ``(repetitions, num_bits)``."""
+        num_bits = bits.shape[-1]
+        packed = np.packbits(bits, axis=-1)
+        if num_bits > 64:
+            return cls(packed, num_bits)
+        # right-align the bytes of each shot in a big-endian 64-bit integer, and drop the padding bits
+        padded = np.zeros((len(packed), 8), dtype=np.uint8)
+        padded[:, 8 - packed.shape[1] :] = packed
+        integers = padded.view('>u8')[:, 0] >> np.uint64(8 * packed.shape[1] - num_bits)
+        return cls(integers.astype(f'uint{max(8, 1 << (num_bits - 1).bit_length())}'), num_bits)
+
+    def unpack(self) -> np.ndarray:
+        """Array of bits of dtype uint8 and shape ``(repetitions, num_bits)``."""
+        if self.data.ndim == 2:
+            return np.unpackbits(self.data, axis=-1, count=self.num_bits)
+        shifts = np.arange(self.num_bits - 1, -1, -1, dtype=self.data.dtype)
+        return ((self.data[:, np.newaxis] >> shifts) & 1).astype(np.uint8)
+
+    def unique(self) -> tuple[list[int], np.ndarray, np.ndarray]:
+        """Finds the distinct shots.
+
+        Returns:
+            distinct shots as big-endian integers, index of the distinct shot of each shot, number of times each
+            distinct shot occurs
+        """
+        if self.data.ndim == 1:
+            integers, inverse, counts = np.unique(self.data, return_inverse=True, return_counts=True)
+            return integers.tolist(), inverse, counts
+        rows, inverse, counts = np.unique(self.data, axis=0, return_inverse=True, return_counts=True)
+        padding = 8 * self.data.shape[1] - self.num_bits
+        return [int.from_bytes(row.tobytes(), 'big') >> padding for row in rows], inverse.reshape(-1), counts
+
+    def histogram(self) -> Counter:
+        """Counts how many times each shot occurs, with the shots as big-endian integers."""
+        if self.data.ndim == 1 and self.num_bits <= _MAX_BINCOUNT_BITS:
+            counts = np.bincount(self.data)
+            integers = np.flatnonzero(counts)
+            return Counter(dict(zip(integers.tolist(), counts[integers].tolist())))
+        values, _, counts = self.unique()
+        return Counter(dict(zip(values, counts.tolist())))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+@dataclass
+class ResultMetadata:
+    """Metadata for an IQM execution result.
+
+    Attributes:
+        job_id: ID of the computational job.
+        calibration_set_id: Calibration set used for this :class:`.IQMResult`.
+        request: Request made to run the job.
+    """
+
+    job_id: UUID
+    calibration_set_id: Optional[UUID]
+    request: RunRequest
+
+
+class IQMResult(cirq.ResultDict):
+    """Stores the results of a quantum circuit execution on an IQM device.
+
+    The measurement results can be stored as :class:`PackedBits`, which are unpacked only when the measurements or
+    records of the result are accessed. The histograms and the data frame of packed measurement results are computed
+    directly from the packed shots.
+
+    Args:
+        params: Parameter resolver used for this circuit, if any.
+        measurements: Maps measurement keys to measurement results, which are 2-D arrays of bits,
+            `shape == (repetitions, qubits)`, or :class:`PackedBits`.
+        records: Maps measurement keys to measurement results, which are 3D arrays of dtype bool.
+            `shape == (repetitions, instances, qubits)`.
+        metadata: Metadata for the circuit execution results.
+    """
+
+    def __init__(
+        self,
+        *,
+        params: Optional[cirq.ParamResolver] = None,
+        measurements: Optional[Mapping[str, np.ndarray | PackedBits]] = None,
+        records: Optional[Mapping[str, np.ndarray]] = None,
+        metadata: ResultMetadata,
+    ) -> None:
+        packed = measurements is not None and any(isinstance(bits, PackedBits) for bits in measurements.values())
+        super().__init__(
+            params=params, measurements=None if packed else measurements, records=records  # type: ignore[arg-type]
+        )
+        self._packed_measurements = measurements if packed else None
+        if packed:
+            self._measurements = None
+            self._records = None
+        self.metadata = metadata
+
+    @property
+    def measurements(self) -> Mapping[str, np.ndarray]:
+        if self._measurements is None and self._packed_measurements is not None:
+            self._measurements = {
+                key: bits.unpack() if isinstance(bits, PackedBits) else bits
+                for key, bits in self._packed_measurements.items()
+            }
+        return super().measurements
+
+    @property
+    def records(self) -> Mapping[str, np.ndarray]:
+        if self._records is None and self._packed_measurements is not None:
+            self._records = {key: bits[:, np.newaxis, :] for key, bits in self.measurements.items()}
+        return super().records
+
+    @property
+    def repetitions(self) -> int:
+        if self._measurements is None and self._packed_measurements:
+            return len(next(iter(self._packed_measurements.values())))
+        return super().repetitions
+
+    @property
+    def data(self) -> pd.DataFrame:
+        if self._data is None and self._packed_measurements is not None:
+            # shots of at most 63 bits are stored as big-endian integers, which fit in the int64 columns used by Cirq
+            columns = {
+                key: bits.data.astype(np.int64)
+                for key, bits in self._packed_measurements.items()
+                if isinstance(bits, PackedBits) and bits.num_bits <= 63
+            }
+            if len(columns) == len(self._packed_measurements):
+                self._data = pd.DataFrame(columns, dtype=np.int64)
+        return super().data
+
+    def histogram(  # type: ignore[override]
+        self, *, key: TMeasurementKey, fold_func: Optional[Callable[[tuple], Any]] = None
+    ) -> Counter:
+        """Counts the number of times a measurement result occurred.
+
+        See :meth:`cirq.Result.histogram`. If ``fold_func`` is not given, the results are big-endian integers,
+        and the histogram of packed measurement results is computed without unpacking them.
+        """
+        if fold_func is not None:
+            return super().histogram(key=key, fold_func=fold_func)
+        bits = self._packed_bits(key)
+        if bits is None:
+            return super().histogram(key=key)
+        return bits.histogram()
+
+    def multi_measurement_histogram(  # type: ignore[override]
+        self, *, keys: Iterable[TMeasurementKey], fold_func: Optional[Callable[[tuple], Any]] = None
+    ) -> Counter:
+        """Counts the number of times combined measurement results occurred.
+
+        See :meth:`cirq.Result.multi_measurement_histogram`. If ``fold_func`` is not given, the results are tuples
+        of big-endian integers, and the histogram of packed measurement results is computed without unpacking them.
+        """
+        keys = list(keys)
+        if fold_func is not None:
+            return super().multi_measurement_histogram(keys=keys, fold_func=fold_func)
+        packed = [self._packed_bits(key) for key in keys]
+        if not keys or any(bits is None for bits in packed):
+            return super().multi_measurement_histogram(keys=keys)
+        return _combined_histogram([bits for bits in packed if bits is not None])
+
+    def _packed_bits(self, key: TMeasurementKey) -> Optional[PackedBits]:
+        """Packed measurement results of the given key, or None if they are not packed."""
+        if self._packed_measurements is None:
+            return None
+        bits = self._packed_measurements.get(_key_name(key))
+        return bits if isinstance(bits, PackedBits) else None
+
+
+@dataclass
+class IQMCounts:
+    """Numbers of times each measurement outcome occurred in the execution of a quantum circuit.
+
+    Unlike :class:`IQMResult`, the individual shots are not stored, so the memory use depends on the number of
+    distinct outcomes instead of the number of shots.
+    """
+
+    measurement_keys: tuple[str, ...]
+    """measurement keys of the circuit, in the order of the results in each outcome"""
+    counts: Counter
+    """maps outcomes, tuples of big-endian integers with one result for each measurement key, to the number of shots
+    they occurred in"""
+    metadata: ResultMetadata
+    """metadata of the circuit execution"""
+    params: cirq.ParamResolver = field(default_factory=cirq.ParamResolver)
+    """parameter resolver used for the circuit"""
+
+    @classmethod
+    def from_counts(
+        cls,
+        counts: Counts,
+        num_bits: Mapping[str, int],
+        metadata: ResultMetadata,
+        params: Optional[cirq.ParamResolver] = None,
+    ) -> IQMCounts:
+        """Converts the counts computed by the IQM server.
+
+        Args:
+            counts: counts of one circuit, with the outcomes as concatenated bitstrings of the measurement keys
+            num_bits: number of bits measured with each measurement key of the circuit
+            metadata: metadata of the circuit execution
+            params: parameter resolver used for the circuit
+        """
+        keys = tuple(counts.measurement_keys)
+        offsets = np.cumsum([0] + [num_bits[key] for key in keys]).tolist()
+        outcomes: Counter = Counter()
+        for bitstring, count in counts.counts.items():
+            outcomes[tuple(int(bitstring[start:end] or '0', 2) for start, end in zip(offsets, offsets[1:]))] += count
+        return cls(keys, outcomes, metadata, params if params is not None else cirq.ParamResolver())
+
+    @classmethod
+    def from_packed_bits(
+        cls,
+        measurements: Mapping[str, PackedBits],
+        metadata: ResultMetadata,
+        params: Optional[cirq.ParamResolver] = None,
+    ) -> IQMCounts:
+        """Counts the outcomes of packed measurement results.
+
+        Args:
+            measurements: measurement results of one circuit
+            metadata: metadata of the circuit execution
+            params: parameter resolver used for the circuit
+        """
+        return cls(
+            tuple(measurements),
+            _combined_histogram(list(measurements.values())),
+            metadata,
+            params if params is not None else cirq.ParamResolver(),
+        )
+
+    @property
+    def repetitions(self) -> int:
+        """Number of times the circuit was sampled."""
+        return sum(self.counts.values())
+
+    def histogram(self, *, key: TMeasurementKey) -> Counter:
+        """Counts the number of times a measurement result occurred.
+
+        Same as :meth:`IQMResult.histogram` without a fold function, the results are big-endian integers.
+        """
+        return Counter({outcome[0]: count for outcome, count in self.multi_measurement_histogram(keys=[key]).items()})
+
+    def multi_measurement_histogram(self, *, keys: Iterable[TMeasurementKey]) -> Counter:
+        """Counts the number of times combined measurement results occurred.
+
+        Same as :meth:`IQMResult.multi_measurement_histogram` without a fold function, the results are tuples of
+        big-endian integers.
+        """
+        positions = {key: i for i, key in enumerate(self.measurement_keys)}
+        indices = [positions[_key_name(key)] for key in keys]
+        histogram: Counter = Counter()
+        for outcome, count in self.counts.items():
+            histogram[tuple(outcome[i] for i in indices)] += count
+        return histogram
+
+
+def _key_name(key: TMeasurementKey) -> str:
+    """Name of a measurement key given like in :meth:`cirq.Result.histogram`."""
+    if isinstance(key, str):
+        return key
+    if isinstance(key, cirq.Qid):
+        return str(key)
+    return ','.join(str(qubit) for qubit in key)
+
+
+def _combined_histogram(packed: list[PackedBits]) -> Counter:
+    """Counts the combinations of the shots of several measurement keys, as tuples of big-endian integers."""
+    if len(packed) == 1:
+        return Counter({(value,): count for value, count in packed[0].histogram().items()})
+    if not packed:
+        return Counter()
+    # count the distinct combinations of the distinct shots of each key
+    uniques = [bits.unique() for bits in packed]
+    combinations, counts = np.unique(
+        np.stack([inverse for _, inverse, _ in uniques], axis=1), axis=0, return_counts=True
+    )
+    return Counter(
+        {
+            tuple(values[index] for (values, _, _), index in zip(uniques, combination)): count
+            for combination, count in zip(combinations.tolist(), counts.tolist())
+        }
+    )
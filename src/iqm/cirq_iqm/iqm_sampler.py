@@ -17,22 +17,47 @@ Circuit sampler that executes quantum circuits on an IQM quantum computer.
 """
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+from collections import deque
+from concurrent import futures
 from importlib.metadata import version
+import itertools
+import os
 import sys
-from typing import Mapping, Optional
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, NoReturn, Optional, Sequence
 from uuid import UUID
 import warnings
 
 import cirq
 import numpy as np
+from requests import HTTPError
 
+from iqm.cirq_iqm.architecture_cache import ArchitectureCache, ArchitectureStore
 from iqm.cirq_iqm.devices.iqm_device import IQMDevice, IQMDeviceMetadata
-from iqm.cirq_iqm.serialize import serialize_circuit
-from iqm.iqm_client import CircuitCompilationOptions, IQMClient, JobAbortionError, RunRequest
-
-
-class IQMSampler(cirq.work.Sampler):
+from iqm.cirq_iqm.iqm_result import IQMCounts, IQMResult, PackedBits, ResultMetadata
+from iqm.cirq_iqm.serialize import CircuitTemplate, serialize_circuit
+from iqm.iqm_client import (
+    DEFAULT_TIMEOUT_SECONDS,
+    SECONDS_BETWEEN_CALLS,
+    APITimeoutError,
+    Circuit,
+    CircuitCompilationOptions,
+    IQMClient,
+    JobAbortionError,
+    RunRequest,
+    RunResult,
+    Status,
+)
+
+# statuses of jobs that have not finished yet
+_PENDING_STATUSES = frozenset(
+    {Status.RECEIVED, Status.PROCESSING, Status.ACCEPTED, Status.PENDING_COMPILATION, Status.PENDING_EXECUTION}
+)
+
+
+class IQMSampler(cirq.work.Sampler):  # pylint: disable=too-many-instance-attributes
     """Circuit sampler for executing quantum circuits on IQM quantum computers.
 
     IQMSampler connects to a quantum computer through an IQM server.
@@ -50,6 +75,22 @@ class IQMSampler(cirq.work.Sampler):
         run_sweep_timeout:
             Timeout for polling sweep results, in seconds. If ``None``, use the client default value.
         compiler_options: The compilation options to use for the circuits, as defined by IQM Client.
+        max_batch_size: Maximum number of circuits submitted in a single job when running a parameter sweep.
+            Longer sweeps are split into batches of at most this many circuits, see :meth:`iter_sweep`.
+            If ``None``, the whole sweep is submitted as one job.
+        max_batches_in_flight: Maximum number of batches of a sweep executing at the same time.
+        pack_results: If True, the measurement results are stored in :class:`IQMResult` packed into bits, using 8 times
+            less memory, and unpacked only when they are accessed.
+        architecture_ttl: Time in seconds for which the dynamic quantum architecture of the default calibration set
+            is cached when checking whether the default calibration set has changed before submitting circuits.
+            If ``None``, it is cached until refreshed using :attr:`architecture_cache`.
+        architecture_refresh_interval: If given, the dynamic quantum architecture of the default calibration set is
+            refreshed every this many seconds in a background thread, instead of when submitting circuits.
+            The thread stops when :meth:`close_client` is called or the sampler is garbage collected.
+        architecture_cache_dir: If given, the dynamic quantum architecture and the device metadata derived from it
+            are saved in this directory in an :class:`.ArchitectureStore`, and loaded from there by later samplers
+            using the same server and calibration set instead of fetching the architecture. A loaded architecture of
+            the default calibration set is refreshed when circuits are first submitted.
     """
 
     def __init__(
@@ -60,12 +101,42 @@ class IQMSampler(cirq.work.Sampler):
         calibration_set_id: Optional[UUID] = None,
         run_sweep_timeout: Optional[int] = None,
         compiler_options: Optional[CircuitCompilationOptions] = None,
+        max_batch_size: Optional[int] = None,
+        max_batches_in_flight: int = 2,
+        pack_results: bool = False,
+        architecture_ttl: Optional[float] = 60.0,
+        architecture_refresh_interval: Optional[float] = None,
+        architecture_cache_dir: Optional[str | os.PathLike] = None,
         **user_auth_args,  # contains keyword args auth_server_url, username and password
-    ):
+    ):  # pylint: disable=too-many-arguments
+        if max_batch_size is not None and max_batch_size < 1:
+            raise ValueError(f'max_batch_size must be positive, got {max_batch_size}.')
+        if max_batches_in_flight < 1:
+            raise ValueError(f'max_batches_in_flight must be positive, got {max_batches_in_flight}.')
         version_string = 'cirq-iqm'
         self._client = IQMClient(url, client_signature=f'cirq-iqm {version(version_string)}', **user_auth_args)
-        dqa = self._client.get_dynamic_quantum_architecture(calibration_set_id)
-        server_device_metadata = IQMDeviceMetadata.from_architecture(dqa)
+        store = ArchitectureStore(architecture_cache_dir) if architecture_cache_dir is not None else None
+        saved_metadata = store.load(url, calibration_set_id) if store is not None else None
+        # the cache must not refer to the sampler, so that the background refresher does not keep it alive
+        client = self._client
+        self._architecture_cache = ArchitectureCache(
+            lambda: client.get_dynamic_quantum_architecture(calibration_set_id),
+            architecture_ttl,
+            saved_metadata.architecture if saved_metadata is not None else None,
+        )
+        if saved_metadata is not None and saved_metadata.architecture is not None:
+            dqa, server_device_metadata = saved_metadata.architecture, saved_metadata
+        else:
+            dqa = self._architecture_cache.get()
+            server_device_metadata = IQMDeviceMetadata.from_architecture(dqa)
+            if store is not None:
+                store.save(url, calibration_set_id, server_device_metadata)
+        if store is not None and calibration_set_id is None:
+            # save the new default calibration set for the samplers created later
+            save = store.save
+            self._architecture_cache.add_listener(
+                lambda _, new: save(url, None, IQMDeviceMetadata.from_architecture(new))
+            )
         self._use_default_calibration_set = calibration_set_id is None
         self._calibration_set_id = dqa.calibration_set_id
         if device is None:
@@ -82,25 +153,46 @@ class IQMSampler(cirq.work.Sampler):
             self._device = device
         self._run_sweep_timeout = run_sweep_timeout
         self._compiler_options = compiler_options if compiler_options is not None else CircuitCompilationOptions()
+        self._max_batch_size = max_batch_size
+        self._max_batches_in_flight = max_batches_in_flight
+        self._pack_results = pack_results
+        self._poller: Optional[_JobPoller] = None
+        if architecture_refresh_interval is not None and self._use_default_calibration_set:
+            self._architecture_cache.start_refreshing(architecture_refresh_interval)
 
     @property
     def device(self) -> IQMDevice:
         """Returns the device used by the sampler."""
         return self._device
 
+    @property
+    def architecture_cache(self) -> ArchitectureCache:
+        """Cache of the dynamic quantum architecture of the calibration set used by the sampler.
+
+        If the sampler uses the default calibration set of the server, the cached architecture is used to check
+        whether the default calibration set has changed before submitting circuits. Use
+        :meth:`.ArchitectureCache.refresh` to fetch it immediately, and :meth:`.ArchitectureCache.add_listener` to
+        be notified when it changes.
+        """
+        return self._architecture_cache
+
     def close_client(self):
         """Close IQMClient's session with the user authentication server. Discard the client."""
         if not self._client:
             return
+        self._architecture_cache.stop_refreshing()
         self._client.close_auth_session()
         self._client = None
 
     def run_sweep(  # type: ignore[override]
         self, program: cirq.Circuit, params: cirq.Sweepable, repetitions: int = 1
     ) -> list[IQMResult]:
-        circuits, resolvers = self._resolve_parameters(program, params)
+        resolvers = list(cirq.to_resolvers(params))
+        if self._max_batch_size is not None and len(resolvers) > self._max_batch_size:
+            return list(self.iter_sweep(program, resolvers, repetitions))
         results, metadata = self._send_circuits(
-            circuits,
+            program,
+            params=resolvers,
             repetitions=repetitions,
         )
         return [
@@ -108,6 +200,51 @@ class IQMSampler(cirq.work.Sampler):
             for result, resolver in zip(results, resolvers)
         ]
 
+    def iter_sweep(self, program: cirq.Circuit, params: cirq.Sweepable, repetitions: int = 1) -> Iterator[IQMResult]:
+        """Samples from the given circuit, yielding the results in the order of the sweep.
+
+        The sweep is split into batches of at most ``max_batch_size`` circuits, each submitted as a separate job.
+        Up to ``max_batches_in_flight`` jobs are kept executing: the next batch is resolved and submitted while
+        the earlier ones are still running, and the results of each batch are yielded once it has finished.
+        The sweep is consumed lazily and only the batches in flight are held in memory, so the memory use is bounded
+        by the batch size instead of the length of the sweep. :meth:`run_sweep` uses this method for sweeps longer
+        than ``max_batch_size``.
+
+        If the iteration is stopped early or fails, the jobs still executing are aborted.
+
+        Args:
+            program: circuit to sample from
+            params: parameters to run with the program
+            repetitions: number of times the circuit is sampled
+
+        Yields:
+            results of the execution, one for each parameter resolver
+
+        Raises:
+            ValueError: circuit is not valid for execution
+            CircuitExecutionError: something went wrong on the server
+            APITimeoutError: server did not return the results of a batch in the allocated time
+            RuntimeError: IQM client session has been closed
+        """
+        template = CircuitTemplate(program)
+        self._check_submission([program])
+        resolvers = _iter_resolvers(params)
+        in_flight: deque[IQMJob] = deque()
+        try:
+            while True:
+                if len(in_flight) == self._max_batches_in_flight:
+                    yield from in_flight.popleft().result()
+                batch = list(itertools.islice(resolvers, self._max_batch_size))
+                if not batch:
+                    break
+                run_request = self._create_run_request(template.bind(batch), repetitions)
+                in_flight.append(self._submit_run_request(run_request, batch))
+            while in_flight:
+                yield from in_flight.popleft().result()
+        finally:
+            for job in in_flight:
+                job.cancel()
+
     def run_iqm_batch(self, programs: list[cirq.Circuit], repetitions: int = 1) -> list[IQMResult]:
         """Sends a batch of circuits to be executed.
 
@@ -133,6 +270,162 @@ class IQMSampler(cirq.work.Sampler):
         )
         return [IQMResult(measurements=result, metadata=metadata) for result in results]
 
+    async def run_sweep_async(  # type: ignore[override]
+        self, program: cirq.Circuit, params: cirq.Sweepable, repetitions: int = 1
+    ) -> list[IQMResult]:
+        """Asynchronously samples from the given circuit.
+
+        Unlike the default implementation of :class:`cirq.Sampler`, this is a native :mod:`asyncio` coroutine.
+        The job is submitted and polled using short calls to the IQM server made in the default executor of the
+        event loop, so no thread is tied up while waiting for the results. :meth:`run_async` is based on this method.
+
+        Sweeps longer than ``max_batch_size`` are split into batches like in :meth:`iter_sweep`, of which
+        ``max_batches_in_flight`` are executed concurrently. The circuit is serialized only once for all the batches.
+        If the coroutine is cancelled while a job is being submitted or running, the job is aborted on the server.
+
+        Args:
+            program: circuit to sample from
+            params: parameters to run with the program
+            repetitions: number of times the circuit is sampled
+
+        Returns:
+            results of the execution, one for each parameter resolver
+        """
+        resolvers = list(cirq.to_resolvers(params))
+        size = self._max_batch_size or max(len(resolvers), 1)
+        # an empty sweep is submitted as a single job of the unresolved circuit, like in run_sweep
+        batches = [resolvers[i : i + size] for i in range(0, len(resolvers), size)] or [resolvers]
+        semaphore = asyncio.Semaphore(self._max_batches_in_flight)
+        template = await asyncio.to_thread(CircuitTemplate, program)
+        await asyncio.to_thread(self._check_submission, [program])
+
+        def create_run_request(batch: list[cirq.ParamResolver]) -> RunRequest:
+            circuits = template.bind(batch) if batch else [serialize_circuit(program)]
+            return self._create_run_request(circuits, repetitions)
+
+        async def run_batch(batch: list[cirq.ParamResolver]) -> list[IQMResult]:
+            async with semaphore:
+                run_request = await asyncio.to_thread(create_run_request, batch)
+                results, metadata = await self._send_run_request_async(run_request)
+            return [
+                IQMResult(measurements=result, params=resolver, metadata=metadata)
+                for result, resolver in zip(results, batch)
+            ]
+
+        return [result for batch_results in await asyncio.gather(*map(run_batch, batches)) for result in batch_results]
+
+    async def run_batch_async(  # type: ignore[override]
+        self,
+        programs: Sequence[cirq.Circuit],
+        params_list: Optional[Sequence[cirq.Sweepable]] = None,
+        repetitions: int | Sequence[int] = 1,
+    ) -> list[list[IQMResult]]:
+        """Asynchronously samples from the given circuits.
+
+        Each circuit is submitted as a separate job using :meth:`run_sweep_async`, and the jobs are polled
+        concurrently. See :meth:`cirq.Sampler.run_batch` for the arguments.
+
+        If the coroutine is cancelled, the jobs that are still running are aborted on the server.
+        """
+        params_list, repetitions = self._normalize_batch_args(programs, params_list, repetitions)
+        return list(
+            await asyncio.gather(
+                *(
+                    self.run_sweep_async(program, params, reps)
+                    for program, params, reps in zip(programs, params_list, repetitions)
+                )
+            )
+        )
+
+    def run_counts(
+        self, programs: cirq.Circuit | list[cirq.Circuit], *, params: cirq.Sweepable = None, repetitions: int = 1
+    ) -> list[IQMCounts]:
+        """Executes circuits, and returns the number of times each measurement outcome occurred.
+
+        This takes the same parameters as :meth:`create_run_request`. Only the counts of the distinct outcomes are
+        kept instead of the individual shots, so the memory use of the results depends on the number of distinct
+        outcomes instead of the number of shots.
+
+        The counts are computed by the IQM server if it supports it, so the individual shots are never fetched.
+        Otherwise the measurement results of all the circuits are fetched and parsed at once, so the peak memory use
+        is proportional to the total number of shots, as with :meth:`run_sweep`. The shots are then reduced into
+        counts one circuit at a time.
+
+        Args:
+            programs: quantum circuit(s) to execute
+            params: parameters to resolve a single circuit with, see :meth:`create_run_request`
+            repetitions: number of times the circuits are sampled
+
+        Returns:
+            counts of the execution, one for each circuit or parameter resolver
+
+        Raises:
+            ValueError: circuits are not valid for execution
+            CircuitExecutionError: something went wrong on the server
+            APITimeoutError: server did not return the results in the allocated time
+            RuntimeError: IQM client session has been closed
+        """
+        run_request = self.create_run_request(programs, params=params, repetitions=repetitions)
+        if isinstance(programs, cirq.Circuit):
+            resolvers = list(cirq.to_resolvers(params))
+        else:
+            resolvers = [cirq.ParamResolver() for _ in programs]
+        job_id = self._client.submit_run_request(run_request)
+        self._wait_for_job(job_id)
+
+        try:
+            counts_batch = self._client.get_run_counts(job_id).counts_batch
+        except HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+            counts_batch = None  # the server does not compute counts
+
+        if counts_batch is not None:
+            metadata = ResultMetadata(job_id, run_request.calibration_set_id, run_request)
+            return [
+                IQMCounts.from_counts(counts, _measurement_widths(circuit), metadata, resolver)
+                for counts, circuit, resolver in zip(counts_batch, run_request.circuits, resolvers)
+            ]
+
+        results = self._client.get_run(job_id)
+        if results.measurements is None:
+            raise RuntimeError('No measurements returned from IQM quantum computer.')
+        metadata = ResultMetadata(job_id, results.metadata.calibration_set_id, run_request)  # pylint: disable=no-member
+        # reduce the shots of one circuit at a time into counts, dropping them from the results before the next one,
+        # so that the shots of the circuits already reduced can be freed while the rest are processed
+        measurements_batch = results.measurements
+        measurements_batch.reverse()
+        counts = []
+        for circuit, resolver in zip(run_request.circuits, resolvers):
+            packed = _pack_measurements(measurements_batch.pop(), _measurement_widths(circuit))
+            counts.append(IQMCounts.from_packed_bits(packed, metadata, resolver))
+        return counts
+
+    def submit(
+        self, programs: cirq.Circuit | list[cirq.Circuit], *, params: cirq.Sweepable = None, repetitions: int = 1
+    ) -> IQMJob:
+        """Submits circuits for execution without waiting for the results.
+
+        This takes the same parameters as :meth:`create_run_request`. The job is polled in a background thread
+        shared by all the jobs submitted using this sampler, so any number of jobs can be kept in flight without
+        blocking the caller. Use :meth:`IQMJob.result` or :func:`wait_for_jobs` to collect the results.
+
+        Args:
+            programs: quantum circuit(s) to execute
+            params: parameters to resolve a single circuit with, see :meth:`create_run_request`
+            repetitions: number of times the circuits are sampled
+
+        Returns:
+            handle of the submitted job
+
+        Raises:
+            ValueError: circuits are not valid for execution
+            RuntimeError: IQM client session has been closed
+        """
+        run_request = self.create_run_request(programs, params=params, repetitions=repetitions)
+        resolvers = list(cirq.to_resolvers(params)) if isinstance(programs, cirq.Circuit) else None
+        return self._submit_run_request(run_request, resolvers)
+
     def create_run_request(
         self, programs: cirq.Circuit | list[cirq.Circuit], *, params: cirq.Sweepable = None, repetitions: int = 1
     ) -> RunRequest:
@@ -141,6 +434,9 @@ class IQMSampler(cirq.work.Sampler):
         This takes the same parameters as :meth:`run` and :meth:`run_iqm_batch`, and can be used to check the
         run request that would be sent when calling those functions.
 
+        If ``programs`` is a single circuit, it is serialized only once into a :class:`.CircuitTemplate`, which is
+        then bound to each of the parameter resolvers in ``params``.
+
         Args:
             programs: quantum circuit(s) that would be executed when submitting the run request
             params: same as ``params`` for :meth:`run`, used only if ``programs`` is not a list
@@ -150,10 +446,18 @@ class IQMSampler(cirq.work.Sampler):
             the created run request
         """
         if isinstance(programs, cirq.Circuit):
-            programs, _ = self._resolve_parameters(programs, params)
+            resolvers = list(cirq.to_resolvers(params))
+            template = CircuitTemplate(programs)
+            serialized_circuits = template.bind(resolvers) if resolvers else [serialize_circuit(programs)]
+            programs = [programs]
+        else:
+            serialized_circuits = [serialize_circuit(circuit) for circuit in programs]
 
-        serialized_circuits = [serialize_circuit(circuit) for circuit in programs]
+        self._check_submission(programs)
+        return self._create_run_request(serialized_circuits, repetitions)
 
+    def _check_submission(self, programs: list[cirq.Circuit]) -> None:
+        """Checks that the circuits can be submitted, warning if they were compiled for another calibration set."""
         if not self._client:
             raise RuntimeError('Cannot submit circuits since session to IQM client has been closed.')
 
@@ -171,7 +475,7 @@ class IQMSampler(cirq.work.Sampler):
                 f'Decompose/route the circuits using this sampler to ensure successful execution.'
             )
         if self._use_default_calibration_set:
-            default_calset_id = self._client.get_dynamic_quantum_architecture(None).calibration_set_id
+            default_calset_id = self._architecture_cache.get().calibration_set_id
             if self._calibration_set_id != default_calset_id:
                 warnings.warn(
                     f'Server default calibration set has changed from {self._calibration_set_id} '
@@ -179,6 +483,7 @@ class IQMSampler(cirq.work.Sampler):
                     'the new calibration set to ensure successful execution.'
                 )
 
+    def _create_run_request(self, serialized_circuits: list[Circuit], repetitions: int) -> RunRequest:
         return self._client.create_run_request(
             serialized_circuits,
             calibration_set_id=self._calibration_set_id,
@@ -186,22 +491,38 @@ class IQMSampler(cirq.work.Sampler):
             options=self._compiler_options,
         )
 
+    def _submit_run_request(
+        self, run_request: RunRequest, resolvers: Optional[list[cirq.ParamResolver]] = None
+    ) -> IQMJob:
+        """Submits the run request, and starts polling the job in the background."""
+        job_id = self._client.submit_run_request(run_request)
+        job = IQMJob(self, job_id, run_request, resolvers)
+        if self._poller is None:
+            self._poller = _JobPoller(self)
+        self._poller.add(
+            job, self._run_sweep_timeout if self._run_sweep_timeout is not None else DEFAULT_TIMEOUT_SECONDS
+        )
+        return job
+
     def _send_circuits(
         self,
-        circuits: list[cirq.Circuit],
+        circuits: cirq.Circuit | list[cirq.Circuit],
+        *,
+        params: cirq.Sweepable = None,
         repetitions: int = 1,
-    ) -> tuple[list[dict[str, np.ndarray]], ResultMetadata]:
+    ) -> tuple[list[dict[str, np.ndarray | PackedBits]], ResultMetadata]:
         """Sends a batch of circuits to be executed and retrieves the results.
 
         If a user interrupts the program while it is waiting for results, attempts to abort the submitted job.
         Args:
-            circuits: quantum circuits to execute
+            circuits: quantum circuit(s) to execute
+            params: parameters to resolve a single circuit with, see :meth:`create_run_request`
             repetitions: number of shots to sample from each circuit
 
         Returns:
             circuit execution results, result metadata
         """
-        run_request = self.create_run_request(circuits, repetitions=repetitions)
+        run_request = self.create_run_request(circuits, params=params, repetitions=repetitions)
         job_id = self._client.submit_run_request(run_request)
 
         timeout_arg = [self._run_sweep_timeout] if self._run_sweep_timeout is not None else []
@@ -210,64 +531,348 @@ class IQMSampler(cirq.work.Sampler):
             results = self._client.wait_for_results(job_id, *timeout_arg)
 
         except KeyboardInterrupt:
-            try:
-                self._client.abort_job(job_id)
-            except JobAbortionError as e:
-                warnings.warn(f'Failed to abort job: {e}')
-            finally:
-                sys.exit()
+            self._abort_and_exit(job_id)
 
-        if results.measurements is None:
-            raise RuntimeError('No measurements returned from IQM quantum computer.')
+        return _parse_run_result(results, job_id, run_request, self._pack_results)
 
-        return (  # pylint: disable=not-an-iterable,no-member
-            [{k: np.array(v) for k, v in measurements.items()} for measurements in results.measurements],
-            ResultMetadata(job_id, results.metadata.calibration_set_id, run_request),
-        )
+    def _wait_for_job(self, job_id: UUID) -> None:
+        """Waits for the job to finish without fetching its results.
 
-    @staticmethod
-    def _resolve_parameters(
-        program: cirq.Circuit, params: cirq.Sweepable
-    ) -> tuple[list[cirq.Circuit], list[cirq.ParamResolver]]:
-        resolvers = list(cirq.to_resolvers(params))
-        circuits = [cirq.protocols.resolve_parameters(program, res) for res in resolvers] if resolvers else [program]
-        return circuits, resolvers
+        If a user interrupts the program while it is waiting, attempts to abort the job.
+        """
+        timeout = self._run_sweep_timeout if self._run_sweep_timeout is not None else DEFAULT_TIMEOUT_SECONDS
+        deadline = time.monotonic() + timeout
+        try:
+            while self._client.get_run_status(job_id).status in _PENDING_STATUSES:
+                if time.monotonic() >= deadline:
+                    raise APITimeoutError(f"The job didn't finish in {timeout} seconds.")
+                time.sleep(SECONDS_BETWEEN_CALLS)
+
+        except KeyboardInterrupt:
+            self._abort_and_exit(job_id)
+
+    def _abort_and_exit(self, job_id: UUID) -> NoReturn:
+        """Attempts to abort the job, and exits the program."""
+        try:
+            self._client.abort_job(job_id)
+        except JobAbortionError as e:
+            warnings.warn(f'Failed to abort job: {e}')
+        finally:
+            sys.exit()
+
+    async def _send_run_request_async(
+        self, run_request: RunRequest
+    ) -> tuple[list[dict[str, np.ndarray | PackedBits]], ResultMetadata]:
+        """Asynchronous version of :meth:`_send_circuits` for a run request that has already been created.
+
+        The blocking calls to the IQM server are made in the default executor of the event loop, and the job is
+        polled every ``SECONDS_BETWEEN_CALLS`` seconds. If the coroutine is cancelled while the run request is being
+        submitted or while waiting for the results, attempts to abort the submitted job.
+        """
+        client = self._client
+        submission = asyncio.ensure_future(asyncio.to_thread(client.submit_run_request, run_request))
+        try:
+            job_id = await asyncio.shield(submission)
+        except asyncio.CancelledError:
+            # the submission cannot be interrupted, so wait for it to finish and abort the submitted job
+            await asyncio.wait([submission])
+            if submission.exception() is None:
+                await _abort_job_async(client, submission.result())
+            raise
+
+        timeout = self._run_sweep_timeout if self._run_sweep_timeout is not None else DEFAULT_TIMEOUT_SECONDS
+        deadline = time.monotonic() + timeout
+        try:
+            while (results := await asyncio.to_thread(_poll_job, client, job_id)) is None:
+                if time.monotonic() >= deadline:
+                    raise APITimeoutError(f"The job didn't finish in {timeout} seconds.")
+                await asyncio.sleep(SECONDS_BETWEEN_CALLS)
 
+        except asyncio.CancelledError:
+            await _abort_job_async(client, job_id)
+            raise
 
-@dataclass
-class ResultMetadata:
-    """Metadata for an IQM execution result.
+        return _parse_run_result(results, job_id, run_request, self._pack_results)
 
-    Attributes:
-        job_id: ID of the computational job.
-        calibration_set_id: Calibration set used for this :class:`.IQMResult`.
-        request: Request made to run the job.
+
+async def _abort_job_async(client: IQMClient, job_id: UUID) -> None:
+    """Aborts the job in the default executor of the event loop, warning if it fails."""
+    try:
+        await asyncio.to_thread(client.abort_job, job_id)
+    except JobAbortionError as e:
+        warnings.warn(f'Failed to abort job: {e}')
+
+
+def _iter_resolvers(params: cirq.Sweepable) -> Iterator[cirq.ParamResolver]:
+    """Lazy version of :func:`cirq.to_resolvers`, which does not expand iterables of sweepables into lists."""
+    if isinstance(params, Iterable) and not isinstance(params, (cirq.Sweep, dict, str)):
+        for item in params:
+            yield from cirq.to_resolvers(item)
+    else:
+        yield from cirq.to_resolvers(params)
+
+
+def _poll_job(client: IQMClient, job_id: UUID) -> Optional[RunResult]:
+    """Results of the job if it has finished, or None if it is still pending."""
+    if client.get_run_status(job_id).status in _PENDING_STATUSES:
+        return None
+    return client.get_run(job_id)
+
+
+def _measurement_widths(circuit: Circuit) -> dict[str, int]:
+    """Number of bits measured with each measurement key of a serialized circuit."""
+    return {
+        instruction.args['key']: len(instruction.qubits)
+        for instruction in circuit.instructions
+        if instruction.name == 'measure'
+    }
+
+
+def _pack_measurements(measurements: dict[str, list[list[int]]], widths: dict[str, int]) -> dict[str, PackedBits]:
+    """Packs the measurement results of a circuit as returned by the server.
+
+    Args:
+        measurements: shots of each measurement key
+        widths: number of bits measured with each measurement key, which an empty list of shots does not tell
     """
+    return {
+        key: PackedBits.pack(np.array(bits, dtype=np.uint8).reshape(-1, widths[key]))
+        for key, bits in measurements.items()
+    }
 
-    job_id: UUID
-    calibration_set_id: Optional[UUID]
-    request: RunRequest
 
+def _parse_run_result(
+    results: RunResult, job_id: UUID, run_request: RunRequest, pack: bool = False
+) -> tuple[list[dict[str, np.ndarray | PackedBits]], ResultMetadata]:
+    """Measurement arrays and result metadata of a finished job."""
+    if results.measurements is None:
+        raise RuntimeError('No measurements returned from IQM quantum computer.')
 
-class IQMResult(cirq.ResultDict):
-    """Stores the results of a quantum circuit execution on an IQM device.
+    return (  # pylint: disable=no-member
+        _decode_measurements(results.measurements, pack),
+        ResultMetadata(job_id, results.metadata.calibration_set_id, run_request),
+    )
+
+
+def _decode_measurements(
+    measurements: list[dict[str, list[list[int]]]], pack: bool = False
+) -> list[dict[str, np.ndarray | PackedBits]]:
+    """Converts the measurement results of a batch of circuits into arrays of bits of dtype uint8.
+
+    The results of each measurement key are converted using a single NumPy call for the whole batch if they have the
+    same shape in every circuit, in which case the arrays of the individual circuits are views of the batch array.
+
+    Args:
+        measurements: measurement results of each circuit, as returned by the server
+        pack: iff True, pack the bits of each shot using :func:`numpy.packbits`
+
+    Returns:
+        measurement results of each circuit, as arrays of shape ``(shots, qubits)`` or :class:`PackedBits`
+    """
+    decoded: list[dict[str, np.ndarray | PackedBits]] = [{} for _ in measurements]
+    for key in dict.fromkeys(key for circuit_measurements in measurements for key in circuit_measurements):
+        indices = [i for i, circuit_measurements in enumerate(measurements) if key in circuit_measurements]
+        try:
+            arrays = list(np.array([measurements[i][key] for i in indices], dtype=np.uint8))
+        except ValueError:  # the number of shots or qubits varies between the circuits
+            arrays = [np.array(measurements[i][key], dtype=np.uint8) for i in indices]
+        for i, bits in zip(indices, arrays):
+            decoded[i][key] = PackedBits.pack(bits) if pack and bits.ndim == 2 else bits
+    return decoded
+
+
+class IQMJob:
+    """Handle of a job submitted for execution using :meth:`IQMSampler.submit`.
+
+    The job is polled in the background, and its results are available using :meth:`result` once it has finished.
 
     Args:
-        params: Parameter resolver used for this circuit, if any.
-        measurements: Maps measurement keys to measurement results, which are 2-D arrays of dtype bool.
-            `shape == (repetitions, qubits)`.
-        records: Maps measurement keys to measurement results, which are 3D arrays of dtype bool.
-            `shape == (repetitions, instances, qubits)`.
-        metadata: Metadata for the circuit execution results.
+        sampler: sampler the job was submitted with
+        job_id: ID of the job
+        run_request: request the job was submitted with
+        resolvers: parameter resolvers of the results if a single circuit was submitted, otherwise None
     """
 
     def __init__(
         self,
-        *,
-        params: Optional[cirq.ParamResolver] = None,
-        measurements: Optional[Mapping[str, np.ndarray]] = None,
-        records: Optional[Mapping[str, np.ndarray]] = None,
-        metadata: ResultMetadata,
-    ) -> None:
-        super().__init__(params=params, measurements=measurements, records=records)
-        self.metadata = metadata
+        sampler: IQMSampler,
+        job_id: UUID,
+        run_request: RunRequest,
+        resolvers: Optional[list[cirq.ParamResolver]] = None,
+    ):
+        self._sampler = sampler
+        self._job_id = job_id
+        self._run_request = run_request
+        self._resolvers = resolvers
+        self._future: futures.Future[list[IQMResult]] = futures.Future()
+
+    @property
+    def job_id(self) -> UUID:
+        """ID of the job."""
+        return self._job_id
+
+    @property
+    def run_request(self) -> RunRequest:
+        """Request the job was submitted with."""
+        return self._run_request
+
+    def done(self) -> bool:
+        """True iff the job has finished, failed or been cancelled."""
+        return self._future.done()
+
+    def cancelled(self) -> bool:
+        """True iff the job has been cancelled using :meth:`cancel`."""
+        return self._future.cancelled()
+
+    def result(self, timeout: Optional[float] = None) -> list[IQMResult]:
+        """Waits for the job to finish and returns its results.
+
+        Args:
+            timeout: maximum time to wait, in seconds. If ``None``, wait until the job has finished.
+
+        Returns:
+            results of the execution, one for each circuit or parameter resolver
+
+        Raises:
+            TimeoutError: the job did not finish within ``timeout``
+            CancelledError: the job has been cancelled
+            CircuitExecutionError: something went wrong on the server
+            APITimeoutError: server did not return the results in the allocated time
+        """
+        return self._future.result(timeout)
+
+    def exception(self, timeout: Optional[float] = None) -> Optional[BaseException]:
+        """Waits for the job to finish and returns the exception it failed with, or None if it succeeded.
+
+        Args:
+            timeout: maximum time to wait, in seconds. If ``None``, wait until the job has finished.
+        """
+        return self._future.exception(timeout)
+
+    def add_done_callback(self, fn: Callable[[IQMJob], Any]) -> None:
+        """Calls ``fn`` with the job once it has finished, failed or been cancelled.
+
+        The callback is called in the polling thread, or immediately if the job has already finished.
+        """
+        self._future.add_done_callback(lambda _: fn(self))
+
+    def cancel(self) -> bool:
+        """Aborts the job on the server.
+
+        Returns:
+            True iff the job was aborted, False if it has already finished or aborting it failed
+        """
+        if self._future.done():
+            return False
+        client = self._sampler._client
+        if not client:
+            raise RuntimeError('Cannot abort the job since session to IQM client has been closed.')
+        try:
+            client.abort_job(self._job_id)
+        except JobAbortionError as e:
+            warnings.warn(f'Failed to abort job: {e}')
+            return False
+        return self._future.cancel()
+
+    def _set_run_result(self, run_result: RunResult) -> None:
+        """Completes the job using the results returned by the server."""
+        measurements, metadata = _parse_run_result(
+            run_result, self._job_id, self._run_request, self._sampler._pack_results
+        )
+        if self._resolvers is None:
+            results = [IQMResult(measurements=m, metadata=metadata) for m in measurements]
+        else:
+            results = [
+                IQMResult(measurements=m, params=resolver, metadata=metadata)
+                for m, resolver in zip(measurements, self._resolvers)
+            ]
+        self._set(self._future.set_result, results)
+
+    def _set_exception(self, exception: BaseException) -> None:
+        """Fails the job with the given exception."""
+        self._set(self._future.set_exception, exception)
+
+    @staticmethod
+    def _set(setter: Callable[[Any], None], value: Any) -> None:
+        try:
+            setter(value)
+        except futures.InvalidStateError:
+            pass  # the job was cancelled while it was being polled
+
+    def __repr__(self) -> str:
+        return f'IQMJob(job_id={self._job_id!r})'
+
+
+def wait_for_jobs(
+    jobs: Iterable[IQMJob], timeout: Optional[float] = None, return_when: str = futures.ALL_COMPLETED
+) -> tuple[list[IQMJob], list[IQMJob]]:
+    """Waits for the given jobs to finish.
+
+    Args:
+        jobs: jobs to wait for
+        timeout: maximum time to wait, in seconds. If ``None``, there is no limit.
+        return_when: when to return, one of :data:`concurrent.futures.FIRST_COMPLETED`,
+            :data:`concurrent.futures.FIRST_EXCEPTION` and :data:`concurrent.futures.ALL_COMPLETED`
+
+    Returns:
+        jobs that have finished, jobs that have not, both in the order of ``jobs``
+    """
+    jobs = list(jobs)
+    done, _ = futures.wait([job._future for job in jobs], timeout, return_when)
+    return [job for job in jobs if job._future in done], [job for job in jobs if job._future not in done]
+
+
+class _JobPoller:
+    """Polls the jobs submitted by a sampler in a background thread, until they have all finished.
+
+    The thread is started when a job is added, and stops when there are no jobs left to poll.
+    All the jobs are polled once every ``SECONDS_BETWEEN_CALLS`` seconds.
+    """
+
+    def __init__(self, sampler: IQMSampler):
+        self._sampler = sampler
+        # jobs to poll, with their timeouts and deadlines
+        self._jobs: dict[UUID, tuple[IQMJob, float, float]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, job: IQMJob, timeout: float) -> None:
+        """Starts polling the given job, failing it with APITimeoutError if it has not finished in ``timeout``."""
+        with self._lock:
+            self._jobs[job.job_id] = (job, timeout, time.monotonic() + timeout)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='IQMSampler job poller', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                jobs = list(self._jobs.values())
+                if not jobs:
+                    self._thread = None
+                    return
+            for job, timeout, deadline in jobs:
+                if job.done() or self._poll(job, timeout, deadline):
+                    with self._lock:
+                        del self._jobs[job.job_id]
+            time.sleep(SECONDS_BETWEEN_CALLS)
+
+    def _poll(self, job: IQMJob, timeout: float, deadline: float) -> bool:
+        """Polls the status of the job, and completes it if it has finished.
+
+        Returns:
+            True iff the job has finished
+        """
+        client = self._sampler._client
+        try:
+            if not client:
+                raise RuntimeError('Cannot poll the job since session to IQM client has been closed.')
+            run_result = _poll_job(client, job.job_id)
+            if run_result is None:
+                if time.monotonic() < deadline:
+                    return False
+                raise APITimeoutError(f"The job didn't finish in {timeout} seconds.")
+            job._set_run_result(run_result)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            job._set_exception(e)
+        return True
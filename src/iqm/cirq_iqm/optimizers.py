@@ -14,18 +14,69 @@
 """
 Circuit optimization classes.
 """
+from collections import defaultdict
+from dataclasses import dataclass, field
 import operator
-from typing import Optional
+import time
+from typing import Any, Callable, Optional, Sequence
 
 import cirq
 from cirq import circuits, ops
 
+from iqm.cirq_iqm.circuit_builder import circuit_from_moments
 
+
+@dataclass
+class PassStats:
+    """Statistics of a single optimization pass run by :func:`simplify_circuit`."""
+
+    name: str
+    """name of the pass"""
+    iteration: Optional[int]
+    """index of the simplification round, or None for the final passes after the rounds"""
+    wall_time: float
+    """wall-clock time taken by the pass, in seconds"""
+    operations_before: int
+    """number of operations in the circuit before the pass"""
+    operations_after: int
+    """number of operations in the circuit after the pass"""
+
+
+@dataclass
+class SimplifyStats:
+    """Statistics collected by :func:`simplify_circuit`.
+
+    Pass an instance to :func:`simplify_circuit` to have it filled in.
+    """
+
+    passes: list[PassStats] = field(default_factory=list)
+    """statistics of the passes, in the order they were run"""
+    iterations: int = 0
+    """number of simplification rounds run"""
+    converged: bool = False
+    """True iff the simplification rounds hit a fixed point before ``max_iterations`` was exceeded"""
+
+    @property
+    def wall_time(self) -> float:
+        """Total wall-clock time taken by the passes, in seconds."""
+        return sum(p.wall_time for p in self.passes)
+
+    def wall_time_by_pass(self) -> dict[str, float]:
+        """Total wall-clock time taken by each pass over all the rounds, in seconds."""
+        result: dict[str, float] = defaultdict(float)
+        for p in self.passes:
+            result[p.name] += p.wall_time
+        return dict(result)
+
+
+@cirq.transformer
 def simplify_circuit(
-    circuit: cirq.Circuit,
+    circuit: cirq.AbstractCircuit,
     *,
+    context: Optional[cirq.TransformerContext] = None,
     max_iterations: int = 20,
     drop_final_rz: bool = False,
+    stats: Optional[SimplifyStats] = None,
 ) -> cirq.Circuit:
     """Simplifies and optimizes the given circuit.
 
@@ -37,66 +88,275 @@ def simplify_circuit(
     * drops any empty Moments
 
     This sequence of optimization passes is repeated until the circuit hits a fixed point,
-    or ``max_iterations`` is exceeded.
+    or ``max_iterations`` is exceeded. After the first round, only the operations acting on qubits
+    whose operations changed in the previous round are revisited, the others are left as they are.
+    A qubit is considered unchanged if its operations are approximately equal to the ones before the round.
 
     Finally, it removes Z rotations that are immediately followed by a Z-basis measurement.
 
+    The logger of ``context`` receives the circuit before and after each pass, and a summary of each round.
+
     Args:
         circuit: circuit to simplify
+        context: transformer context, its logger and ``tags_to_ignore`` are passed on to the passes
         max_iterations: maximum number of simplification rounds
         drop_final_rz: iff True, drop z rotations that have no successor operations
+        stats: if given, filled in with the wall-clock time and operation counts of each pass,
+            and the number of rounds run
 
     Returns:
         simplified circuit
     """
     calset_id = getattr(circuit, 'iqm_calibration_set_id', None)
-    c = circuit.copy()
+    # the passes do not modify their input circuits, so no copy is needed
+    c = circuit.unfreeze(copy=False)
+    if context is None:
+        context = cirq.TransformerContext()
+    # operations tagged as settled are ignored by the Cirq transformers
+    pass_context = cirq.TransformerContext(
+        logger=context.logger, tags_to_ignore=context.tags_to_ignore + (_SETTLED,), deep=context.deep
+    )
+    iteration: Optional[int] = None
+
+    def run_pass(name: str, transformer: Callable[..., cirq.Circuit], c: cirq.Circuit, **kwargs) -> cirq.Circuit:
+        """Runs the given transformer on ``c``, recording its statistics."""
+        if stats is None:
+            return transformer(c, context=pass_context, **kwargs)
+        operations_before = _num_operations(c)
+        start = time.perf_counter()
+        c = transformer(c, context=pass_context, **kwargs)
+        wall_time = time.perf_counter() - start
+        stats.passes.append(PassStats(name, iteration, wall_time, operations_before, _num_operations(c)))
+        return c
 
     # the optimizers cause the immediate decomposition of any gates they insert into the Circuit
-    for _ in range(max_iterations):
-        # It seems that Cirq optimizers have no way of communicating
-        # if they actually made any changes to the Circuit.
-        # See https://github.com/quantumlib/Cirq/issues/3761
-
-        before = c.copy()
+    dirty: set[cirq.Qid] = set(c.all_qubits())
+    for iteration in range(max_iterations):
+        if not dirty:
+            # the optimization hit a fixed point
+            break
+        c = _settle(c, dirty)
+        before = _timelines(c, dirty)
 
         # all mergeable 2-qubit gates are merged
-        MergeOneParameterGroupGates().optimize_circuit(c)
-        c = cirq.merge_single_qubit_gates_to_phased_x_and_z(c)
+        c = run_pass('merge_one_parameter_group_gates', merge_one_parameter_group_gates, c)
+        c = run_pass('merge_single_qubit_gates_to_phased_x_and_z', cirq.merge_single_qubit_gates_to_phased_x_and_z, c)
         # all z rotations are pushed past the first two-qubit gate following them
-        c = cirq.eject_z(c, eject_parameterized=True)
-        c = cirq.drop_empty_moments(c)
-
-        if c == before:
-            # the optimization hit a fixed point
-            break
+        c = run_pass('eject_z', cirq.eject_z, c, eject_parameterized=True)
+        c = run_pass('drop_empty_moments', cirq.drop_empty_moments, c)
 
-    DropRZBeforeMeasurement(drop_final=drop_final_rz).optimize_circuit(c)
-    c = cirq.drop_empty_moments(c)
+        dirty = _changed_qubits(before, _timelines(c, dirty))
+        context.logger.log(
+            f'simplify_circuit round {iteration}: {_num_operations(c)} operations, {len(dirty)} qubits changed'
+        )
+        if stats is not None:
+            stats.iterations = iteration + 1
+
+    if stats is not None:
+        stats.converged = not dirty
+    c = _settle(c, set(c.all_qubits()))
+    iteration = None
+    c = run_pass('drop_rz_before_measurement', drop_rz_before_measurement, c, drop_final=drop_final_rz)
+    c = run_pass('drop_empty_moments', cirq.drop_empty_moments, c)
     c.iqm_calibration_set_id = calset_id  # type: ignore
 
     return c
 
 
+def _num_operations(circuit: cirq.AbstractCircuit) -> int:
+    """Number of operations in the circuit."""
+    return sum(len(moment) for moment in circuit)
+
+
+@dataclass(frozen=True)
+class _Settled:
+    """Tag for operations that :func:`simplify_circuit` does not need to revisit."""
+
+
+_SETTLED = _Settled()
+
+
+def _settle(circuit: cirq.Circuit, dirty: set[cirq.Qid]) -> cirq.Circuit:
+    """Tags the operations that do not act on any of the ``dirty`` qubits as settled, and untags the others.
+
+    Moments whose operations are already tagged correctly are reused as they are.
+    """
+
+    def retag(op: cirq.Operation) -> cirq.Operation:
+        settled = _SETTLED in op.tags
+        if dirty.isdisjoint(op.qubits):
+            return op if settled else op.with_tags(_SETTLED)
+        if not settled:
+            return op
+        tags = tuple(tag for tag in op.tags if tag != _SETTLED)
+        return op.untagged.with_tags(*tags) if tags else op.untagged
+
+    moments = []
+    for moment in circuit:
+        operations = [retag(op) for op in moment]
+        if all(new is old for new, old in zip(operations, moment)):
+            moments.append(moment)
+        else:
+            moments.append(cirq.Moment(operations))
+    return circuit_from_moments(moments)
+
+
+def _timelines(circuit: cirq.Circuit, dirty: set[cirq.Qid]) -> dict[cirq.Qid, list[cirq.Operation]]:
+    """Sequences of the operations that are not settled, for the ``dirty`` qubits and the qubits they interact with.
+
+    The settled operations are left as they are by the passes, so they are skipped.
+    """
+    result: dict[cirq.Qid, list[cirq.Operation]] = {q: [] for q in dirty}
+    for moment in circuit:
+        for op in moment:
+            if _SETTLED not in op.tags:
+                for q in op.qubits:
+                    result.setdefault(q, []).append(op)
+    return result
+
+
+def _changed_qubits(
+    before: dict[cirq.Qid, list[cirq.Operation]], after: dict[cirq.Qid, list[cirq.Operation]]
+) -> set[cirq.Qid]:
+    """Qubits whose sequences of operations differ between the two timelines, up to numerical noise."""
+    return {
+        q
+        for q in before.keys() | after.keys()
+        if len(before.get(q, ())) != len(after.get(q, ()))
+        or not all(a is b or a == b or cirq.approx_eq(a, b) for a, b in zip(before[q], after[q]))
+    }
+
+
+@cirq.transformer
+def merge_one_parameter_group_gates(
+    circuit: cirq.AbstractCircuit,
+    *,
+    context: Optional[cirq.TransformerContext] = None,
+) -> cirq.Circuit:
+    """Merges adjacent gates belonging to the same parametrized gate family.
+
+    See :class:`MergeOneParameterGroupGates` for the gate families that are merged.
+    The circuit is swept once, keeping track of the run of mergeable gates each qubit is currently part of,
+    so the running time is linear in the number of operations.
+    Each maximal run is replaced by a single gate in the moment of its first operation,
+    or removed if the gates cancel each other out. Moments left empty are not removed.
+
+    Args:
+        circuit: circuit to optimize
+        context: transformer context, operations with any of its ``tags_to_ignore`` are left as they are
+            and end the runs of the qubits they act on
+
+    Returns:
+        optimized circuit
+    """
+    tags_to_ignore = set(context.tags_to_ignore) if context else set()
+    families = MergeOneParameterGroupGates.ONE_PARAMETER_FAMILIES
+    # run of mergeable operations each qubit is currently part of, as (moment index, operation) pairs
+    open_runs: dict[cirq.Qid, list[tuple[int, cirq.Operation]]] = {}
+    runs: list[list[tuple[int, cirq.Operation]]] = []
+    for index, moment in enumerate(circuit):
+        for op in moment:
+            if not isinstance(op.gate, families) or (tags_to_ignore and not tags_to_ignore.isdisjoint(op.tags)):
+                for q in op.qubits:
+                    open_runs.pop(q, None)
+                continue
+            run = open_runs.get(op.qubits[0])
+            if (
+                run is not None
+                and all(open_runs.get(q) is run for q in op.qubits)
+                and MergeOneParameterGroupGates._is_mergeable(run[0][1], op)
+            ):
+                run.append((index, op))
+            else:
+                run = [(index, op)]
+                runs.append(run)
+                open_runs.update(dict.fromkeys(op.qubits, run))
+
+    # moment index -> first qubit of an operation in it -> replacement operation, or None to remove it
+    changes: dict[int, dict[cirq.Qid, Optional[cirq.Operation]]] = defaultdict(dict)
+    for run in runs:
+        if len(run) == 1:
+            continue
+        (first_index, first), *rest = run
+        changes[first_index][first.qubits[0]] = MergeOneParameterGroupGates._merge([op for _, op in run])
+        for index, op in rest:
+            changes[index][op.qubits[0]] = None
+
+    new_moments = []
+    for index, moment in enumerate(circuit):
+        if index not in changes:
+            new_moments.append(moment)
+            continue
+        moment_changes = changes[index]
+        new_ops = (moment_changes.get(op.qubits[0], op) for op in moment)
+        new_moments.append(cirq.Moment.from_ops(*(op for op in new_ops if op is not None)))
+    return circuit_from_moments(new_moments)
+
+
 class MergeOneParameterGroupGates(circuits.PointOptimizer):
     """Merges adjacent gates belonging to the same parametrized gate family.
 
     The merged gates have to act on the same sequence of qubits.
     This optimizer only works with gate families that are known to be one-parameter groups.
+    :meth:`optimize_circuit` uses :func:`merge_one_parameter_group_gates`.
 
-    For now, all the families are assumed to be periodic with a period of 4.
+    The families are periodic in their exponent, up to a global phase, with the periods given in :attr:`PERIODS`.
     """
 
-    # TODO: ZZPowGate has a period of 2
-    ONE_PARAMETER_FAMILIES = (ops.ISwapPowGate, ops.ZZPowGate)
-    PERIOD = 4
+    PERIODS: dict[type[cirq.Gate], int] = {ops.ISwapPowGate: 4, ops.ZZPowGate: 2}
+    ONE_PARAMETER_FAMILIES = tuple(PERIODS)
     GATE_MERGING_TOLERANCE = 1e-10
 
     @classmethod
-    def _normalize_par(cls, par):
+    def _normalize_par(cls, par, period: int):
         """Normalizes the given parameter value to (-period/2, period/2]."""
-        shift = cls.PERIOD / 2
-        return operator.mod(par - shift, -cls.PERIOD) + shift
+        shift = period / 2
+        return operator.mod(par - shift, -period) + shift
+
+    @staticmethod
+    def _is_mergeable(op: cirq.Operation, next_op: cirq.Operation) -> bool:
+        """True iff ``next_op`` can be merged with ``op``.
+
+        A gate is mergeable with op iff it (1) belongs to the same gate family,
+        and (2) is acting on the same qubits.
+        """
+        if not isinstance(next_op.gate, type(op.gate)):
+            return False
+        if isinstance(op.gate, ops.gate_features.InterchangeableQubitsGate):
+            # same qubits in any order
+            return set(op.qubits) == set(next_op.qubits)
+        # same qubits in the same order
+        return op.qubits == next_op.qubits
+
+    @classmethod
+    def _merge(cls, operations: Sequence[cirq.Operation]) -> Optional[cirq.Operation]:
+        """Merges the given mergeable operations into one, acting on the qubits of the first one.
+
+        Returns:
+            merged operation, or None if the operations cancel each other out
+        """
+        op = operations[0]
+        gate: Any = op.gate
+        # all the gates are in the same family so we may simply sum their parameters (mod periodicity)
+        par = sum(o.gate.exponent for o in operations)  # type: ignore[union-attr]
+        if cirq.is_parameterized(par):
+            return gate.__class__(exponent=par).on(*op.qubits)
+        period = next(p for family, p in cls.PERIODS.items() if isinstance(gate, family))
+        # zero parameter (mod period) corresponds to identity
+        # due to floating point errors we may be just a little below the period, which should also be
+        # considered close to zero so let's shift away from the troublesome point before taking the modulo
+        par = cls._normalize_par(par, period)
+        if abs(par) <= cls.GATE_MERGING_TOLERANCE:
+            return None
+        return gate.__class__(exponent=par).on(*op.qubits)
+
+    def optimize_circuit(self, circuit: cirq.Circuit) -> None:
+        """Merges the gates in ``circuit`` in place.
+
+        Args:
+            circuit: circuit to optimize
+        """
+        circuit[:] = merge_one_parameter_group_gates(circuit)
 
     def optimization_at(
         self,
@@ -118,48 +378,70 @@ class MergeOneParameterGroupGates(circuits.PointOptimizer):
         if not isinstance(op.gate, self.ONE_PARAMETER_FAMILIES):
             return None
 
-        def is_not_mergable(next_op: cirq.Operation) -> bool:
-            """Predicate for finding gates that can be merged with op.
-
-            A gate is mergable with op iff it (1) belongs to the same gate family,
-            and (2) is acting on the same qubits.
-            """
-            if not isinstance(next_op.gate, type(op.gate)):
-                return True
-            if isinstance(op.gate, ops.gate_features.InterchangeableQubitsGate):
-                # same qubits in any order
-                return set(op.qubits) != set(next_op.qubits)
-            # same qubits in the same order
-            return op.qubits != next_op.qubits
-
         # start searching from op onwards
         start_frontier = {q: index for q in op.qubits}
-        op_list = circuit.findall_operations_until_blocked(start_frontier, is_blocker=is_not_mergable)
+        op_list = circuit.findall_operations_until_blocked(
+            start_frontier, is_blocker=lambda next_op: not self._is_mergeable(op, next_op)
+        )
 
         if len(op_list) == 1:
             return None  # just the one gate found, no changes
         indices, operations = zip(*op_list)
-
-        # all the gates are in the same family so we may simply sum their parameters (mod periodicity)
-        par = sum(o.gate.exponent for o in operations)
-        # zero parameter (mod period) corresponds to identity
-        # due to floating point errors we may be just a little below the period, which should also be
-        # considered close to zero so let's shift away from the troublesome point before taking the modulo
-        par = self._normalize_par(par)
-        if abs(par) <= self.GATE_MERGING_TOLERANCE:
-            rewritten: 'cirq.OP_TREE' = []
-        else:
-            rewritten = op.gate.__class__(exponent=par).on(*op.qubits)
-
+        rewritten = self._merge(operations)
         return circuits.PointOptimizationSummary(
-            clear_span=max(indices) + 1 - index, clear_qubits=op.qubits, new_operations=rewritten
+            clear_span=max(indices) + 1 - index, clear_qubits=op.qubits, new_operations=rewritten or []
         )
 
 
+@cirq.transformer
+def drop_rz_before_measurement(
+    circuit: cirq.AbstractCircuit,
+    *,
+    context: Optional[cirq.TransformerContext] = None,
+    drop_final: bool = False,
+) -> cirq.Circuit:
+    """Drops z rotations that happen right before a z-basis measurement.
+
+    These z rotations do not affect the result of the measurement, so we may ignore them.
+    The circuit is swept once in reverse, keeping track of whether the next operation on each qubit
+    is a measurement, so the running time is linear in the number of operations.
+    Moments left empty are not removed.
+
+    Args:
+        circuit: circuit to optimize
+        context: transformer context, operations with any of its ``tags_to_ignore`` are left as they are
+            and block the z rotations preceding them from being dropped
+        drop_final: iff True, drop also any z rotation at the end of the circuit (since it's not
+            followed by a measurement, it cannot affect them)
+
+    Returns:
+        optimized circuit
+    """
+    tags_to_ignore = set(context.tags_to_ignore) if context else set()
+    # for each qubit, whether the z rotations at the current point of the sweep can be dropped
+    droppable: dict[cirq.Qid, bool] = {}
+    new_moments: list[cirq.Moment] = []
+    for moment in reversed(circuit):
+        kept: list[cirq.Operation] = []
+        for op in moment:
+            gate = op.gate
+            if tags_to_ignore and not tags_to_ignore.isdisjoint(op.tags):
+                droppable.update(dict.fromkeys(op.qubits, False))
+            elif isinstance(gate, cirq.ZPowGate):
+                if droppable.get(op.qubits[0], drop_final):
+                    continue
+            else:
+                droppable.update(dict.fromkeys(op.qubits, isinstance(gate, cirq.MeasurementGate)))
+            kept.append(op)
+        new_moments.append(moment if len(kept) == len(moment) else cirq.Moment.from_ops(*kept))
+    return circuit_from_moments(reversed(new_moments))
+
+
 class DropRZBeforeMeasurement(circuits.PointOptimizer):
     """Drops z rotations that happen right before a z-basis measurement.
 
     These z rotations do not affect the result of the measurement, so we may ignore them.
+    :meth:`optimize_circuit` uses :func:`drop_rz_before_measurement`.
 
     Args:
         drop_final: iff True, drop also any z rotation at the end of the circuit (since it's not
@@ -170,6 +452,14 @@ class DropRZBeforeMeasurement(circuits.PointOptimizer):
         super().__init__()
         self.drop_final = drop_final
 
+    def optimize_circuit(self, circuit: cirq.Circuit) -> None:
+        """Drops the removable z rotations from ``circuit`` in place.
+
+        Args:
+            circuit: circuit to optimize
+        """
+        circuit[:] = drop_rz_before_measurement(circuit, drop_final=self.drop_final)
+
     def optimization_at(
         self,
         circuit: cirq.Circuit,
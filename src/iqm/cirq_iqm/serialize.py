@@ -16,7 +16,10 @@
 Helper functions for serializing and deserializing quantum circuits between Cirq and IQM Circuit formats.
 """
 
-from cirq import Circuit, KeyCondition, NamedQid
+import functools
+from typing import Any, Callable, Sequence, cast
+
+from cirq import Circuit, KeyCondition, NamedQid, ParamResolver, is_parameterized, parameter_symbols, resolve_parameters
 from cirq.ops import (
     ClassicallyControlledOperation,
     CZPowGate,
@@ -24,11 +27,16 @@ from cirq.ops import (
     MeasurementGate,
     Operation,
     PhasedXPowGate,
+    Qid,
     XPowGate,
     YPowGate,
 )
+from cirq.value import TParamVal
+import numpy as np
+import sympy  # type: ignore
 
 from iqm import iqm_client
+from iqm.cirq_iqm.circuit_builder import earliest_circuit
 from iqm.cirq_iqm.iqm_gates import IQMMoveGate
 from iqm.iqm_client import Instruction
 
@@ -60,23 +68,101 @@ def instruction_to_operation(instr: Instruction) -> Operation:
     if instr.name not in _IQM_CIRQ_OP_MAP:
         raise OperationNotSupportedError(f'Operation {instr.name} not supported.')
 
-    gate_type = _IQM_CIRQ_OP_MAP[instr.name][0]
-    args_map = {'angle_t': 'exponent', 'phase_t': 'phase_exponent'}
-    args = {args_map[k]: v * 2 for k, v in instr.args.items() if k in args_map}
-    qubits = [NamedQid(qubit, dimension=2) for qubit in instr.qubits]
+    qubits = tuple(instr.qubits)
+    if instr.name in ('prx', 'cc_prx'):
+        operation = _prx_operation(qubits, instr.args['angle_t'], instr.args['phase_t'])
+        if instr.name == 'cc_prx':
+            return operation.with_classical_controls(instr.args['feedback_key'])
+        return operation
     if instr.name == 'measure':
-        args['key'] = instr.args['key']
-        args['num_qubits'] = len(instr.qubits)
-    elif instr.name == 'cc_prx':
-        return gate_type(**args)(*qubits).with_classical_controls(instr.args['feedback_key'])
-    return gate_type(**args)(*qubits)
+        return _measure_operation(qubits, instr.args['key'])
+    return _gate_operation(_CZ_GATE if instr.name == 'cz' else _MOVE_GATE, qubits)
+
+
+# Qubits, gates and operations are immutable, so identical ones are shared between deserialized circuits.
+_CZ_GATE = CZPowGate()
+_MOVE_GATE = IQMMoveGate()
+
+
+@functools.lru_cache(maxsize=4096)
+def _named_qid(name: str) -> NamedQid:
+    return NamedQid(name, dimension=2)
+
+
+@functools.lru_cache(maxsize=4096)
+def _gate_operation(gate: Gate, qubits: tuple[str, ...]) -> Operation:
+    return gate.on(*map(_named_qid, qubits))
+
+
+@functools.lru_cache(maxsize=4096)
+def _prx_gate(angle_t: float, phase_t: float) -> Gate:
+    # may be an XPowGate or a YPowGate, like the gates returned by the PhasedXPowGate constructor
+    return PhasedXPowGate(exponent=angle_t * 2, phase_exponent=phase_t * 2)
+
+
+@functools.lru_cache(maxsize=4096)
+def _prx_operation(qubits: tuple[str, ...], angle_t: float, phase_t: float) -> Operation:
+    return _prx_gate(angle_t, phase_t).on(*map(_named_qid, qubits))
+
+
+@functools.lru_cache(maxsize=4096)
+def _measure_operation(qubits: tuple[str, ...], key: str) -> Operation:
+    return MeasurementGate(num_qubits=len(qubits), key=key).on(*map(_named_qid, qubits))
 
 
 class OperationNotSupportedError(RuntimeError):
     """Raised when a given operation is not supported by the IQM server."""
 
 
-def map_operation(operation: Operation) -> Instruction:
+def _prx_instruction(gate: Any, qubits: tuple[str, ...], make: Callable[..., Instruction]) -> Instruction:
+    return make(
+        name='prx',
+        qubits=qubits,
+        args={'angle_t': gate.exponent / 2, 'phase_t': gate.phase_exponent / 2},
+    )
+
+
+def _measure_instruction(gate: Any, qubits: tuple[str, ...], make: Callable[..., Instruction]) -> Instruction:
+    # the explicit invert mask is the full one without the padding
+    if any(gate.invert_mask):
+        raise OperationNotSupportedError('Invert mask not supported')
+    return make(name='measure', qubits=qubits, args={'key': gate.key})
+
+
+def _cz_instruction(gate: Any, qubits: tuple[str, ...], make: Callable[..., Instruction]) -> Instruction:
+    if gate.exponent == 1.0:
+        return make(name='cz', qubits=qubits, args={})
+    raise OperationNotSupportedError(f'CZPowGate exponent was {gate.exponent}, but only 1 is natively supported.')
+
+
+def _move_instruction(_gate: Any, qubits: tuple[str, ...], make: Callable[..., Instruction]) -> Instruction:
+    return make(name='move', qubits=qubits, args={})
+
+
+# Instruction emitters for the natively supported gates, keyed on the gate type.
+# Lookups are done on the exact type first, subclasses fall back to isinstance checks in this order.
+_GATE_EMITTERS: dict[type[Gate], Callable[[Any, tuple[str, ...], Callable[..., Instruction]], Instruction]] = {
+    PhasedXPowGate: _prx_instruction,
+    XPowGate: _prx_instruction,
+    YPowGate: _prx_instruction,
+    MeasurementGate: _measure_instruction,
+    CZPowGate: _cz_instruction,
+    IQMMoveGate: _move_instruction,
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _qubit_names(qubits: tuple[Qid, ...]) -> tuple[str, ...]:
+    """IQM qubit names of the given Cirq qubits."""
+    return tuple(qubit.name if isinstance(qubit, NamedQid) else str(qubit) for qubit in qubits)
+
+
+def _construct_instruction(*, name: str, qubits: tuple[str, ...], args: dict[str, Any]) -> Instruction:
+    """Creates an instruction without validating it."""
+    return Instruction.model_construct(name=name, implementation=None, qubits=qubits, args=args)
+
+
+def map_operation(operation: Operation, *, validate: bool = True) -> Instruction:
     """Map a Cirq Operation to the IQM data transfer format.
 
     Assumes the circuit has been transpiled so that it only contains operations natively supported by the
@@ -84,6 +170,8 @@ def map_operation(operation: Operation) -> Instruction:
 
     Args:
         operation: a Cirq Operation
+        validate: If False, the instruction is not validated by pydantic. Only use this for operations known to
+            be valid, e.g. ones produced by :meth:`.IQMDevice.decompose_circuit` with resolved parameters.
 
     Returns:
         Instruction: the converted operation
@@ -92,39 +180,16 @@ def map_operation(operation: Operation) -> Instruction:
         OperationNotSupportedError When the circuit contains an unsupported operation.
 
     """
-    qubits = [qubit.name if isinstance(qubit, NamedQid) else str(qubit) for qubit in operation.qubits]
-    if isinstance(operation.gate, (PhasedXPowGate, XPowGate, YPowGate)):
-        return Instruction(
-            name='prx',
-            qubits=tuple(qubits),
-            args={'angle_t': operation.gate.exponent / 2, 'phase_t': operation.gate.phase_exponent / 2},
-        )
-    if isinstance(operation.gate, MeasurementGate):
-        if any(operation.gate.full_invert_mask()):
-            raise OperationNotSupportedError('Invert mask not supported')
-
-        return Instruction(
-            name='measure',
-            qubits=tuple(qubits),
-            args={'key': operation.gate.key},
-        )
-    if isinstance(operation.gate, CZPowGate):
-        if operation.gate.exponent == 1.0:
-            return Instruction(
-                name='cz',
-                qubits=tuple(qubits),
-                args={},
-            )
-        raise OperationNotSupportedError(
-            f'CZPowGate exponent was {operation.gate.exponent}, but only 1 is natively supported.'
-        )
+    qubits = _qubit_names(operation.qubits)
+    make = cast(Callable[..., Instruction], Instruction if validate else _construct_instruction)
+    gate = operation.gate
+    emitter = _GATE_EMITTERS.get(type(gate))  # type: ignore[arg-type]
+    if emitter is not None:
+        return emitter(gate, qubits, make)
 
-    if isinstance(operation.gate, IQMMoveGate):
-        return Instruction(
-            name='move',
-            qubits=tuple(qubits),
-            args={},
-        )
+    for gate_type, emitter in _GATE_EMITTERS.items():
+        if isinstance(gate, gate_type):
+            return emitter(gate, qubits, make)
 
     if isinstance(operation, ClassicallyControlledOperation):
         if len(operation._conditions) > 1:
@@ -132,9 +197,9 @@ def map_operation(operation: Operation) -> Instruction:
         if not isinstance(operation._conditions[0], KeyCondition):
             raise OperationNotSupportedError('Only KeyConditions are supported as classical controls.')
         if isinstance(operation._sub_operation.gate, (PhasedXPowGate, XPowGate, YPowGate)):
-            return Instruction(
+            return make(
                 name='cc_prx',
-                qubits=tuple(qubits),
+                qubits=qubits,
                 args={
                     'angle_t': operation._sub_operation.gate.exponent / 2,
                     'phase_t': operation._sub_operation.gate.phase_exponent / 2,
@@ -151,53 +216,196 @@ def map_operation(operation: Operation) -> Instruction:
     raise OperationNotSupportedError(f'{type(operation.gate)} not natively supported.')
 
 
-def serialize_circuit(circuit: Circuit) -> iqm_client.Circuit:
+def _make_circuit(instructions: Sequence[Instruction], validate: bool) -> iqm_client.Circuit:
+    if validate:
+        return iqm_client.Circuit(name='Serialized from Cirq', instructions=instructions)
+    return iqm_client.Circuit.model_construct(
+        name='Serialized from Cirq', instructions=tuple(instructions), metadata=None
+    )
+
+
+def serialize_circuit(circuit: Circuit, *, validate: bool = True) -> iqm_client.Circuit:
     """Serializes a quantum circuit into the IQM data transfer format.
 
     Args:
         circuit: quantum circuit to serialize
+        validate: If False, the instructions and the circuit are not validated by pydantic.
+            See :func:`map_operation`.
 
     Returns:
         data transfer object representing the circuit
     """
     total_ops_list = [op for moment in circuit for op in moment]
-    cc_prx_support = any(isinstance(op, ClassicallyControlledOperation) for op in total_ops_list)
-    instructions = list(map(map_operation, total_ops_list))
-
-    if cc_prx_support:
-        mkey_to_measurement = {}
-        for inst in instructions:
-            if inst.name == 'measure':
-                if inst.args['key'] in mkey_to_measurement:
-                    raise OperationNotSupportedError('Cannot use the same key for multiple measurements.')
-                mkey_to_measurement[inst.args['key']] = inst
-            elif inst.name == 'cc_prx':
-                feedback_key = inst.args['feedback_key']
-                measurement = mkey_to_measurement.get(feedback_key)
-                if measurement is None:
-                    raise OperationNotSupportedError(
-                        f'cc_prx has feedback_key {feedback_key}, but no measure operation with that key precedes it.'
-                    )
-                if len(measurement.qubits) != 1:
-                    raise OperationNotSupportedError('cc_prx must depend on the measurement result of a single qubit.')
-                inst.args['feedback_qubit'] = measurement.qubits[0]
-                measurement.args['feedback_key'] = feedback_key
-
-    return iqm_client.Circuit(name='Serialized from Cirq', instructions=instructions)
+    # iqm_client.Circuit validates each of its instructions, so there is no need to do it twice
+    instructions = [map_operation(op, validate=False) for op in total_ops_list]
+    if any(isinstance(op, ClassicallyControlledOperation) for op in total_ops_list):
+        _link_feedback(instructions)
+
+    return _make_circuit(instructions, validate)
+
+
+def _link_feedback(instructions: list[Instruction]) -> None:
+    """Fills in the feedback qubits of cc_prx instructions and the feedback keys of the measurements they use."""
+    mkey_to_measurement = {}
+    for inst in instructions:
+        if inst.name == 'measure':
+            if inst.args['key'] in mkey_to_measurement:
+                raise OperationNotSupportedError('Cannot use the same key for multiple measurements.')
+            mkey_to_measurement[inst.args['key']] = inst
+        elif inst.name == 'cc_prx':
+            feedback_key = inst.args['feedback_key']
+            measurement = mkey_to_measurement.get(feedback_key)
+            if measurement is None:
+                raise OperationNotSupportedError(
+                    f'cc_prx has feedback_key {feedback_key}, but no measure operation with that key precedes it.'
+                )
+            if len(measurement.qubits) != 1:
+                raise OperationNotSupportedError('cc_prx must depend on the measurement result of a single qubit.')
+            inst.args['feedback_qubit'] = measurement.qubits[0]
+            measurement.args['feedback_key'] = feedback_key
+
+
+class CircuitTemplate:
+    """A parametrized quantum circuit serialized once, for binding to many sets of parameter values.
+
+    The non-parametrized operations of the circuit are serialized when the template is created. The parametrized
+    ``prx`` and ``cc_prx`` operations are recorded as slots, whose angles are evaluated for a whole sweep at once
+    using NumPy when the template is bound. Circuits with other kinds of parametrized operations are resolved and
+    serialized separately for each set of parameter values instead.
+
+    Args:
+        circuit: quantum circuit to serialize, may contain symbolic parameters
+        validate: If False, the bound instructions and circuits are not validated by pydantic.
+            See :func:`map_operation`.
+    """
+
+    def __init__(self, circuit: Circuit, *, validate: bool = True):
+        self.circuit = circuit
+        self.validate = validate
+        self._instructions: list[Instruction] = []
+        # instruction index and parametrized operation
+        self._slots: list[tuple[int, Operation]] = []
+        self._symbols: list[sympy.Symbol] = []
+        # compiled angle_t and phase_t expressions, whether phase_t needs canonicalization
+        self._compiled_slots: list[tuple[Callable[..., Any], Callable[..., Any], bool]] = []
+        self._resolve_each = False
+        symbols: set[sympy.Symbol] = set()
+
+        total_ops_list = [op for moment in circuit for op in moment]
+        for op in total_ops_list:
+            if not is_parameterized(op):
+                self._instructions.append(map_operation(op, validate=False))
+                continue
+            gate: Any = op._sub_operation.gate if isinstance(op, ClassicallyControlledOperation) else op.gate
+            if (
+                not isinstance(gate, (PhasedXPowGate, XPowGate, YPowGate))
+                or is_parameterized(gate.global_shift)
+                or parameter_symbols(gate) != parameter_symbols(op)
+            ):
+                # the whole circuit is resolved and serialized when binding
+                self._resolve_each = True
+                self._instructions, self._slots = [], []
+                return
+            symbols |= parameter_symbols(gate)
+            self._slots.append((len(self._instructions), op))
+            # placeholder instruction, its angles are replaced when binding
+            placeholder = resolve_parameters(op, {s: 0 for s in parameter_symbols(op)})
+            self._instructions.append(map_operation(placeholder, validate=False))
+        if any(isinstance(op, ClassicallyControlledOperation) for op in total_ops_list):
+            _link_feedback(self._instructions)
+        # compile the angle expressions once, binding only evaluates them
+        self._symbols = sorted(symbols, key=str)
+        for _, op in self._slots:
+            gate = op._sub_operation.gate if isinstance(op, ClassicallyControlledOperation) else op.gate
+            self._compiled_slots.append(
+                (
+                    _compile_expression(self._symbols, gate.exponent / 2),
+                    _compile_expression(self._symbols, gate.phase_exponent / 2),
+                    isinstance(gate, PhasedXPowGate) and is_parameterized(gate.phase_exponent),
+                )
+            )
+
+    @property
+    def parametrized_instructions(self) -> int:
+        """Number of instructions whose arguments are bound using the template.
+
+        Zero if the circuit is resolved and serialized separately for each set of parameter values.
+        """
+        return len(self._slots)
+
+    def bind(self, resolvers: Sequence[ParamResolver]) -> list[iqm_client.Circuit]:
+        """Serializes the circuit for each of the given parameter resolvers.
+
+        The angles are equal to the ones obtained by resolving the parameters of the circuit and serializing it
+        using :func:`serialize_circuit`, up to floating-point rounding. Where the phase exponent of a
+        :class:`cirq.PhasedXPowGate` resolves close to 0, ±1/2 or 1, Cirq may canonicalize the gate into an
+        :class:`cirq.XPowGate` or a :class:`cirq.YPowGate` with a different phase or exponent sign,
+        so those operations are resolved and serialized by Cirq instead.
+
+        Args:
+            resolvers: parameter values to bind
+
+        Returns:
+            data transfer objects representing the resolved circuits, in the order of ``resolvers``
+        """
+        if self._resolve_each:
+            return [
+                serialize_circuit(resolve_parameters(self.circuit, resolver), validate=self.validate)
+                for resolver in resolvers
+            ]
+
+        values = [np.array([resolver.value_of(s) for resolver in resolvers], dtype=np.float64) for s in self._symbols]
+        n = len(resolvers)
+
+        slot_args = []
+        for (_, op), (evaluate_angle, evaluate_phase, canonicalize_phase) in zip(self._slots, self._compiled_slots):
+            angle = np.broadcast_to(evaluate_angle(*values), (n,)).astype(float)
+            phase = np.broadcast_to(evaluate_phase(*values), (n,)).astype(float)
+            if canonicalize_phase:
+                # PhasedXPowGate wraps the phase exponent into (-1, 1] when its parameters are resolved
+                phase = np.mod(2 * phase, 2)
+                phase = np.where(phase > 1, phase - 2, phase) / 2
+                for i in np.flatnonzero(np.isclose(phase[:, None], _SPECIAL_PHASES, rtol=0, atol=1e-9).any(axis=1)):
+                    args = map_operation(resolve_parameters(op, resolvers[i]), validate=False).args
+                    angle[i], phase[i] = args['angle_t'], args['phase_t']
+            slot_args.append((angle, phase))
+
+        circuits = []
+        for i in range(n):
+            instructions = list(self._instructions)
+            for (index, *_), (angle, phase) in zip(self._slots, slot_args):
+                template = self._instructions[index]
+                instructions[index] = _construct_instruction(
+                    name=template.name,
+                    qubits=template.qubits,
+                    args=template.args | {'angle_t': float(angle[i]), 'phase_t': float(phase[i])},
+                )
+            circuits.append(_make_circuit(instructions, self.validate))
+        return circuits
+
+
+# phase_t values at which Cirq may canonicalize a resolved PhasedXPowGate into an XPowGate or a YPowGate
+_SPECIAL_PHASES = np.array([0.0, 0.25, 0.5, -0.25])
+
+
+def _compile_expression(symbols: list[sympy.Symbol], expr: TParamVal) -> Callable[..., Any]:
+    """Compiles an angle expression into a function of the symbol values, evaluated using NumPy."""
+    if isinstance(expr, sympy.Basic):
+        return sympy.lambdify(symbols, expr, 'numpy')
+    value = float(expr)
+    return lambda *_: value
 
 
 def deserialize_circuit(circuit: iqm_client.Circuit) -> Circuit:
     """Deserializes a quantum circuit from the IQM data transfer format to a Cirq Circuit.
 
+    The operations are placed into moments using the same earliest insertion strategy as the
+    :class:`cirq.Circuit` constructor, in a single pass over the instructions, see :func:`.earliest_circuit`.
+
     Args:
         circuit: data transfer object representing the circuit
 
     Returns:
         quantum circuit
     """
-    return Circuit(
-        map(
-            instruction_to_operation,
-            circuit.instructions,
-        )
-    )
+    return earliest_circuit(instruction_to_operation(instr) for instr in circuit.instructions)
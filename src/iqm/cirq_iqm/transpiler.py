@@ -14,16 +14,53 @@
 """Helper functions for IQM specific transpilation needs."""
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional
+import itertools
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
 
+import cirq
 from cirq import Circuit
 
-from iqm.cirq_iqm.serialize import deserialize_circuit, serialize_circuit
-from iqm.iqm_client import ExistingMoveHandlingOptions, transpile_insert_moves
+from iqm.cirq_iqm.circuit_builder import earliest_circuit
+from iqm.cirq_iqm.serialize import _MOVE_GATE, _qubit_names, deserialize_circuit, map_operation, serialize_circuit
+from iqm.iqm_client import Circuit as IQMCircuit
+from iqm.iqm_client import (
+    CircuitTranspilationError,
+    CircuitValidationError,
+    DynamicQuantumArchitecture,
+    ExistingMoveHandlingOptions,
+    Instruction,
+    IQMClient,
+    transpile_insert_moves,
+    transpile_remove_moves,
+)
+
+# The native MOVE insertion of InsertMoves follows the MOVE transpilation of the IQM client using its private parts
+# below, which may change in any release of the IQM client. If they are not found, InsertMoves falls back to the public
+# transpile_insert_moves through serialization.
+try:
+    from iqm.iqm_client.transpile import _ResonatorStateTracker
+except ImportError:  # pragma: no cover
+    _ResonatorStateTracker = None  # type: ignore
+
+_PRIVATE_CLIENT_METHODS = ('_validate_instruction', '_validate_circuit_moves')
+_PRIVATE_TRACKER_ATTRIBUTES = (
+    'qr_gate_names',
+    'move_gate',
+    'qr_gates_q2r',
+    'resonators',
+    'reset_as_move_instructions',
+    'resonators_holding_qubits',
+    'create_move_instructions',
+    'find_best_resolution',
+    'get_sequence',
+)
 
 if TYPE_CHECKING:
     from iqm.cirq_iqm.devices import IQMDevice
 
+# operation, its physical qubit names, and the operation as an instruction if it needs to be transpiled
+_Entry = tuple[cirq.Operation, tuple[str, ...], Optional[Instruction]]
+
 
 def transpile_insert_moves_into_circuit(
     cirq_circuit: Circuit,
@@ -33,6 +70,8 @@ def transpile_insert_moves_into_circuit(
 ) -> Circuit:
     """Transpile the circuit to insert MOVE gates where needed.
 
+    See :class:`InsertMoves`.
+
     Args:
         cirq_circuit: Circuit to transpile.
         device: Device to transpile for.
@@ -42,14 +81,218 @@ def transpile_insert_moves_into_circuit(
     Returns:
         Transpiled circuit.
     """
-    if device.metadata.architecture is None:
-        raise ValueError("MOVE transpilation only supported for devices created from a dynamic quantum architecture.")
-    iqm_client_circuit = serialize_circuit(cirq_circuit)
-    new_iqm_client_circuit = transpile_insert_moves(
-        iqm_client_circuit,
-        device.metadata.architecture,
-        existing_moves=existing_moves,
-        qubit_mapping=qubit_mapping,
+    return InsertMoves(device, existing_moves=existing_moves, qubit_mapping=qubit_mapping)(cirq_circuit)
+
+
+@cirq.transformer
+class InsertMoves:
+    """Transformer that inserts MOVE gates into a circuit, and implements the two-qubit gates that are not natively
+    available between qubits using the computational resonators of the device.
+
+    Produces the same circuit as serializing ``circuit``, transpiling it with
+    :func:`iqm.iqm_client.transpile_insert_moves` and deserializing the result, but works directly on the
+    Cirq operations. Only the operations that act on resonators or on qubits coupled to a resonator are
+    processed, all the other operations are validated against the device and passed through as they are.
+    The native implementation uses private parts of the IQM client library. If the installed version does not
+    have them, the circuit is transpiled through serialization instead.
+
+    Args:
+        device: Device to transpile for.
+        existing_moves: How to handle existing MOVE gates, obtained from the IQM client library.
+        qubit_mapping: Mapping from qubit names in the circuit to the device.
+
+    Raises:
+        ValueError: ``device`` was not created from a dynamic quantum architecture
+    """
+
+    def __init__(
+        self,
+        device: IQMDevice,
+        *,
+        existing_moves: ExistingMoveHandlingOptions = ExistingMoveHandlingOptions.KEEP,
+        qubit_mapping: Optional[dict[str, str]] = None,
+    ):
+        architecture = device.metadata.architecture
+        if architecture is None:
+            raise ValueError(
+                'MOVE transpilation only supported for devices created from a dynamic quantum architecture.'
+            )
+        self.architecture = architecture
+        self.existing_moves = existing_moves
+        self.qubit_mapping = qubit_mapping or {}
+        self._native = _native_transpilation_available(architecture)
+        self._resonators: dict[str, cirq.Qid] = {r.name: r for r in device.resonators}
+        # components that can take part in qubit-resonator gates
+        self._coupled: frozenset[str] = frozenset(self._resonators)
+        if self._native:
+            self._coupled |= frozenset(
+                q
+                for gate_name in _ResonatorStateTracker.qr_gate_names
+                if gate_name in architecture.gates
+                for q, r in architecture.gates[gate_name].loci
+                if r in self._resonators
+            )
+        # validation results of the instructions, depend only on the architecture
+        self._validation_errors: dict[tuple[str, tuple[str, ...]], Optional[CircuitValidationError]] = {}
+
+    def _validation_error(self, inst: Instruction) -> Optional[CircuitValidationError]:
+        key = (inst.name, inst.qubits)
+        if key not in self._validation_errors:
+            try:
+                IQMClient._validate_instruction(architecture=self.architecture, instruction=inst)
+                self._validation_errors[key] = None
+            except CircuitValidationError as e:
+                self._validation_errors[key] = e
+        return self._validation_errors[key]
+
+    def __call__(self, circuit: cirq.AbstractCircuit, *, context: Optional[cirq.TransformerContext] = None) -> Circuit:
+        """Inserts the MOVE gates into ``circuit``.
+
+        Args:
+            circuit: Circuit to transpile.
+            context: Not used.
+
+        Returns:
+            Transpiled circuit.
+
+        Raises:
+            CircuitTranspilationError: the circuit cannot be transpiled
+        """
+        if not self._native:
+            transpiled = transpile_insert_moves(
+                serialize_circuit(circuit.unfreeze(copy=False)),
+                self.architecture,
+                existing_moves=self.existing_moves,
+                qubit_mapping=self.qubit_mapping or None,
+            )
+            return deserialize_circuit(transpiled)
+
+        move_gate = _ResonatorStateTracker.move_gate
+        qids: dict[str, cirq.Qid] = dict(self._resonators)
+        entries = self._entries(circuit, qids, validate=move_gate in self.architecture.gates)
+        has_moves = any(inst is not None and inst.name == move_gate for _, _, inst in entries)
+        if move_gate not in self.architecture.gates:
+            if has_moves:
+                raise ValueError('Circuit contains MOVE instructions, but the architecture does not support them.')
+            return circuit.unfreeze(copy=True)
+
+        if self.existing_moves == ExistingMoveHandlingOptions.KEEP:
+            try:
+                IQMClient._validate_circuit_moves(self.architecture, _instruction_circuit(entries))
+            except CircuitValidationError as e:
+                raise CircuitTranspilationError(e) from e
+        elif has_moves and self.existing_moves == ExistingMoveHandlingOptions.REMOVE:
+            # the MOVEs are dropped, and the resonators in the loci of the other instructions mapped to qubits
+            # (if only MOVEs are processed, they are all dropped, and the IQM client cannot construct the resulting
+            # empty circuit, but the passed-through operations keep the actual circuit nonempty)
+            only_moves = all(inst is None or inst.name == move_gate for _, _, inst in entries)
+            if only_moves and any(inst is None for _, _, inst in entries):
+                removed: Iterator[Instruction] = iter(())
+            else:
+                removed = iter(transpile_remove_moves(_instruction_circuit(entries)).instructions)
+            entries = [
+                (op, names, inst if inst is None else next(removed))
+                for op, names, inst in entries
+                if inst is None or inst.name != move_gate
+            ]
+
+        instructions = [inst for _, _, inst in entries if inst is not None]
+        tracker = _ResonatorStateTracker.from_dynamic_architecture(self.architecture)
+        new_operations: list[cirq.Operation] = []
+        position = 0
+        for op, names, inst in entries:
+            if inst is None:
+                new_operations.append(op)
+            else:
+                position += 1
+                lookahead = itertools.islice(instructions, position, None)
+                new_operations += self._transpile_operation(tracker, op, names, inst, lookahead=lookahead, qids=qids)
+
+        new_operations += _move_operations(tracker.reset_as_move_instructions(), qids)
+        return earliest_circuit(new_operations)
+
+    def _entries(self, circuit: cirq.AbstractCircuit, qids: dict[str, cirq.Qid], *, validate: bool) -> list[_Entry]:
+        """Operations of the circuit with their physical qubit names, and as instructions if they touch
+        resonator-coupled components or, if ``validate`` is True, are not valid as they are.
+        Adds the qubits of the latter to ``qids``."""
+        entries: list[_Entry] = []
+        for op in circuit.all_operations():
+            names = _qubit_names(op.qubits)
+            if self.qubit_mapping:
+                names = tuple(self.qubit_mapping.get(name, name) for name in names)
+            coupled = not self._coupled.isdisjoint(names)
+            if not coupled and not validate:
+                entries.append((op, names, None))
+                continue
+            inst = map_operation(op, validate=False)
+            if self.qubit_mapping:
+                inst = inst.model_copy(update={'qubits': names})
+            if not coupled and self._validation_error(inst) is None:
+                entries.append((op, names, None))
+                continue
+            qids.update(zip(names, op.qubits))
+            entries.append((op, names, inst))
+        return entries
+
+    def _transpile_operation(
+        self,
+        tracker: _ResonatorStateTracker,
+        op: cirq.Operation,
+        names: tuple[str, ...],
+        inst: Instruction,
+        *,
+        lookahead: Iterable[Instruction],
+        qids: dict[str, cirq.Qid],
+    ) -> list[cirq.Operation]:
+        """Native operations implementing ``op``, updating the state of ``tracker``.
+
+        Follows :meth:`iqm.iqm_client.transpile._ResonatorStateTracker.insert_moves`.
+        """
+        # pylint: disable=too-many-arguments
+        locus = inst.qubits
+        error = self._validation_error(inst)
+        if error is None:
+            # inst can be applied as is on locus, but we may first need to use MOVEs to make
+            # sure the locus qubits contain their states
+            if inst.name == tracker.move_gate:
+                return _move_operations(tracker.create_move_instructions(*locus), qids)
+            operations = []
+            if res_match := tracker.resonators_holding_qubits(locus):
+                operations += _move_operations(tracker.reset_as_move_instructions(res_match), qids)
+            operations.append(op if locus == names else op.with_qubits(*(qids[q] for q in locus)))
+            return operations
+
+        # inst can not be applied to this locus as is
+        if inst.name not in tracker.qr_gates_q2r or any(c in tracker.resonators for c in locus):
+            raise CircuitTranspilationError(error) from error
+        resolution = tracker.find_best_resolution(inst, lookahead)
+        if resolution is None:
+            raise CircuitTranspilationError(
+                f'Unable to find native gate sequence to enable fictional gate {inst.name} at {locus}.'
+                ' Try routing the circuit to the simplified architecture first.'
+            ) from error
+        *sequence, gate_inst = tracker.get_sequence(resolution, inst)
+        return _move_operations(sequence, qids) + [op.with_qubits(*(qids[q] for q in gate_inst.qubits))]
+
+
+def _native_transpilation_available(architecture: DynamicQuantumArchitecture) -> bool:
+    """True iff the private parts of the IQM client used by :class:`InsertMoves` are available."""
+    if _ResonatorStateTracker is None or not all(hasattr(IQMClient, name) for name in _PRIVATE_CLIENT_METHODS):
+        return False
+    try:
+        tracker = _ResonatorStateTracker.from_dynamic_architecture(architecture)
+    except Exception:  # pylint: disable=broad-exception-caught
+        return False
+    return all(hasattr(tracker, name) for name in _PRIVATE_TRACKER_ATTRIBUTES)
+
+
+def _instruction_circuit(entries: list[_Entry]) -> IQMCircuit:
+    """IQM circuit consisting of the instructions of the given entries."""
+    return IQMCircuit.model_construct(
+        name='Serialized from Cirq', instructions=tuple(inst for _, _, inst in entries if inst is not None)
     )
-    new_cirq_circuit = deserialize_circuit(new_iqm_client_circuit)
-    return new_cirq_circuit
+
+
+def _move_operations(instructions: Iterable[Instruction], qids: dict[str, cirq.Qid]) -> list[cirq.Operation]:
+    """MOVE operations corresponding to the given MOVE instructions."""
+    return [_MOVE_GATE.on(*(qids[q] for q in inst.qubits)) for inst in instructions]
@@ -16,12 +16,29 @@
 Mocks server calls for testing
 """
 
+import uuid
 from uuid import UUID
 
+import cirq
+from mockito import when
 import pytest
 
-from iqm.cirq_iqm import IQMDevice, IQMDeviceMetadata
-from iqm.iqm_client import DynamicQuantumArchitecture, GateImplementationInfo, GateInfo
+from iqm.cirq_iqm import Adonis, IQMDevice, IQMDeviceMetadata
+from iqm.cirq_iqm.iqm_sampler import IQMSampler
+import iqm.cirq_iqm.iqm_sampler as iqm_sampler_module
+from iqm.iqm_client import (
+    Circuit,
+    CircuitCompilationOptions,
+    DynamicQuantumArchitecture,
+    GateImplementationInfo,
+    GateInfo,
+    Instruction,
+    IQMClient,
+    Metadata,
+    RunRequest,
+)
+
+from .fake_iqm_server import FakeIQMServer
 
 existing_run = UUID('3c3fcda3-e860-46bf-92a4-bcc59fa76ce9')
 missing_run = UUID('059e4186-50a3-4e6c-ba1f-37fe6afbdfc2')
@@ -199,3 +216,97 @@ def device_with_multiple_resonators():
         },
     )
     return IQMDevice(IQMDeviceMetadata.from_architecture(multiple_resonators_arch))
+
+
+@pytest.fixture()
+def circuit_physical(adonis_architecture):
+    """Circuit with physical qubit names"""
+    qubit_1 = cirq.NamedQubit('QB1')
+    qubit_2 = cirq.NamedQubit('QB2')
+    circuit = cirq.Circuit(cirq.measure(qubit_1, qubit_2, key='result'))
+    circuit.iqm_calibration_set_id = adonis_architecture.calibration_set_id
+    return circuit
+
+
+@pytest.fixture()
+def iqm_metadata():
+    return Metadata(
+        request=RunRequest(
+            shots=4,
+            circuits=[
+                Circuit(
+                    name='circuit_1',
+                    instructions=(
+                        Instruction(name='measure', implementation=None, qubits=('QB1',), args={'key': 'm1'}),
+                    ),
+                )
+            ],
+        )
+    )
+
+
+@pytest.fixture()
+def adonis_sampler(base_url, adonis_architecture):
+    when(IQMClient).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
+    return IQMSampler(base_url, device=Adonis())
+
+
+@pytest.fixture()
+def adonis_architecture():
+    return DynamicQuantumArchitecture(
+        calibration_set_id=uuid.UUID('26c5e70f-bea0-43af-bd37-6212ec7d04cb'),
+        qubits=['QB1', 'QB2', 'QB3', 'QB4', 'QB5'],
+        computational_resonators=[],
+        gates={
+            'prx': GateInfo(
+                implementations={
+                    'drag_gaussian': GateImplementationInfo(loci=(('QB1',), ('QB2',), ('QB3',), ('QB4',), ('QB5',))),
+                },
+                default_implementation='drag_gaussian',
+                override_default_implementation={},
+            ),
+            'cz': GateInfo(
+                implementations={
+                    'tgss': GateImplementationInfo(
+                        loci=(('QB1', 'QB3'), ('QB2', 'QB3'), ('QB4', 'QB3'), ('QB5', 'QB3'))
+                    ),
+                },
+                default_implementation='tgss',
+                override_default_implementation={},
+            ),
+            'measure': GateInfo(
+                implementations={
+                    'constant': GateImplementationInfo(loci=(('QB1',), ('QB2',), ('QB3',), ('QB4',), ('QB5',))),
+                },
+                default_implementation='constant',
+                override_default_implementation={},
+            ),
+        },
+    )
+
+
+@pytest.fixture
+def create_run_request_default_kwargs(adonis_architecture) -> dict:
+    return {
+        'calibration_set_id': adonis_architecture.calibration_set_id,
+        'shots': 1,
+        'options': CircuitCompilationOptions(),
+    }
+
+
+@pytest.fixture
+def job_id():
+    return uuid.uuid4()
+
+
+@pytest.fixture
+def fast_polling(monkeypatch):
+    """Polls the submitted jobs without waiting between the calls."""
+    monkeypatch.setattr(iqm_sampler_module, 'SECONDS_BETWEEN_CALLS', 0.001)
+
+
+@pytest.fixture
+def fake_server(adonis_architecture):
+    """Local fake IQM server with the Adonis architecture."""
+    with FakeIQMServer(adonis_architecture) as server:
+        yield server
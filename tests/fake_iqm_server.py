@@ -0,0 +1,216 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Local fake IQM server for testing the communication of IQMSampler with the server over HTTP."""
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import threading
+from typing import Any, Optional
+import uuid
+
+from iqm.iqm_client import DynamicQuantumArchitecture, Status
+
+_PENDING = Status.PENDING_EXECUTION.value
+_CALIBRATED_GATES = re.compile(r'/api/v1/calibration/([^/]+)/gates')
+_JOB = re.compile(r'/jobs/([0-9a-f-]+)(/status|/abort|/counts)?')
+
+
+@dataclass
+class FakeJob:
+    """Job submitted to :class:`FakeIQMServer`."""
+
+    job_id: uuid.UUID
+    request: dict[str, Any]
+    """submitted run request"""
+    pending_polls: int
+    """number of status queries the job stays pending for"""
+    status: str = _PENDING
+    status_queries: int = 0
+    """number of times the status of the job has been queried"""
+
+
+class FakeIQMServer:  # pylint: disable=too-many-instance-attributes
+    """Implements the parts of the V1 IQM server API used by :class:`.IQMSampler`, on a local port.
+
+    Each job stays pending for ``pending_polls`` status queries, as set when the job was submitted, and then
+    becomes ready, or failed if ``fail_message`` is set. The measurement results are zeros unless
+    ``varied_results`` is set, and the measurement counts of a job are computed from the measurement results.
+
+    Args:
+        architecture: dynamic quantum architecture of the default calibration set
+        pending_polls: number of status queries each job submitted from now on stays pending for
+        fail_message: if not None, jobs fail with this message instead of becoming ready
+        serve_counts: iff False, the endpoint for the measurement counts of jobs is not found
+    """
+
+    def __init__(
+        self,
+        architecture: DynamicQuantumArchitecture,
+        *,
+        pending_polls: int = 1,
+        fail_message: Optional[str] = None,
+        serve_counts: bool = True,
+    ):
+        self.architecture = architecture
+        self.pending_polls = pending_polls
+        self.fail_message = fail_message
+        self.serve_counts = serve_counts
+        self.varied_results = False
+        """iff True, the measurement results vary between the shots, see :meth:`measurements`"""
+        self.jobs: dict[uuid.UUID, FakeJob] = {}
+        self.submissions_released = threading.Event()
+        """the replies to job submissions are delayed until this is set"""
+        self.submissions_released.set()
+        self.max_pending_jobs = 0
+        """largest number of jobs pending at the same time"""
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), _make_handler(self))
+
+    @property
+    def url(self) -> str:
+        """URL of the server."""
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host!s}:{port}'
+
+    def __enter__(self) -> FakeIQMServer:
+        threading.Thread(target=self._httpd.serve_forever, args=(0.01,), daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def submit(self, request: dict[str, Any]) -> FakeJob:
+        """Adds a new pending job."""
+        job = FakeJob(uuid.uuid4(), request, self.pending_polls)
+        with self._lock:
+            self.jobs[job.job_id] = job
+            pending = sum(1 for j in self.jobs.values() if j.status == _PENDING)
+            self.max_pending_jobs = max(self.max_pending_jobs, pending)
+        return job
+
+    def query_status(self, job: FakeJob) -> str:
+        """Status of the job, which finishes after it has been queried ``pending_polls`` times."""
+        with self._lock:
+            job.status_queries += 1
+            if job.status == _PENDING and job.status_queries > job.pending_polls:
+                job.status = Status.FAILED.value if self.fail_message is not None else Status.READY.value
+            return job.status
+
+    def abort(self, job: FakeJob) -> bool:
+        """Aborts the job, returns True iff it was pending."""
+        with self._lock:
+            if job.status != _PENDING:
+                return False
+            job.status = Status.ABORTED.value
+            return True
+
+    def measurements(self, job: FakeJob) -> list[dict[str, list[list[int]]]]:
+        """Measurement results of the finished job.
+
+        Unless ``varied_results`` is set, all the results are zeros. Otherwise shot ``s`` of the ``i``:th measurement
+        of ``n`` qubits in a circuit is ``(s >> i) % 2**n`` as an ``n``-bit big-endian bitstring.
+        """
+        shots = job.request['shots']
+        measurements = []
+        for circuit in job.request['circuits']:
+            circuit_measurements = {}
+            keys = (instruction for instruction in circuit['instructions'] if instruction['name'] == 'measure')
+            for i, instruction in enumerate(keys):
+                width = len(instruction['qubits'])
+                values = [(s >> i) % 2**width if self.varied_results else 0 for s in range(shots)]
+                circuit_measurements[instruction['args']['key']] = [
+                    [int(bit) for bit in format(value, f'0{width}b')] for value in values
+                ]
+            measurements.append(circuit_measurements)
+        return measurements
+
+    def run_result(self, job: FakeJob) -> dict[str, Any]:
+        """Run result of the job, as returned by the server."""
+        return {
+            'status': job.status,
+            'measurements': self.measurements(job) if job.status == Status.READY.value else None,
+            'message': self.fail_message if job.status == Status.FAILED.value else None,
+            'metadata': {'calibration_set_id': str(self.architecture.calibration_set_id), 'request': job.request},
+        }
+
+    def run_counts(self, job: FakeJob) -> dict[str, Any]:
+        """Measurement counts of the job, as returned by the server."""
+        counts_batch = None
+        if job.status == Status.READY.value:
+            counts_batch = [
+                {
+                    'measurement_keys': list(measurements),
+                    'counts': Counter(
+                        ''.join(''.join(map(str, shot)) for shot in shots) for shots in zip(*measurements.values())
+                    ),
+                }
+                for measurements in self.measurements(job)
+            ]
+        return {'status': job.status, 'counts_batch': counts_batch}
+
+
+def _make_handler(server: FakeIQMServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        """Routes the requests to ``server``."""
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            pass
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            if self.path == '/info/client-libraries':
+                return self._reply(200, {'iqm-client': {'name': 'IQM Client', 'min': '0', 'max': '1000'}})
+            if _CALIBRATED_GATES.fullmatch(self.path):
+                return self._reply(200, json.loads(server.architecture.model_dump_json()))
+            job, action = self._job()
+            if job is None or (action == '/counts' and not server.serve_counts):
+                return self._reply(404, {'detail': 'not found'})
+            if action == '/status':
+                return self._reply(200, {'status': server.query_status(job)})
+            if action == '/counts':
+                return self._reply(200, server.run_counts(job))
+            return self._reply(200, server.run_result(job))
+
+        def do_POST(self):  # pylint: disable=invalid-name
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if self.path == '/jobs':
+                job = server.submit(json.loads(body))
+                server.submissions_released.wait()
+                return self._reply(201, {'id': str(job.job_id)})
+            job, action = self._job()
+            if job is None or action != '/abort':
+                return self._reply(404, {'detail': 'not found'})
+            if not server.abort(job):
+                return self._reply(400, {'detail': 'job has already finished'})
+            return self._reply(200, {})
+
+        def _job(self) -> tuple[Optional[FakeJob], Optional[str]]:
+            match = _JOB.fullmatch(self.path)
+            if match is None:
+                return None, None
+            return server.jobs.get(uuid.UUID(match.group(1))), match.group(2)
+
+        def _reply(self, code: int, content: Any) -> None:
+            body = json.dumps(content).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
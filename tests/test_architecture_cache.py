@@ -0,0 +1,249 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for caching the dynamic quantum architecture."""
+import gc
+import threading
+import uuid
+
+from mockito import mock, verify, when
+import pytest
+
+from iqm.cirq_iqm import Adonis, IQMDeviceMetadata
+from iqm.cirq_iqm.architecture_cache import ArchitectureCache, ArchitectureStore
+from iqm.cirq_iqm.iqm_sampler import IQMSampler
+from iqm.iqm_client import IQMClient, RunRequest
+
+
+@pytest.fixture
+def architectures(adonis_architecture):
+    """Architectures of consecutive default calibration sets."""
+    return [adonis_architecture] + [
+        adonis_architecture.model_copy(update={'calibration_set_id': uuid.uuid4()}) for _ in range(2)
+    ]
+
+
+class _Fetcher:
+    """Returns the given architectures, repeating the last one."""
+
+    def __init__(self, architectures):
+        self.architectures = architectures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.architectures[min(self.calls, len(self.architectures)) - 1]
+
+
+def test_get_uses_cached_architecture_until_it_expires(architectures):
+    fetch = _Fetcher(architectures)
+    cache = ArchitectureCache(fetch, ttl=60)
+    assert cache.architecture is None
+    assert cache.get() == cache.get() == architectures[0]
+    assert fetch.calls == 1
+    assert cache.refresh() == architectures[1]
+    assert cache.get() == cache.architecture == architectures[1]
+    assert fetch.calls == 2
+
+
+@pytest.mark.parametrize('ttl, calls', [(0, 3), (None, 1)])
+def test_ttl(architectures, ttl, calls):
+    fetch = _Fetcher(architectures)
+    cache = ArchitectureCache(fetch, ttl=ttl)
+    for _ in range(3):
+        cache.get()
+    assert fetch.calls == calls
+
+
+def test_initial_architecture_is_fetched_on_first_get(architectures):
+    fetch = _Fetcher(architectures[1:])
+    cache = ArchitectureCache(fetch, ttl=None, architecture=architectures[0])
+    changes = []
+    cache.add_listener(lambda previous, new: changes.append((previous, new)))
+    assert cache.architecture == architectures[0]
+    assert cache.get() == cache.get() == architectures[1]
+    assert fetch.calls == 1
+    assert changes == [(architectures[0], architectures[1])]
+
+
+def test_invalid_ttl(architectures):
+    with pytest.raises(ValueError, match='ttl must be non-negative'):
+        ArchitectureCache(_Fetcher(architectures), ttl=-1)
+    with pytest.raises(ValueError, match='interval must be positive'):
+        ArchitectureCache(_Fetcher(architectures)).start_refreshing(0)
+
+
+def test_listeners_are_notified_when_calibration_set_changes(architectures):
+    changes = []
+    cache = ArchitectureCache(_Fetcher(architectures[:1] + architectures[1:2] * 2))
+    cache.add_listener(lambda previous, new: changes.append((previous, new)))
+    for _ in range(3):
+        cache.refresh()
+    assert changes == [(architectures[0], architectures[1])]
+
+
+def test_background_refresher(architectures):
+    cache = ArchitectureCache(_Fetcher(architectures), ttl=0)
+    changed = threading.Event()
+    cache.add_listener(lambda previous, new: changed.set())
+    cache.start_refreshing(0.01)
+    cache.start_refreshing(0.01)
+    assert changed.wait(5)
+    cache.stop_refreshing()
+
+
+def test_get_does_not_fetch_while_refreshing_in_background(architectures):
+    fetch = _Fetcher(architectures)
+    cache = ArchitectureCache(fetch, ttl=0)
+    cache.get()
+    cache.start_refreshing(60)
+    assert cache.get() == cache.get() == architectures[0]
+    assert fetch.calls == 1
+    cache.stop_refreshing()
+    cache.get()
+    assert fetch.calls == 2
+
+
+def _refresher_threads():
+    return {thread for thread in threading.enumerate() if thread.name == 'IQM architecture refresher'}
+
+
+def test_background_refresher_stops_when_cache_is_collected(architectures):
+    running = _refresher_threads()
+    cache = ArchitectureCache(_Fetcher(architectures))
+    cache.start_refreshing(60)
+    (thread,) = _refresher_threads() - running
+    del cache
+    gc.collect()
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_background_refresher_warns_on_failure():
+    failed = threading.Event()
+
+    def fetch():
+        failed.set()
+        raise ConnectionError('server unavailable')
+
+    cache = ArchitectureCache(fetch)
+    with pytest.warns(UserWarning, match='Failed to refresh the dynamic quantum architecture: server unavailable'):
+        cache.start_refreshing(0.01)
+        assert failed.wait(5)
+        cache.stop_refreshing()
+        threading.Event().wait(0.05)
+
+
+@pytest.mark.usefixtures('unstub')
+def test_sampler_does_not_fetch_architecture_when_submitting(base_url, architectures, circuit_physical):
+    when(IQMClient).get_dynamic_quantum_architecture(None).thenReturn(*architectures[:2])
+    when(IQMClient).create_run_request(...).thenReturn(mock(RunRequest))
+    sampler = IQMSampler(base_url)
+    for _ in range(3):
+        sampler.create_run_request(circuit_physical)
+    verify(IQMClient, times=1).get_dynamic_quantum_architecture(None)
+
+    sampler.architecture_cache.refresh()
+    with pytest.warns(UserWarning, match=f'has changed from {architectures[0].calibration_set_id}'):
+        sampler.create_run_request(circuit_physical)
+
+
+@pytest.mark.usefixtures('unstub')
+def test_sampler_refreshes_architecture_in_background(base_url, architectures):
+    when(IQMClient).get_dynamic_quantum_architecture(None).thenReturn(*architectures[:2])
+    when(IQMClient).close_auth_session().thenReturn(None)
+    sampler = IQMSampler(base_url, architecture_refresh_interval=0.01)
+    changed = threading.Event()
+    sampler.architecture_cache.add_listener(lambda previous, new: changed.set())
+    assert changed.wait(5)
+    sampler.close_client()
+    assert sampler.architecture_cache._stop_refreshing is None
+
+
+@pytest.mark.usefixtures('unstub')
+def test_sampler_refresher_stops_when_sampler_is_collected(tmp_path, base_url, architectures):
+    when(IQMClient).get_dynamic_quantum_architecture(None).thenReturn(architectures[0])
+    running = _refresher_threads()
+    sampler = IQMSampler(base_url, architecture_refresh_interval=60, architecture_cache_dir=tmp_path)
+    (thread,) = _refresher_threads() - running
+    del sampler
+    gc.collect()
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_store_saves_and_loads_metadata(tmp_path, adonis_architecture):
+    store = ArchitectureStore(tmp_path / 'cache')
+    url = 'https://example.com'
+    metadata = IQMDeviceMetadata.from_architecture(adonis_architecture)
+    assert store.load(url, None) is None
+    store.save(url, None, metadata)
+    assert store.load(url, None) == metadata
+    assert store.load(url + '/', None).architecture == adonis_architecture
+    assert store.load(url, adonis_architecture.calibration_set_id) is None
+    assert store.load('https://other.example.com', None) is None
+
+
+def test_store_ignores_unusable_entries(tmp_path, adonis_architecture):
+    store = ArchitectureStore(tmp_path)
+    url = 'https://example.com'
+    store.save(url, None, IQMDeviceMetadata.from_architecture(adonis_architecture))
+    store._version = 'other'
+    assert store.load(url, None) is None
+    (path,) = tmp_path.iterdir()
+    path.write_bytes(b'not a pickle')
+    assert store.load(url, None) is None
+
+
+def test_store_save_failures(tmp_path, adonis_architecture):
+    with pytest.raises(ValueError, match='without an architecture'):
+        ArchitectureStore(tmp_path).save('https://example.com', None, Adonis().metadata)
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    metadata = IQMDeviceMetadata.from_architecture(adonis_architecture)
+    with pytest.warns(UserWarning, match='Failed to save the dynamic quantum architecture'):
+        ArchitectureStore(blocker / 'cache').save('https://example.com', None, metadata)
+
+
+def test_store_removes_temporary_file_on_failure(tmp_path, adonis_architecture):
+    # an architecture that cannot be pickled
+    architecture = adonis_architecture.model_copy(update={'qubits': [*adonis_architecture.qubits, lambda: None]})
+    metadata = IQMDeviceMetadata.from_architecture(architecture)
+    store = ArchitectureStore(tmp_path)
+    with pytest.warns(UserWarning, match='Failed to save the dynamic quantum architecture'):
+        store.save('https://example.com', None, metadata)
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.usefixtures('unstub')
+def test_sampler_loads_saved_architecture(tmp_path, base_url, architectures, circuit_physical):
+    when(IQMClient).get_dynamic_quantum_architecture(None).thenReturn(*architectures[:2])
+    when(IQMClient).create_run_request(...).thenReturn(mock(RunRequest))
+    first = IQMSampler(base_url, architecture_cache_dir=tmp_path)
+    verify(IQMClient, times=1).get_dynamic_quantum_architecture(None)
+
+    sampler = IQMSampler(base_url, architecture_cache_dir=tmp_path)
+    verify(IQMClient, times=1).get_dynamic_quantum_architecture(None)
+    assert sampler.device == first.device
+    assert sampler._calibration_set_id == architectures[0].calibration_set_id
+
+    # the saved architecture is refreshed on the first submission
+    with pytest.warns(UserWarning, match=f'has changed from {architectures[0].calibration_set_id}'):
+        sampler.create_run_request(circuit_physical)
+    verify(IQMClient, times=2).get_dynamic_quantum_architecture(None)
+    sampler.create_run_request(circuit_physical)
+    verify(IQMClient, times=2).get_dynamic_quantum_architecture(None)
+
+    # the new default calibration set has been saved
+    assert IQMSampler(base_url, architecture_cache_dir=tmp_path).device.metadata.architecture == architectures[1]
+    verify(IQMClient, times=2).get_dynamic_quantum_architecture(None)
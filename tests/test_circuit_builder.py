@@ -0,0 +1,72 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for constructing circuits from moments and operations."""
+import random
+
+import cirq
+import pytest
+
+from iqm.cirq_iqm import IQMMoveGate
+from iqm.cirq_iqm.circuit_builder import circuit_from_moments, earliest_circuit
+
+
+@pytest.fixture
+def moments():
+    q = cirq.LineQubit.range(3)
+    return [
+        cirq.Moment(cirq.X(q[0]), cirq.CZ(q[1], q[2])),
+        cirq.Moment(),
+        cirq.Moment(cirq.measure(q[0], key='m')),
+        cirq.Moment(cirq.X(q[1]).with_classical_controls('m')),
+    ]
+
+
+def test_circuit_from_moments_uses_private_cirq_api(moments):
+    # circuit_from_moments depends on this private method of Cirq for speed
+    assert '_from_moments' in vars(cirq.Circuit)
+    circuit = circuit_from_moments(iter(moments))
+    assert circuit == cirq.Circuit(moments)
+    assert list(circuit) == moments
+
+
+def test_circuit_from_moments_without_private_cirq_api(moments, monkeypatch):
+    monkeypatch.delattr(cirq.Circuit, '_from_moments')
+    assert circuit_from_moments(iter(moments)) == cirq.Circuit(moments)
+
+
+def _random_operations(rng: random.Random) -> list[cirq.Operation]:
+    qubits = cirq.LineQubit.range(4)
+    operations: list[cirq.Operation] = []
+    keys: list[str] = []
+    for i in range(rng.randint(1, 30)):
+        r = rng.random()
+        if r < 0.3:
+            operations.append(cirq.PhasedXPowGate(exponent=0.5, phase_exponent=0.25)(rng.choice(qubits)))
+        elif r < 0.5:
+            operations.append(rng.choice([cirq.CZ, IQMMoveGate(), cirq.SWAP])(*rng.sample(qubits, 2)))
+        elif r < 0.7:
+            keys.append(rng.choice([f'm{i}', 'm']))
+            operations.append(cirq.measure(rng.choice(qubits), key=keys[-1]))
+        elif r < 0.85 and keys:
+            operations.append(cirq.X(rng.choice(qubits)).with_classical_controls(rng.choice(keys)))
+        else:
+            operations.append(cirq.rz(0.1)(rng.choice(qubits)))
+    return operations
+
+
+def test_earliest_circuit_places_operations_like_the_circuit_constructor():
+    rng = random.Random(1234)
+    for _ in range(100):
+        operations = _random_operations(rng)
+        assert earliest_circuit(iter(operations)) == cirq.Circuit(operations)
@@ -0,0 +1,142 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the circuit compilation pipeline."""
+import cirq
+from mockito import spy2, verify
+import pytest
+
+from iqm.cirq_iqm import Adonis, Apollo, CompilationPipeline, IQMDevice
+from iqm.cirq_iqm.optimizers import simplify_circuit
+
+
+def _circuit(angle: float = 0.3) -> cirq.Circuit:
+    qubits = cirq.LineQubit.range(4)
+    return cirq.Circuit(
+        cirq.H.on_each(*qubits),
+        [cirq.ZZPowGate(exponent=angle)(qubits[i], qubits[(i + 2) % 4]) for i in range(4)],
+        cirq.rx(angle).on_each(*qubits),
+        cirq.measure(*qubits, key='m'),
+    )
+
+
+def _hand_chained(device: IQMDevice, circuit: cirq.Circuit) -> cirq.Circuit:
+    """Compilation done the way the examples used to do it."""
+    routed, _, _ = device.route_circuit(simplify_circuit(device.decompose_circuit(circuit)))
+    return device.decompose_circuit(routed)
+
+
+@pytest.mark.parametrize('device', [Apollo(), 'device_with_resonator'])
+def test_compile_matches_hand_chained_stages(device, request):
+    if isinstance(device, str):
+        device = request.getfixturevalue(device)
+    circuit = _circuit()
+    result = device.compile(circuit)
+    expected = _hand_chained(device, circuit)
+    if device.resonators:
+        # routing already decomposes the circuit on devices with resonators
+        assert 'decompose_routed' not in result.stages
+        assert result.circuit == device.route_circuit(simplify_circuit(device.decompose_circuit(circuit)))[0]
+    else:
+        assert result.stages == ('decompose', 'simplify', 'route', 'decompose_routed', 'validate')
+        assert result.circuit == expected
+    assert result.cached_stages == ()
+    assert result.initial_mapping is not None and set(result.initial_mapping) == set(circuit.all_qubits())
+    assert result.final_mapping is not None
+    assert result.circuit.iqm_calibration_set_id == expected.iqm_calibration_set_id  # type: ignore
+    device.validate_circuit(result.circuit)
+
+
+@pytest.mark.usefixtures('unstub')
+def test_compile_uses_cache():
+    device = IQMDevice(Adonis().metadata, compilation_cache_size=16)
+    circuit = _circuit()
+    first = device.compile(circuit)
+    spy2(device.route_circuit)
+    spy2(device.validate_circuit)
+    second = device.compile(circuit.copy())
+    verify(device, times=0).route_circuit(...)
+    verify(device, times=0).validate_circuit(...)
+    assert second.circuit == first.circuit
+    assert second.cached_stages == second.stages
+    assert second.initial_mapping == first.initial_mapping
+    assert second.final_mapping == first.final_mapping
+
+    # the cached circuits are not shared with the results
+    second.circuit.append(cirq.X(device.qubits[0]))
+    assert device.compile(circuit).circuit == first.circuit
+
+
+def test_compile_freezes_each_circuit_once(monkeypatch):
+    device = IQMDevice(Adonis().metadata, compilation_cache_size=16)
+    frozen = []
+    freeze = cirq.Circuit.freeze
+
+    def counting_freeze(circuit):
+        frozen.append(circuit)
+        return freeze(circuit)
+
+    monkeypatch.setattr(cirq.Circuit, 'freeze', counting_freeze)
+    circuit = _circuit()
+    result = device.compile(circuit)
+    # the input circuit, and the outputs of the stages except validate, which returns its input
+    assert len(frozen) == len(result.stages)
+    assert frozen[0] is circuit
+    frozen.clear()
+    device.compile(circuit)
+    assert len(frozen) == 1
+
+
+def test_compile_cache_depends_on_stage_options():
+    device = IQMDevice(Adonis().metadata, compilation_cache_size=16)
+    circuit = _circuit()
+    device.compile(circuit)
+    result = device.compile(circuit, drop_final_rz=True)
+    # the decomposition is reused, the simplification is not,
+    # but it produces the same circuit as before so the rest of the stages are reused
+    assert result.stages == result.cached_stages[:1] + ('simplify',) + result.cached_stages[1:]
+    cached_stages = device.compile(circuit, qubit_subset=device.qubits[:4]).cached_stages
+    assert cached_stages[:2] == ('decompose', 'simplify')
+    assert 'route' not in cached_stages
+
+
+def test_compile_cache_cleared_by_decomposition_rule():
+    device = IQMDevice(Adonis().metadata, compilation_cache_size=16)
+    device.compile(_circuit())
+    device.register_decomposition_rule(cirq.HPowGate, lambda gate, qubits: None)
+    assert len(device.compilation_cache) == 0
+
+
+def test_compile_without_routing():
+    device = Adonis()
+    q = device.qubits
+    circuit = cirq.Circuit(cirq.H(q[0]), cirq.CZ(q[0], q[2]), cirq.measure(q[0], q[2], key='m'))
+    result = device.compile(circuit, route=False)
+    assert result.stages == ('decompose', 'simplify', 'validate')
+    assert result.initial_mapping is None and result.final_mapping is None
+    cirq.testing.assert_circuits_with_terminal_measurements_are_equivalent(result.circuit, circuit, atol=1e-8)
+
+    with pytest.raises(ValueError, match='Unsupported operation between qubits'):
+        device.compile(cirq.Circuit(cirq.CZ(q[0], q[1])), route=False)
+
+
+def test_compile_does_not_modify_the_circuit():
+    circuit = _circuit()
+    original = circuit.copy()
+    result = CompilationPipeline(Adonis(), decompose=False, simplify=False, route=False, validate=False)(circuit)
+    assert not result.stages
+    assert result.circuit == circuit
+    assert result.circuit is not circuit
+    Adonis().compile(circuit)
+    assert circuit == original
+    assert not hasattr(circuit, 'iqm_calibration_set_id')
@@ -11,11 +11,28 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from cirq import Circuit, HardCodedInitialMapper, NamedQid, NamedQubit, ops
+import pickle
+from typing import Optional
+
+from cirq import (
+    Circuit,
+    CircuitOperation,
+    FrozenCircuit,
+    GateFamily,
+    Gateset,
+    HardCodedInitialMapper,
+    Moment,
+    NamedQid,
+    NamedQubit,
+    Operation,
+    ops,
+)
 from cirq.testing import assert_circuits_have_same_unitary_given_final_permutation, assert_has_diagram, random_circuit
+import numpy as np
 import pytest
+from sympy import Symbol  # type: ignore
 
-from iqm.cirq_iqm import Adonis, Aphrodite, Apollo, IQMDevice, IQMMoveGate
+from iqm.cirq_iqm import Adonis, Aphrodite, Apollo, IQMDevice, IQMDeviceMetadata, IQMMoveGate
 
 
 def test_equality_method():
@@ -200,3 +217,355 @@ def test_move_gate_drawing():
     assert_has_diagram(c, "Qubit: ─────────────MOVE(QB)────\n                    │\nResonator (d=2): ───MOVE(Res)───")
 
     assert str(gate) == "MOVE(Qubit, Resonator (d=2))"
+
+
+def _has_valid_operation_targets_reference(device: IQMDevice, op) -> bool:
+    """Linear-scan reference implementation of IQMDevice.has_valid_operation_targets."""
+    matched_support = [
+        (g, loci) for g, loci in device.supported_operations.items() if op.gate is not None and op.gate in GateFamily(g)
+    ]
+    if not matched_support:
+        return False
+    gf, valid_loci = matched_support[0]
+    if gf == ops.MeasurementGate:
+        return all(q in {q for locus in valid_loci for q in locus} for q in op.qubits)
+    if issubclass(gf, ops.InterchangeableQubitsGate):
+        return any(set(t) == set(op.qubits) for t in valid_loci)
+    return op.qubits in valid_loci
+
+
+@pytest.mark.parametrize(
+    "device", ["device_without_resonator", "device_with_resonator", "device_with_multiple_resonators", Aphrodite()]
+)
+def test_has_valid_operation_targets_matches_reference(device: IQMDevice, request):
+    if isinstance(device, str):
+        device = request.getfixturevalue(device)
+    components = device.qubits + device.resonators
+    candidates = [ops.measure(q) for q in components] + [ops.measure(*components[:3])]
+    for q in components:
+        candidates += [ops.X(q), ops.rx(0.3)(q), ops.PhasedXPowGate(phase_exponent=0.1)(q), ops.Z(q)]
+    for q1 in components:
+        for q2 in components:
+            if q1 != q2:
+                candidates += [ops.CZ(q1, q2), IQMMoveGate()(q1, q2), ops.ISWAP(q1, q2), ops.CNOT(q1, q2)]
+    candidates.append(ops.X(NamedQid("QB1000", dimension=2)))
+    for op in candidates:
+        assert device.has_valid_operation_targets(op) == _has_valid_operation_targets_reference(device, op), op
+
+
+def test_validate_large_circuit():
+    """Validating a 50k-operation circuit only needs constant-time target lookups."""
+    device = Aphrodite()
+    edges = device.supported_operations[ops.CZPowGate]
+    operations = []
+    while len(operations) < 50_000:
+        for q1, q2 in edges:
+            operations += [ops.PhasedXPowGate(phase_exponent=0.25, exponent=0.5)(q1), ops.CZ(q1, q2)]
+    circuit = Circuit(operations[:50_000])
+    device.validate_circuit(circuit)
+
+
+@pytest.mark.parametrize("device", [Adonis(), Aphrodite(), "device_with_resonator"])
+def test_is_native_operation_matches_gateset(device: IQMDevice, request):
+    if isinstance(device, str):
+        device = request.getfixturevalue(device)
+    q1, q2 = device.qubits[:2]
+    candidates = [
+        ops.X(q1),
+        ops.rx(0.1)(q1),
+        ops.Z(q1),
+        ops.PhasedXPowGate(phase_exponent=0.3, exponent=0.1)(q1),
+        ops.CZ(q1, q2),
+        ops.CZPowGate(exponent=0.5)(q1, q2),
+        ops.CZPowGate(exponent=Symbol("t"))(q1, q2),
+        ops.CZ(q1, q2).with_tags("tag"),
+        ops.ISWAP(q1, q2),
+        ops.measure(q1, q2),
+        IQMMoveGate()(q1, q2),
+    ]
+    for op in candidates + candidates:
+        expected = op.gate in device.metadata.gateset and (
+            not isinstance(op.gate, ops.CZPowGate) or op.gate.exponent == 1
+        )
+        assert device.is_native_operation(op) == expected, op
+
+
+def test_is_native_operation_cache():
+    device = Adonis()
+    q1, q2 = device.qubits[:2]
+    assert device.native_operation_cache_info().currsize == 0
+    device.is_native_operation(ops.CZ(q1, q2))
+    device.is_native_operation(ops.CZ(q2, q1))
+    device.is_native_operation(ops.rx(0.1)(q1))
+    device.is_native_operation(ops.rx(0.2)(q2))
+    device.is_native_operation(ops.CZPowGate(exponent=0.5)(q1, q2))
+    info = device.native_operation_cache_info()
+    assert info.hits == 2
+    assert info.misses == 3
+    assert info.maxsize == IQMDevice.NATIVE_OPERATION_CACHE_SIZE
+
+
+def test_is_native_operation_with_instance_gateset():
+    metadata = IQMDeviceMetadata.from_qubit_indices(2, [{1, 2}])
+    metadata._gateset = Gateset(ops.PhasedXPowGate, ops.CZ, ops.MeasurementGate)
+    device = IQMDevice(metadata)
+    q1, q2 = device.qubits
+    assert device.is_native_operation(ops.CZ(q1, q2))
+    assert not device.is_native_operation(ops.CZPowGate(exponent=0.5)(q1, q2))
+    assert not device.is_native_operation(ops.X(q1))
+    assert device.is_native_operation(ops.PhasedXPowGate(phase_exponent=0.5)(q1))
+    assert device.native_operation_cache_info().misses == 4
+
+
+def test_decomposition_cache_rebinds_qubits():
+    device = Adonis()
+    q1, q2, q3 = device.qubits[:3]
+    gate = ops.ISwapPowGate(exponent=0.3)
+    first = device.decompose_operation(gate(q1, q3))
+    second = device.decompose_operation(gate(q2, q3))
+    assert device.decomposition_cache.misses == 1
+    assert device.decomposition_cache.hits == 1
+    assert first == device._decompose_operation(gate(q1, q3))
+    assert second == device._decompose_operation(gate(q2, q3))
+    # native operations are not cached
+    device.decompose_operation(ops.CZ(q1, q3))
+    assert len(device.decomposition_cache) == 1
+
+
+def test_decomposition_cache_eviction():
+    device = IQMDevice(IQMDeviceMetadata.from_qubit_indices(2, [{1, 2}]), decomposition_cache_size=2)
+    q1, q2 = device.qubits
+    for t in (0.1, 0.2, 0.3, 0.1):
+        device.decompose_operation(ops.ZZPowGate(exponent=t)(q1, q2))
+    assert len(device.decomposition_cache) == 2
+    assert device.decomposition_cache.misses == 4
+
+    disabled = IQMDevice(IQMDeviceMetadata.from_qubit_indices(2, [{1, 2}]), decomposition_cache_size=0)
+    disabled.decompose_operation(ops.ZZPowGate(exponent=0.1)(q1, q2))
+    assert len(disabled.decomposition_cache) == 0
+
+
+def test_decomposition_cache_sharing():
+    metadata = IQMDeviceMetadata.from_qubit_indices(2, [{1, 2}])
+    device_1 = IQMDevice(metadata, share_decomposition_cache=True)
+    device_2 = IQMDevice(IQMDeviceMetadata.from_qubit_indices(2, [{1, 2}]), share_decomposition_cache=True)
+    device_3 = IQMDevice(metadata)
+    assert device_1.decomposition_cache is device_2.decomposition_cache
+    assert device_1.decomposition_cache is not device_3.decomposition_cache
+    assert device_1.decomposition_cache is not IQMDevice(metadata).decomposition_cache
+    shared_adonis_cache = IQMDevice(Adonis().metadata, share_decomposition_cache=True).decomposition_cache
+    assert Adonis().decomposition_cache is not shared_adonis_cache
+
+
+def test_default_decomposition_rules_use_shared_gate_constants():
+    device = Adonis()
+    q1, q3 = device.qubits[0], device.qubits[2]
+    first = device.operation_decomposer(ops.ZZPowGate(exponent=0.1)(q1, q3))
+    second = device.operation_decomposer(ops.ZZPowGate(exponent=0.2)(q1, q3))
+    assert first[1].gate is second[1].gate
+    # subclasses are dispatched to the rule of their base class
+    assert device.operation_decomposer(ops.rz(0.3)(q1)) == device.operation_decomposer(
+        ops.ZPowGate(exponent=0.3 / np.pi, global_shift=-0.5)(q1)
+    )
+    assert device.operation_decomposer(ops.H(q1)) is None
+
+
+def test_register_decomposition_rule():
+    device = Adonis()
+    q1, q3 = device.qubits[0], device.qubits[2]
+    device.decompose_operation(ops.CNOT(q1, q3))
+    device.decompose_operation(ops.ISWAP(q1, q3))
+    assert len(device.decomposition_cache) == 2
+
+    def decompose_cnot(_gate, qubits):
+        # not a valid decomposition, but easy to tell apart from the default one
+        return [ops.CZ(*qubits), ops.X(qubits[1])]
+
+    device.register_decomposition_rule(ops.CXPowGate, decompose_cnot)
+    assert len(device.decomposition_cache) == 0
+    assert device.decompose_operation(ops.CNOT(q1, q3)) == decompose_cnot(ops.CNOT, (q1, q3))
+    assert Adonis().decompose_operation(ops.CNOT(q1, q3)) != decompose_cnot(ops.CNOT, (q1, q3))
+
+
+@pytest.mark.parametrize("device", [Adonis(), "device_with_resonator"])
+def test_decompose_circuit_preserve_moments(device: IQMDevice, request):
+    if isinstance(device, str):
+        device = request.getfixturevalue(device)
+    q = device.qubits[:3]
+    circuit = Circuit(
+        [
+            Moment(ops.H(q[0]), ops.X(q[1])),
+            Moment(),
+            Moment(ops.CNOT(q[0], q[1]), ops.Z(q[2])),
+            Moment(ops.X(q[2])),
+            Moment(ops.measure(q[0], key="m")),
+            Moment(ops.X(q[1]).with_classical_controls("m")),
+        ]
+    )
+    decomposed = device.decompose_circuit(circuit, preserve_moments=True)
+    # H -> 2 moments, empty moment kept, CNOT -> 3 moments, then 3 single moments
+    assert len(decomposed) == 2 + 1 + 3 + 3
+    assert len(decomposed[2]) == 0
+    assert decomposed[6] == Moment(ops.X(q[2]))
+    assert all(device.is_native_operation(op) for op in decomposed[:-1].all_operations())
+    assert_circuits_have_same_unitary_given_final_permutation(
+        decomposed[:-2], circuit[:-2], qubit_map={qubit: qubit for qubit in q}
+    )
+    assert (
+        decomposed.iqm_calibration_set_id  # type: ignore
+        == device.decompose_circuit(circuit).iqm_calibration_set_id  # type: ignore
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_decompose_circuit_packs_like_the_circuit_constructor(seed):
+    device = Apollo()
+    q = device.qubits[:4]
+    circuit = random_circuit(q, n_moments=10, op_density=0.7, random_state=seed)
+    circuit.append([ops.measure(q[0], key="m"), ops.X(q[1]).with_classical_controls("m")])
+    expected = Circuit(device.decompose_operation(op) for op in circuit.all_operations())
+    assert device.decompose_circuit(circuit) == expected
+
+
+def test_decompose_moment_respects_classical_dependencies():
+    device = Adonis()
+    q1, q2 = device.qubits[:2]
+    moment = Moment(CircuitOperation(FrozenCircuit(ops.measure(q1, key="m"), ops.X(q2).with_classical_controls("m"))))
+    assert [len(m) for m in device._decompose_moment(moment)] == [1, 1]
+
+
+def test_routing_graph_and_routers_are_cached(device_with_resonator):
+    device = device_with_resonator
+    graph = device.routing_graph
+    assert graph is device.routing_graph
+    assert not any(r in graph for r in device.resonators)
+    # all qubits connected to the same resonator are connected in the routing graph
+    assert graph.number_of_edges() == 15
+
+    q = device.qubits
+    circuit = Circuit(ops.CZ(q[0], q[1]), ops.CZ(q[1], q[2]), ops.CZ(q[0], q[2]))
+    routed_1, _, _ = device.route_circuit(circuit)
+    router = device._routers[None]
+    routed_2, _, _ = device.route_circuit(circuit)
+    assert device._routers[None] is router
+    assert routed_1 == routed_2
+
+    subset = q[:4]
+    device.route_circuit(circuit, qubit_subset=subset)
+    device.route_circuit(circuit, qubit_subset=subset[::-1])
+    assert len(device._routers) == 2
+    assert set(device._routers[frozenset(subset)].device_graph.nodes) == set(subset)
+
+
+def test_routing_graph_without_resonators():
+    device = Adonis()
+    assert device.routing_graph is device.metadata.nx_graph
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+@pytest.mark.parametrize("device", [Adonis(), "device_with_resonator"])
+def test_route_circuits(device: IQMDevice, max_workers, request):
+    if isinstance(device, str):
+        device = request.getfixturevalue(device)
+    circuits = [
+        device.decompose_circuit(random_circuit(device.qubits[:4], 4, 0.8, random_state=seed)) for seed in range(5)
+    ]
+    naive_map = {q: q for q in device.qubits}
+    results = device.route_circuits(circuits, max_workers=max_workers, initial_mapper=HardCodedInitialMapper(naive_map))
+    assert len(results) == len(circuits)
+    for circuit, (routed, initial_map, final_map) in zip(circuits, results):
+        expected = device.route_circuit(circuit, initial_mapper=HardCodedInitialMapper(naive_map))
+        assert routed == expected[0]
+        assert initial_map == expected[1]
+        assert final_map == expected[2]
+        assert routed.iqm_calibration_set_id == expected[0].iqm_calibration_set_id  # type: ignore
+
+
+class _TaggingDevice(IQMDevice):
+    """Device that decomposes SWAP gates in its own way, tagging the resulting operations."""
+
+    def operation_decomposer(self, op: Operation) -> Optional[list[Operation]]:
+        if isinstance(op.gate, ops.SwapPowGate) and op.gate.exponent == 1:
+            a, b = op.qubits
+            decomposition: list[Operation] = []
+            for control, target in [(a, b), (b, a), (a, b)]:
+                decomposition += [ops.ry(-np.pi / 2)(target), ops.CZ(control, target), ops.ry(np.pi / 2)(target)]
+            return [decomposed.with_tags("custom") for decomposed in decomposition]
+        return super().operation_decomposer(op)
+
+
+def test_route_circuits_in_parallel_uses_device_subclass(device_with_resonator):
+    device = _TaggingDevice(device_with_resonator.metadata, routing_cache_size=8)
+    circuits = [
+        device.decompose_circuit(random_circuit(device.qubits[:4], 4, 0.8, random_state=seed)) for seed in range(5)
+    ]
+    results = device.route_circuits(circuits, max_workers=2)
+    assert any("custom" in op.tags for routed, _, _ in results for op in routed.all_operations())
+    for circuit, result in zip(circuits, results):
+        assert result == device.route_circuit(circuit)
+
+
+def _decompose_cnot(_gate, qubits):
+    return [ops.CZ(*qubits), ops.X(qubits[1])]
+
+
+def test_pickled_device_keeps_type_and_settings(device_with_resonator):
+    device = _TaggingDevice(
+        device_with_resonator.metadata, decomposition_cache_size=16, routing_cache_size=8, compilation_cache_size=4
+    )
+    device.register_decomposition_rule(ops.CXPowGate, _decompose_cnot)
+    device.decompose_circuit(Circuit(ops.ZZ(*device.qubits[:2])))
+    copy = pickle.loads(pickle.dumps(device))
+    assert type(copy) is _TaggingDevice  # pylint: disable=unidiomatic-typecheck
+    assert copy.metadata == device.metadata
+    assert copy._decomposition_rules == device._decomposition_rules
+    assert (copy.decomposition_cache.maxsize, copy.routing_cache.maxsize, copy.compilation_cache.maxsize) == (16, 8, 4)
+    assert len(copy.decomposition_cache) == 0
+    assert copy.decompose_circuit(Circuit(ops.SWAP(*device.qubits[:2]))) == device.decompose_circuit(
+        Circuit(ops.SWAP(*device.qubits[:2]))
+    )
+
+
+def _ansatz(qubits, angle):
+    circuit = Circuit()
+    for layer in range(3):
+        circuit.append(ops.ry(angle * (layer + 1))(q) for q in qubits)
+        circuit.append(ops.CZ(qubits[i], qubits[(i + layer + 1) % len(qubits)]) for i in range(len(qubits)))
+        circuit.append(ops.ZZPowGate(exponent=angle)(qubits[0], qubits[-1]))
+    circuit.append(ops.measure(q, key=f"m{i}") for i, q in enumerate(qubits))
+    return circuit
+
+
+@pytest.mark.parametrize("device", [Apollo(), "device_with_resonator"])
+def test_routing_cache(device: IQMDevice, request):
+    if isinstance(device, str):
+        device = request.getfixturevalue(device)
+    cached_device = IQMDevice(device.metadata, routing_cache_size=8)
+    qubits = [NamedQubit(f"q{i}") for i in range(5)]
+    for angle in (0.1, 0.2, 0.3):
+        circuit = device.decompose_circuit(_ansatz(qubits, angle))
+        expected = device.route_circuit(circuit)
+        routed = cached_device.route_circuit(circuit)
+        assert routed == expected
+        assert routed[0].iqm_calibration_set_id == expected[0].iqm_calibration_set_id  # type: ignore
+    assert cached_device.routing_cache.misses == 1
+    assert cached_device.routing_cache.hits == 2
+
+    # a different interaction pattern is a cache miss
+    circuit = device.decompose_circuit(_ansatz(qubits[::-1], 0.1))
+    assert cached_device.route_circuit(circuit) == device.route_circuit(circuit)
+    assert cached_device.routing_cache.misses == 2
+    # and so is a different initial mapper
+    mapper = HardCodedInitialMapper({q: device.qubits[i] for i, q in enumerate(qubits)})
+    assert cached_device.route_circuit(circuit, initial_mapper=mapper) == device.route_circuit(
+        circuit, initial_mapper=mapper
+    )
+    assert cached_device.routing_cache.misses == 3
+    assert len(cached_device.routing_cache) == 3
+
+
+def test_routing_cache_disabled_by_default():
+    device = Adonis()
+    device.route_circuit(Circuit(ops.CZ(*device.qubits[:2])))
+    assert device.routing_cache.maxsize == 0
+    assert len(device.routing_cache) == 0
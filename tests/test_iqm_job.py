@@ -0,0 +1,159 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for submitting jobs asynchronously using IQMSampler."""
+from concurrent.futures import CancelledError
+import threading
+import uuid
+
+import cirq
+from mockito import ANY, mock, verify, when
+import numpy as np
+import pytest
+
+from iqm.cirq_iqm.iqm_sampler import IQMJob, serialize_circuit, wait_for_jobs
+from iqm.iqm_client import (
+    APITimeoutError,
+    CircuitExecutionError,
+    IQMClient,
+    JobAbortionError,
+    RunRequest,
+    RunResult,
+    RunStatus,
+    Status,
+)
+
+
+@pytest.mark.usefixtures('unstub', 'fast_polling')
+def test_submit_polls_job_in_background(
+    adonis_sampler, circuit_physical, iqm_metadata, create_run_request_default_kwargs, job_id
+):
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    client = mock(IQMClient)
+    run_request = RunRequest(circuits=[serialize_circuit(circuit_physical)], shots=1)
+    run_result = RunResult(status=Status.READY, measurements=[{'result': [[0, 1]]}], metadata=iqm_metadata)
+    when(client).create_run_request(ANY, **create_run_request_default_kwargs).thenReturn(run_request)
+    when(client).submit_run_request(run_request).thenReturn(job_id)
+    when(client).get_run_status(job_id).thenReturn(
+        RunStatus(status=Status.PENDING_EXECUTION), RunStatus(status=Status.READY)
+    )
+    when(client).get_run(job_id).thenReturn(run_result)
+    adonis_sampler._client = client
+
+    job = adonis_sampler.submit(circuit_physical)
+    assert isinstance(job, IQMJob)
+    assert job.job_id == job_id
+    results = job.result(timeout=5)
+    assert job.done()
+    assert not job.cancelled()
+    assert job.exception() is None
+    assert len(results) == 1
+    assert results[0].params == cirq.ParamResolver()
+    assert results[0].metadata.job_id == job_id
+    assert results[0].metadata.request == run_request
+    np.testing.assert_array_equal(results[0].measurements['result'], np.array([[0, 1]]))
+    verify(client, times=2).get_run_status(job_id)
+    verify(client, times=0).wait_for_results(...)
+
+
+@pytest.mark.usefixtures('unstub', 'fast_polling')
+def test_submit_many_jobs_and_wait_for_them(adonis_sampler, circuit_physical, iqm_metadata):
+    client = mock(IQMClient)
+    job_ids = [uuid.uuid4() for _ in range(20)]
+    run_result = RunResult(status=Status.READY, measurements=[{'result': [[0, 1]]}], metadata=iqm_metadata)
+    when(client).create_run_request(...).thenReturn(RunRequest(circuits=[], shots=1))
+    when(client).submit_run_request(...).thenReturn(*job_ids)
+    for i, job_id in enumerate(job_ids):
+        pending = [RunStatus(status=Status.PENDING_EXECUTION)] * (i % 3)
+        when(client).get_run_status(job_id).thenReturn(*pending, RunStatus(status=Status.READY))
+    when(client).get_run(...).thenReturn(run_result)
+    adonis_sampler._client = client
+
+    jobs = [adonis_sampler.submit([circuit_physical, circuit_physical]) for _ in job_ids]
+    assert [job.job_id for job in jobs] == job_ids
+    done, not_done = wait_for_jobs(jobs, timeout=5)
+    assert done == jobs
+    assert not not_done
+    for job in jobs:
+        results = job.result()
+        assert all(result.params == cirq.ParamResolver() for result in results)
+    verify(client, times=len(job_ids)).get_run(...)
+
+
+@pytest.mark.usefixtures('unstub', 'fast_polling')
+def test_submit_job_fails(adonis_sampler, circuit_physical, job_id):
+    client = mock(IQMClient)
+    when(client).create_run_request(...).thenReturn(RunRequest(circuits=[], shots=1))
+    when(client).submit_run_request(...).thenReturn(job_id)
+    when(client).get_run_status(job_id).thenReturn(RunStatus(status=Status.FAILED))
+    when(client).get_run(job_id).thenRaise(CircuitExecutionError('execution failed'))
+    adonis_sampler._client = client
+
+    job = adonis_sampler.submit(circuit_physical)
+    assert isinstance(job.exception(timeout=5), CircuitExecutionError)
+    with pytest.raises(CircuitExecutionError, match='execution failed'):
+        job.result()
+
+
+@pytest.mark.usefixtures('unstub', 'fast_polling')
+def test_submit_job_times_out(adonis_sampler, circuit_physical, job_id):
+    client = mock(IQMClient)
+    when(client).create_run_request(...).thenReturn(RunRequest(circuits=[], shots=1))
+    when(client).submit_run_request(...).thenReturn(job_id)
+    when(client).get_run_status(job_id).thenReturn(RunStatus(status=Status.PENDING_COMPILATION))
+    adonis_sampler._client = client
+    adonis_sampler._run_sweep_timeout = 0
+
+    job = adonis_sampler.submit(circuit_physical)
+    with pytest.raises(APITimeoutError, match="didn't finish in 0 seconds"):
+        job.result(timeout=5)
+
+
+@pytest.mark.usefixtures('unstub', 'fast_polling')
+def test_cancel_submitted_job(adonis_sampler, circuit_physical, job_id):
+    client = mock(IQMClient)
+    when(client).create_run_request(...).thenReturn(RunRequest(circuits=[], shots=1))
+    when(client).submit_run_request(...).thenReturn(job_id)
+    polled = threading.Event()
+
+    def pending(*_):
+        polled.set()
+        return RunStatus(status=Status.PENDING_EXECUTION)
+
+    when(client).get_run_status(job_id).thenAnswer(pending)
+    when(client).abort_job(job_id)
+    adonis_sampler._client = client
+
+    job = adonis_sampler.submit(circuit_physical)
+    assert polled.wait(timeout=5)
+    assert job.cancel()
+    assert job.cancelled()
+    assert job.done()
+    verify(client, times=1).abort_job(job_id)
+    with pytest.raises(CancelledError):
+        job.result()
+    # a finished job cannot be cancelled
+    assert not job.cancel()
+    verify(client, times=1).abort_job(job_id)
+
+
+@pytest.mark.usefixtures('unstub')
+def test_cancel_job_abortion_fails(adonis_sampler, job_id):
+    client = mock(IQMClient)
+    when(client).abort_job(job_id).thenRaise(JobAbortionError)
+    adonis_sampler._client = client
+
+    job = IQMJob(adonis_sampler, job_id, mock(RunRequest))
+    with pytest.warns(UserWarning, match='Failed to abort job'):
+        assert not job.cancel()
+    assert not job.done()
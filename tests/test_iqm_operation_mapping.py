@@ -11,6 +11,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import timeit
+
 import cirq
 from cirq import (
     ClassicallyControlledOperation,
@@ -25,10 +27,14 @@ from cirq import (
 from mockito import mock
 import pytest
 from sympy import Eq, symbols  # type: ignore
+import sympy  # type: ignore
 
+from iqm import iqm_client
 from iqm.cirq_iqm.iqm_gates import IQMMoveGate
 from iqm.cirq_iqm.serialize import (
+    CircuitTemplate,
     OperationNotSupportedError,
+    deserialize_circuit,
     instruction_to_operation,
     map_operation,
     serialize_circuit,
@@ -100,6 +106,40 @@ def test_raises_error_for_non_trivial_invert_mask(qubit_1, qubit_2):
         map_operation(operation)
 
 
+class _SubclassedCZ(CZPowGate):
+    pass
+
+
+def test_maps_gate_subclasses(qubit_1, qubit_2):
+    mapped = map_operation(GateOperation(_SubclassedCZ(), [qubit_1, qubit_2]))
+    assert mapped == Instruction(name='cz', qubits=(str(qubit_1), str(qubit_2)), args={})
+    with pytest.raises(OperationNotSupportedError, match='only 1 is natively supported'):
+        map_operation(GateOperation(_SubclassedCZ(exponent=0.5), [qubit_1, qubit_2]))
+
+
+def test_unvalidated_serialization_equals_validated():
+    q = cirq.NamedQid.range(3, prefix='QB', dimension=2)
+    circuit = cirq.Circuit(
+        cirq.X(q[0]) ** 0.5,
+        cirq.PhasedXPowGate(exponent=0.25, phase_exponent=0.1)(q[1]),
+        cirq.CZ(q[0], q[1]),
+        IQMMoveGate()(q[2], q[1]),
+        cirq.measure(q[0], key='m'),
+        cirq.X(q[1]).with_classical_controls('m'),
+        cirq.measure(q[1], q[2], key='result'),
+    )
+    for op in circuit.all_operations():
+        if not isinstance(op, ClassicallyControlledOperation):
+            assert map_operation(op, validate=False) == map_operation(op)
+    assert serialize_circuit(circuit, validate=False) == serialize_circuit(circuit)
+
+
+def test_unvalidated_serialization_raises_for_unsupported_operation(qubit_1):
+    circuit = cirq.Circuit(cirq.Z(qubit_1))
+    with pytest.raises(OperationNotSupportedError):
+        serialize_circuit(circuit, validate=False)
+
+
 def test_instruction_to_operation():
     instruction = Instruction(name='prx', qubits=('QB1',), args={'angle_t': 0.5, 'phase_t': 0.25})
     operation = instruction_to_operation(instruction)
@@ -191,3 +231,183 @@ def test_cc_prx_error_circuits():
     cc_z_circuit = cirq.Circuit(cirq.measure(qubits[0], key='f'), cirq.Z(qubits[1]).with_classical_controls('f'))
     with pytest.raises(OperationNotSupportedError, match='Classical control on the Z gate is not supported.'):
         serialize_circuit(cc_z_circuit)
+
+
+def _assert_serialized_circuits_close(actual, expected):
+    assert len(actual) == len(expected)
+    for a, e in zip(actual, expected):
+        assert a.name == e.name
+        assert len(a.instructions) == len(e.instructions)
+        for inst_a, inst_e in zip(a.instructions, e.instructions):
+            assert (inst_a.name, inst_a.qubits) == (inst_e.name, inst_e.qubits)
+            assert inst_a.args.keys() == inst_e.args.keys()
+            for key, value in inst_e.args.items():
+                if isinstance(value, float):
+                    assert inst_a.args[key] == pytest.approx(value, abs=1e-12)
+                else:
+                    assert inst_a.args[key] == value
+
+
+def test_circuit_template_bind():
+    t, p = symbols('t p')
+    q = cirq.LineQubit.range(3)
+    circuit = cirq.Circuit(
+        cirq.X(q[0]) ** t,
+        cirq.Y(q[1]) ** (2 * t),
+        cirq.PhasedXPowGate(exponent=0.5, phase_exponent=p + 0.3)(q[2]),
+        cirq.rx(t)(q[1]),
+        cirq.CZ(q[0], q[1]),
+        cirq.measure(q[0], key='m'),
+        cirq.PhasedXPowGate(exponent=t, phase_exponent=p)(q[1]).with_classical_controls('m'),
+        cirq.measure(q[1], q[2], key='result'),
+    )
+    resolvers = list(cirq.to_resolvers(cirq.Linspace('t', -1, 3, 7) * cirq.Linspace('p', -2.5, 2.5, 5)))
+    template = CircuitTemplate(circuit)
+    assert template.parametrized_instructions == 5
+    _assert_serialized_circuits_close(
+        template.bind(resolvers),
+        [serialize_circuit(cirq.resolve_parameters(circuit, resolver)) for resolver in resolvers],
+    )
+
+
+@pytest.mark.parametrize('canonicalize', [False, True])
+def test_circuit_template_bind_at_special_phases(canonicalize, monkeypatch):
+    if canonicalize:
+        # mimic Cirq versions that turn resolved PhasedXPowGates into XPowGates and YPowGates
+        resolve = cirq.PhasedXPowGate._resolve_parameters_
+
+        def canonicalizing_resolve(self, resolver, recursive):
+            gate = resolve(self, resolver, recursive)
+            special = {
+                0: cirq.XPowGate(exponent=gate.exponent),
+                0.5: cirq.YPowGate(exponent=gate.exponent),
+                1: cirq.XPowGate(exponent=-gate.exponent),
+                -0.5: cirq.YPowGate(exponent=-gate.exponent),
+            }
+            return special.get(gate.phase_exponent, gate)
+
+        monkeypatch.setattr(cirq.PhasedXPowGate, '_resolve_parameters_', canonicalizing_resolve)
+
+    t, p = symbols('t p')
+    q = cirq.LineQubit.range(2)
+    circuit = cirq.Circuit(
+        cirq.PhasedXPowGate(exponent=t, phase_exponent=p)(q[0]),
+        cirq.PhasedXPowGate(exponent=0.5, phase_exponent=2 * p - 1)(q[1]),
+        cirq.measure(*q, key='m'),
+    )
+    phases = [0, 0.5, 1, -0.5, -1, 1.5, 2, 0.25, 1e-12]
+    resolvers = [cirq.ParamResolver({'t': 0.7, 'p': phase}) for phase in phases]
+    bound = CircuitTemplate(circuit).bind(resolvers)
+    expected = [serialize_circuit(cirq.resolve_parameters(circuit, resolver)) for resolver in resolvers]
+    if canonicalize:
+        assert bound[:7] == expected[:7]
+    _assert_serialized_circuits_close(bound, expected)
+
+
+def test_circuit_template_compiles_expressions_once(monkeypatch):
+    t = symbols('t')
+    q = cirq.LineQubit.range(2)
+    circuit = cirq.Circuit(cirq.X(q[0]) ** t, cirq.PhasedXPowGate(exponent=0.5, phase_exponent=t + 0.3)(q[1]))
+    template = CircuitTemplate(circuit)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('expressions must not be compiled when binding')
+
+    monkeypatch.setattr(sympy, 'lambdify', fail)
+    resolvers = list(cirq.to_resolvers(cirq.Linspace('t', 0, 1, 3)))
+    for _ in range(2):
+        _assert_serialized_circuits_close(
+            template.bind(resolvers),
+            [serialize_circuit(cirq.resolve_parameters(circuit, resolver)) for resolver in resolvers],
+        )
+
+
+def test_circuit_template_without_parameters():
+    q = cirq.LineQubit.range(2)
+    circuit = cirq.Circuit(cirq.X(q[0]), cirq.CZ(*q), cirq.measure(*q, key='m'))
+    template = CircuitTemplate(circuit)
+    assert template.parametrized_instructions == 0
+    assert template.bind([cirq.ParamResolver()] * 2) == [serialize_circuit(circuit)] * 2
+
+
+def test_circuit_template_falls_back_to_resolving_each_circuit():
+    t = symbols('t')
+    q = cirq.LineQubit.range(2)
+    circuit = cirq.Circuit(cirq.X(q[0]) ** t, cirq.CZPowGate(exponent=t)(*q))
+    template = CircuitTemplate(circuit)
+    assert template.parametrized_instructions == 0
+    assert template.bind([cirq.ParamResolver({'t': 1.0})]) == [
+        serialize_circuit(cirq.Circuit(cirq.X(q[0]), cirq.CZ(*q)))
+    ]
+    with pytest.raises(OperationNotSupportedError):
+        template.bind([cirq.ParamResolver({'t': 0.5})])
+
+
+def test_unvalidated_circuit_template_bind_equals_validated():
+    t = symbols('t')
+    q = cirq.LineQubit.range(2)
+    circuit = cirq.Circuit(cirq.X(q[0]) ** t, cirq.CZ(*q), cirq.measure(*q, key='m'))
+    resolvers = list(cirq.to_resolvers(cirq.Linspace('t', 0, 1, 3)))
+    assert CircuitTemplate(circuit, validate=False).bind(resolvers) == CircuitTemplate(circuit).bind(resolvers)
+
+
+def test_deserialize_circuit_places_operations_like_the_circuit_constructor():
+    instructions = [
+        Instruction(name='prx', qubits=('QB1',), args={'angle_t': 0.25, 'phase_t': 0.0}),
+        Instruction(name='measure', qubits=('QB1',), args={'key': 'm'}),
+        Instruction(name='prx', qubits=('QB2',), args={'angle_t': 0.5, 'phase_t': 0.25}),
+        Instruction(
+            name='cc_prx',
+            qubits=('QB3',),
+            args={'angle_t': 0.5, 'phase_t': 0.0, 'feedback_qubit': 'QB1', 'feedback_key': 'm'},
+        ),
+        Instruction(
+            name='cc_prx',
+            qubits=('QB2',),
+            args={'angle_t': 0.5, 'phase_t': 0.0, 'feedback_qubit': 'QB1', 'feedback_key': 'm'},
+        ),
+        Instruction(name='cz', qubits=('QB2', 'QB4'), args={}),
+        Instruction(name='move', qubits=('QB5', 'COMP_R'), args={}),
+        Instruction(name='measure', qubits=('QB4',), args={'key': 'm2'}),
+        Instruction(name='measure', qubits=('QB5',), args={'key': 'm'}),
+    ]
+    circuit = deserialize_circuit(iqm_client.Circuit(name='test', instructions=instructions))
+    expected = cirq.Circuit(map(instruction_to_operation, instructions))
+    assert circuit == expected
+    assert len(circuit) == 5
+
+
+def test_deserialize_circuit_interns_qubits_and_operations():
+    instructions = [
+        Instruction(name='cz', qubits=('QB1', 'QB2'), args={}),
+        Instruction(name='prx', qubits=('QB1',), args={'angle_t': 0.25, 'phase_t': 0.0}),
+        Instruction(name='cz', qubits=('QB1', 'QB2'), args={}),
+        Instruction(name='prx', qubits=('QB2',), args={'angle_t': 0.25, 'phase_t': 0.0}),
+    ]
+    ops = list(deserialize_circuit(iqm_client.Circuit(name='test', instructions=instructions)).all_operations())
+    assert ops[0] is ops[2]
+    assert ops[1].qubits[0] is ops[0].qubits[0]
+    assert ops[1].gate is ops[3].gate
+
+
+def _native_circuit(layers: int) -> cirq.Circuit:
+    qubits = cirq.NamedQid.range(1, 21, prefix='QB', dimension=2)
+    moments = []
+    for layer in range(layers):
+        moments.append(cirq.Moment(cirq.PhasedXPowGate(exponent=0.5, phase_exponent=0.25)(q) for q in qubits))
+        moments.append(cirq.Moment(cirq.CZ(a, b) for a, b in zip(qubits[layer % 2 :: 2], qubits[layer % 2 + 1 :: 2])))
+    moments.append(cirq.Moment(cirq.measure(q, key=f'm{i}') for i, q in enumerate(qubits)))
+    return cirq.Circuit(moments)
+
+
+def test_round_trip_benchmark():
+    circuit = _native_circuit(200)
+    serialized = serialize_circuit(circuit)
+    assert deserialize_circuit(serialized) == cirq.Circuit(circuit.all_operations())
+
+    # the single-pass moment builder, including the operation conversion, beats the generic
+    # earliest insertion of the Circuit constructor on the already converted operations
+    operations = list(circuit.all_operations())
+    deserialize_time = min(timeit.repeat(lambda: deserialize_circuit(serialized), number=1, repeat=3))
+    constructor_time = min(timeit.repeat(lambda: cirq.Circuit(operations), number=1, repeat=3))
+    assert deserialize_time < constructor_time
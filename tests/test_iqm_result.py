@@ -0,0 +1,232 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for decoding and storing the measurement results of IQMSampler."""
+import uuid
+
+import cirq
+from mockito import mock
+import numpy as np
+import pytest
+
+from iqm.cirq_iqm.iqm_result import IQMCounts, IQMResult, PackedBits, ResultMetadata
+from iqm.cirq_iqm.iqm_sampler import IQMSampler, _decode_measurements, _pack_measurements
+from iqm.iqm_client import CircuitExecutionError, Counts, RunRequest
+
+
+@pytest.fixture
+def result_metadata():
+    return ResultMetadata(uuid.uuid4(), None, mock(RunRequest))
+
+
+@pytest.fixture
+def bits():
+    return np.random.default_rng(1).integers(0, 2, (100, 11), dtype=np.uint8)
+
+
+def test_decode_measurements_of_batch():
+    measurements = [{'a': [[0, 1], [1, 1], [0, 0]], 'b': [[1], [0], [1]]} for _ in range(4)]
+    measurements[2]['c'] = [[1, 0, 1]]
+    decoded = _decode_measurements(measurements)
+
+    assert [list(circuit) for circuit in decoded] == [['a', 'b'], ['a', 'b'], ['a', 'b', 'c'], ['a', 'b']]
+    for circuit, circuit_measurements in zip(decoded, measurements):
+        for key, values in circuit_measurements.items():
+            assert circuit[key].dtype == np.uint8
+            np.testing.assert_array_equal(circuit[key], values)
+    # the results of keys that have the same shape in every circuit share one batch array
+    assert decoded[0]['a'].base is not None and decoded[0]['a'].base is decoded[3]['a'].base
+
+
+def test_decode_measurements_with_varying_shapes():
+    measurements = [{'a': [[0, 1], [1, 1]]}, {'a': [[1, 1, 0]]}, {'a': []}]
+    decoded = _decode_measurements(measurements)
+    for circuit, circuit_measurements in zip(decoded, measurements):
+        assert circuit['a'].dtype == np.uint8
+        np.testing.assert_array_equal(circuit['a'], np.array(circuit_measurements['a']))
+
+
+def test_decode_measurements_packed(bits):
+    decoded = _decode_measurements([{'m': bits.tolist()}, {'m': bits[::-1].tolist()}], pack=True)
+    packed = decoded[1]['m']
+    assert isinstance(packed, PackedBits)
+    assert packed.num_bits == 11
+    assert packed.data.shape == (100,)
+    assert packed.data.dtype == np.uint16
+    assert len(packed) == 100
+    np.testing.assert_array_equal(packed.unpack(), bits[::-1])
+
+
+def test_packed_result_is_unpacked_on_demand(bits, result_metadata):
+    params = cirq.ParamResolver({'t': 0.5})
+    dense = IQMResult(measurements={'m': bits, 'n': bits[:, :1]}, params=params, metadata=result_metadata)
+    packed = IQMResult(
+        measurements={'m': PackedBits.pack(bits), 'n': bits[:, :1]}, params=params, metadata=result_metadata
+    )
+    assert packed.repetitions == 100
+    assert packed._measurements is None
+
+    assert packed.histogram(key='m') == dense.histogram(key='m')
+    assert packed.measurements.keys() == dense.measurements.keys()
+    np.testing.assert_array_equal(packed.measurements['m'], bits)
+    assert packed.repetitions == 100
+    assert packed == dense
+    assert packed.data.equals(dense.data)
+    assert str(packed) == str(dense)
+    assert packed.metadata is result_metadata
+
+
+def test_packed_result_records(bits, result_metadata):
+    packed = IQMResult(measurements={'m': PackedBits.pack(bits)}, metadata=result_metadata)
+    assert packed.records['m'].shape == (100, 1, 11)
+    np.testing.assert_array_equal(packed.records['m'][:, 0, :], bits)
+
+
+@pytest.mark.parametrize('num_bits', [0, 1, 8, 9, 17, 33, 64, 65, 130])
+def test_packed_bits(num_bits):
+    bits = np.random.default_rng(num_bits).integers(0, 2, (50, num_bits), dtype=np.uint8)
+    bits[::2] = bits[0]
+    packed = PackedBits.pack(bits)
+    assert packed.data.ndim == (1 if num_bits <= 64 else 2)
+    np.testing.assert_array_equal(packed.unpack(), bits)
+    assert packed.histogram() == cirq.ResultDict(measurements={'m': bits}).histogram(key='m')
+
+    values, inverse, counts = packed.unique()
+    assert sorted(values) == values
+    assert counts.sum() == 50
+    assert values[inverse[0]] == values[inverse[2]] == cirq.big_endian_bits_to_int(bits[0])
+
+
+@pytest.mark.parametrize('num_bits', [5, 40, 63, 64, 100])
+def test_packed_result_histograms_are_computed_without_unpacking(num_bits, result_metadata):
+    rng = np.random.default_rng(num_bits)
+    measurements = {'a': rng.integers(0, 2, (200, num_bits), dtype=np.uint8), 'b': rng.integers(0, 2, (200, 2))}
+    measurements['a'][::3] = measurements['a'][0]
+    dense = cirq.ResultDict(measurements=measurements)
+    packed = IQMResult(
+        measurements={key: PackedBits.pack(bits) for key, bits in measurements.items()}, metadata=result_metadata
+    )
+
+    assert packed.histogram(key='a') == dense.histogram(key='a')
+    assert packed.multi_measurement_histogram(keys=['a', 'b']) == dense.multi_measurement_histogram(keys=['a', 'b'])
+    assert packed.multi_measurement_histogram(keys=[]) == dense.multi_measurement_histogram(keys=[])
+    if num_bits <= 63:
+        assert packed.data.equals(dense.data)
+    assert packed._measurements is None
+
+    # a custom fold function needs the unpacked measurements
+    assert packed.histogram(key='b', fold_func=tuple) == dense.histogram(key='b', fold_func=tuple)
+    assert packed._measurements is not None
+
+
+def test_packed_result_qubit_keys(result_metadata):
+    qubits = cirq.LineQubit.range(2)
+    bits = np.array([[0, 1], [1, 1], [0, 1]], dtype=np.uint8)
+    packed = IQMResult(measurements={'q(0),q(1)': PackedBits.pack(bits)}, metadata=result_metadata)
+    assert packed.histogram(key=qubits) == {1: 2, 3: 1}
+    assert packed.multi_measurement_histogram(keys=[qubits]) == {(1,): 2, (3,): 1}
+
+
+@pytest.mark.usefixtures('fast_polling')
+@pytest.mark.parametrize('pack_results', [False, True])
+def test_sampler_decodes_results(fake_server, circuit_physical, pack_results):
+    sampler = IQMSampler(fake_server.url, pack_results=pack_results)
+    result = sampler.run(circuit_physical, repetitions=10)
+    assert (result._measurements is None) == pack_results
+    assert result.histogram(key='result') == {0: 10}
+    assert result.measurements['result'].dtype == np.uint8
+
+
+def test_counts_from_server(result_metadata):
+    counts = IQMCounts.from_counts(
+        Counts(measurement_keys=['a', 'b'], counts={'011': 3, '100': 1}), {'a': 2, 'b': 1}, result_metadata
+    )
+    assert counts.counts == {(1, 1): 3, (2, 0): 1}
+    assert counts.repetitions == 4
+    assert counts.histogram(key='a') == {1: 3, 2: 1}
+    assert counts.histogram(key='b') == {1: 3, 0: 1}
+    assert counts.multi_measurement_histogram(keys=['b', 'a']) == {(1, 1): 3, (0, 2): 1}
+    assert counts.multi_measurement_histogram(keys=[]) == {(): 4}
+    with pytest.raises(KeyError):
+        counts.histogram(key='c')
+
+
+def test_counts_from_packed_bits(bits, result_metadata):
+    measurements = {'a': bits, 'b': bits[:, :2]}
+    dense = cirq.ResultDict(measurements=measurements)
+    counts = IQMCounts.from_packed_bits(
+        {key: PackedBits.pack(key_bits) for key, key_bits in measurements.items()}, result_metadata
+    )
+    assert counts.measurement_keys == ('a', 'b')
+    assert counts.repetitions == 100
+    assert counts.counts == dense.multi_measurement_histogram(keys=['a', 'b'])
+    assert counts.histogram(key='b') == dense.histogram(key='b')
+    assert counts.params == cirq.ParamResolver()
+
+
+@pytest.mark.usefixtures('fast_polling')
+@pytest.mark.parametrize('serve_counts', [True, False])
+def test_sampler_run_counts(fake_server, circuit_physical, serve_counts):
+    fake_server.serve_counts = serve_counts
+    sampler = IQMSampler(fake_server.url)
+    counts = sampler.run_counts([circuit_physical, circuit_physical], repetitions=10)
+    assert len(counts) == 2
+    for circuit_counts in counts:
+        assert circuit_counts.measurement_keys == ('result',)
+        assert circuit_counts.counts == {(0,): 10}
+        assert circuit_counts.metadata.calibration_set_id == fake_server.architecture.calibration_set_id
+
+
+@pytest.mark.usefixtures('fast_polling')
+@pytest.mark.parametrize('serve_counts', [True, False])
+def test_sampler_run_counts_of_several_keys(fake_server, adonis_architecture, serve_counts):
+    fake_server.serve_counts = serve_counts
+    fake_server.varied_results = True
+    qubits = cirq.NamedQubit.range(1, 4, prefix='QB')
+    circuit = cirq.Circuit(cirq.measure(qubits[0], key='a'), cirq.measure(qubits[1], qubits[2], key='b'))
+    circuit.iqm_calibration_set_id = adonis_architecture.calibration_set_id
+    (counts,) = IQMSampler(fake_server.url).run_counts([circuit], repetitions=10)
+
+    # shot s is s % 2 for 'a' and (s >> 1) % 4 for 'b'
+    assert counts.measurement_keys == ('a', 'b')
+    assert counts.repetitions == 10
+    assert counts.counts == {(0, 0): 2, (1, 0): 2, (0, 1): 1, (1, 1): 1, (0, 2): 1, (1, 2): 1, (0, 3): 1, (1, 3): 1}
+    assert counts.histogram(key='a') == {0: 5, 1: 5}
+    assert counts.histogram(key='b') == {0: 4, 1: 2, 2: 2, 3: 2}
+    assert counts.multi_measurement_histogram(keys=['b', 'a'])[(3, 1)] == 1
+
+
+def test_pack_measurements_without_shots(result_metadata):
+    packed = _pack_measurements({'a': [], 'b': []}, {'a': 1, 'b': 2})
+    assert [(len(bits), bits.num_bits) for bits in packed.values()] == [(0, 1), (0, 2)]
+    counts = IQMCounts.from_packed_bits(packed, result_metadata)
+    assert counts.repetitions == 0
+    assert not counts.counts
+    assert not counts.histogram(key='b')
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_sampler_run_counts_of_sweep(fake_server, circuit_physical):
+    sweep = cirq.Points('t', [0.1, 0.2, 0.3])
+    counts = IQMSampler(fake_server.url).run_counts(circuit_physical, params=sweep, repetitions=5)
+    assert [c.params for c in counts] == list(cirq.to_resolvers(sweep))
+    assert all(c.histogram(key='result') == {0: 5} for c in counts)
+
+
+@pytest.mark.usefixtures('fast_polling')
+@pytest.mark.parametrize('serve_counts', [True, False])
+def test_sampler_run_counts_job_fails(fake_server, circuit_physical, serve_counts):
+    fake_server.serve_counts = serve_counts
+    fake_server.fail_message = 'execution failed'
+    with pytest.raises(CircuitExecutionError, match='execution failed'):
+        IQMSampler(fake_server.url).run_counts(circuit_physical, repetitions=10)
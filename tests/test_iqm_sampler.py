@@ -28,33 +28,18 @@ import iqm.cirq_iqm as module_under_test
 from iqm.cirq_iqm.iqm_gates import IQMMoveGate
 from iqm.cirq_iqm.iqm_sampler import IQMResult, IQMSampler, ResultMetadata, serialize_circuit
 from iqm.iqm_client import (
-    Circuit,
     CircuitCompilationOptions,
     CircuitValidationError,
     DynamicQuantumArchitecture,
-    GateImplementationInfo,
-    GateInfo,
     HeraldingMode,
-    Instruction,
     IQMClient,
     JobAbortionError,
-    Metadata,
     RunRequest,
     RunResult,
     Status,
 )
 
 
-@pytest.fixture()
-def circuit_physical(adonis_architecture):
-    """Circuit with physical qubit names"""
-    qubit_1 = cirq.NamedQubit('QB1')
-    qubit_2 = cirq.NamedQubit('QB2')
-    circuit = cirq.Circuit(cirq.measure(qubit_1, qubit_2, key='result'))
-    circuit.iqm_calibration_set_id = adonis_architecture.calibration_set_id
-    return circuit
-
-
 @pytest.fixture()
 def circuit_non_physical():
     """Circuit with non-physical qubit names"""
@@ -63,83 +48,12 @@ def circuit_non_physical():
     return cirq.Circuit(cirq.measure(qubit_1, qubit_2, key='result'))
 
 
-@pytest.fixture()
-def iqm_metadata():
-    return Metadata(
-        request=RunRequest(
-            shots=4,
-            circuits=[
-                Circuit(
-                    name='circuit_1',
-                    instructions=(
-                        Instruction(name='measure', implementation=None, qubits=('QB1',), args={'key': 'm1'}),
-                    ),
-                )
-            ],
-        )
-    )
-
-
-@pytest.fixture()
-def adonis_sampler(base_url, adonis_architecture):
-    when(IQMClient).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
-    return IQMSampler(base_url, device=Adonis())
-
-
-@pytest.fixture()
-def adonis_architecture():
-    return DynamicQuantumArchitecture(
-        calibration_set_id=uuid.UUID('26c5e70f-bea0-43af-bd37-6212ec7d04cb'),
-        qubits=['QB1', 'QB2', 'QB3', 'QB4', 'QB5'],
-        computational_resonators=[],
-        gates={
-            'prx': GateInfo(
-                implementations={
-                    'drag_gaussian': GateImplementationInfo(loci=(('QB1',), ('QB2',), ('QB3',), ('QB4',), ('QB5',))),
-                },
-                default_implementation='drag_gaussian',
-                override_default_implementation={},
-            ),
-            'cz': GateInfo(
-                implementations={
-                    'tgss': GateImplementationInfo(
-                        loci=(('QB1', 'QB3'), ('QB2', 'QB3'), ('QB4', 'QB3'), ('QB5', 'QB3'))
-                    ),
-                },
-                default_implementation='tgss',
-                override_default_implementation={},
-            ),
-            'measure': GateInfo(
-                implementations={
-                    'constant': GateImplementationInfo(loci=(('QB1',), ('QB2',), ('QB3',), ('QB4',), ('QB5',))),
-                },
-                default_implementation='constant',
-                override_default_implementation={},
-            ),
-        },
-    )
-
-
 @pytest.fixture()
 def adonis_sampler_from_architecture(base_url, adonis_architecture):
     when(IQMClient).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     return IQMSampler(base_url, device=IQMDevice(IQMDeviceMetadata.from_architecture(adonis_architecture)))
 
 
-@pytest.fixture
-def create_run_request_default_kwargs(adonis_architecture) -> dict:
-    return {
-        'calibration_set_id': adonis_architecture.calibration_set_id,
-        'shots': 1,
-        'options': CircuitCompilationOptions(),
-    }
-
-
-@pytest.fixture
-def job_id():
-    return uuid.uuid4()
-
-
 @pytest.fixture
 def run_request():
     run_request = mock(RunRequest)
@@ -203,7 +117,6 @@ def test_run_sweep_raises_with_non_physical_names(adonis_sampler_from_architectu
 @pytest.mark.usefixtures('unstub')
 def test_run_sweep_executes_circuit_with_physical_names(
     adonis_sampler,
-    adonis_architecture,
     circuit_physical,
     iqm_metadata,
     create_run_request_default_kwargs,
@@ -212,7 +125,6 @@ def test_run_sweep_executes_circuit_with_physical_names(
 ):
     # pylint: disable=too-many-arguments,too-many-positional-arguments
     client = mock(IQMClient)
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     run_result = RunResult(status=Status.READY, measurements=[{'some stuff': [[0], [1]]}], metadata=iqm_metadata)
     when(client).create_run_request(ANY, **create_run_request_default_kwargs).thenReturn(run_request)
     when(client).submit_run_request(run_request).thenReturn(job_id)
@@ -272,7 +184,6 @@ def test_run_sweep_has_duration_check_enabled_by_default(
     kwargs = create_run_request_default_kwargs | {
         'options': CircuitCompilationOptions(max_circuit_duration_over_t2=None)
     }
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(client).create_run_request(ANY, **kwargs).thenReturn(run_request)
     when(client).submit_run_request(run_request).thenReturn(job_id)
     when(client).wait_for_results(job_id).thenReturn(run_result)
@@ -305,7 +216,6 @@ def test_run_sweep_executes_circuit_with_duration_check_disabled(
     kwargs = create_run_request_default_kwargs | {
         'options': CircuitCompilationOptions(max_circuit_duration_over_t2=0.0)
     }
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(client).create_run_request(ANY, **kwargs).thenReturn(run_request)
     when(client).submit_run_request(run_request).thenReturn(job_id)
     when(client).wait_for_results(job_id).thenReturn(run_result)
@@ -333,7 +243,6 @@ def test_run_sweep_allows_to_override_polling_timeout(
     when(IQMClient).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     sampler = IQMSampler(base_url, device=Adonis(), run_sweep_timeout=timeout)
     run_result = RunResult(status=Status.READY, measurements=[{'some stuff': [[0], [1]]}], metadata=iqm_metadata)
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(client).create_run_request(ANY, **create_run_request_default_kwargs).thenReturn(run_request)
     when(client).submit_run_request(run_request).thenReturn(job_id)
     when(client).wait_for_results(job_id, timeout).thenReturn(run_result)
@@ -362,7 +271,6 @@ def test_run_sweep_has_heralding_mode_none_by_default(
     run_result = RunResult(status=Status.READY, measurements=[{'some stuff': [[0], [1]]}], metadata=iqm_metadata)
     kwargs = create_run_request_default_kwargs
     assert sampler._compiler_options.heralding_mode == HeraldingMode.NONE
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(client).create_run_request(ANY, **kwargs).thenReturn(run_request)
     when(client).submit_run_request(run_request).thenReturn(job_id)
     when(client).wait_for_results(job_id).thenReturn(run_result)
@@ -395,7 +303,6 @@ def test_run_sweep_executes_circuit_with_heralding_mode_zeros(
         'options': CircuitCompilationOptions(heralding_mode=HeraldingMode.ZEROS)
     }
     assert sampler._compiler_options.heralding_mode == HeraldingMode.ZEROS
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(client).create_run_request(ANY, **kwargs).thenReturn(run_request)
     when(client).submit_run_request(run_request).thenReturn(job_id)
     when(client).wait_for_results(job_id).thenReturn(run_result)
@@ -409,14 +316,13 @@ def test_run_sweep_executes_circuit_with_heralding_mode_zeros(
 
 @pytest.mark.usefixtures('unstub')
 def test_run_sweep_with_parameter_sweep(
-    adonis_sampler, adonis_architecture, iqm_metadata, create_run_request_default_kwargs, job_id, run_request
+    adonis_sampler, iqm_metadata, create_run_request_default_kwargs, job_id, run_request
 ):
     # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
     client = mock(IQMClient)
     run_result = RunResult(
         status=Status.READY, measurements=[{'some stuff': [[0]]}, {'some stuff': [[1]]}], metadata=iqm_metadata
     )
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(client).create_run_request(ANY, **create_run_request_default_kwargs).thenReturn(run_request)
     when(client).submit_run_request(run_request).thenReturn(job_id)
     when(client).wait_for_results(job_id).thenReturn(run_result)
@@ -442,7 +348,6 @@ def test_run_sweep_with_parameter_sweep(
 @pytest.mark.usefixtures('unstub')
 def test_run_sweep_abort_job_successful(
     adonis_sampler,
-    adonis_architecture,
     circuit_physical,
     create_run_request_default_kwargs,
     job_id,
@@ -451,7 +356,6 @@ def test_run_sweep_abort_job_successful(
 ):
     # pylint: disable=too-many-arguments,too-many-positional-arguments
     client = mock(IQMClient)
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(client).create_run_request(ANY, **create_run_request_default_kwargs).thenReturn(run_request)
     when(client).submit_run_request(run_request).thenReturn(job_id)
     when(client).wait_for_results(job_id).thenRaise(KeyboardInterrupt)
@@ -469,11 +373,10 @@ def test_run_sweep_abort_job_successful(
 
 @pytest.mark.usefixtures('unstub')
 def test_run_sweep_abort_job_failed(
-    adonis_sampler, adonis_architecture, circuit_physical, create_run_request_default_kwargs, job_id, run_request
+    adonis_sampler, circuit_physical, create_run_request_default_kwargs, job_id, run_request
 ):
     # pylint: disable=too-many-arguments,too-many-positional-arguments
     client = mock(IQMClient)
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(client).create_run_request(ANY, **create_run_request_default_kwargs).thenReturn(run_request)
     when(client).submit_run_request(run_request).thenReturn(job_id)
     when(client).wait_for_results(job_id).thenRaise(KeyboardInterrupt)
@@ -501,14 +404,13 @@ def test_run_iqm_batch_raises_with_non_physical_names(adonis_sampler_from_archit
 
 
 @pytest.mark.usefixtures('unstub')
-def test_run(adonis_sampler, adonis_architecture, iqm_metadata, create_run_request_default_kwargs, job_id):
+def test_run(adonis_sampler, iqm_metadata, create_run_request_default_kwargs, job_id):
     client = mock(IQMClient)
     repetitions = 123
     run_result = RunResult(
         status=Status.READY, measurements=[{'some stuff': [[0]]}, {'some stuff': [[1]]}], metadata=iqm_metadata
     )
     kwargs = create_run_request_default_kwargs | {'shots': repetitions}
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(client).create_run_request(ANY, **kwargs).thenReturn(run_request)
     when(client).submit_run_request(run_request).thenReturn(job_id)
     when(client).wait_for_results(job_id).thenReturn(run_result)
@@ -533,7 +435,6 @@ def test_run_ndonis(
     when(IQMClient).get_dynamic_quantum_architecture(None).thenReturn(fake_arch_with_resonator)
     sampler = IQMSampler(base_url, device=device_with_resonator)
     client = mock(IQMClient)
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(fake_arch_with_resonator)
     repetitions = 123
     run_result = RunResult(
         status=Status.READY, measurements=[{'some stuff': [[0]]}, {'some stuff': [[1]]}], metadata=iqm_metadata
@@ -617,7 +518,7 @@ def test_run_warns_if_default_calset_changed(
         RunResult(status=Status.READY, measurements=[{'some stuff': [[0], [1]]}], metadata=iqm_metadata)
     )
 
-    sampler = IQMSampler(base_url)
+    sampler = IQMSampler(base_url, architecture_ttl=0)
     routed_circuit, _, _ = sampler.device.route_circuit(circuit_physical)
 
     with pytest.warns(
@@ -669,9 +570,7 @@ def test_run_warns_if_circuits_routed_with_different_calset_id(
 
 
 @pytest.mark.usefixtures('unstub')
-def test_run_iqm_batch(
-    adonis_sampler, adonis_architecture, iqm_metadata, create_run_request_default_kwargs, job_id, run_request
-):
+def test_run_iqm_batch(adonis_sampler, iqm_metadata, create_run_request_default_kwargs, job_id, run_request):
     # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
     client = mock(IQMClient)
     repetitions = 123
@@ -679,7 +578,6 @@ def test_run_iqm_batch(
         status=Status.READY, measurements=[{'some stuff': [[0]]}, {'some stuff': [[1]]}], metadata=iqm_metadata
     )
     kwargs = create_run_request_default_kwargs | {'shots': repetitions}
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(client).create_run_request(ANY, **kwargs).thenReturn(run_request)
     when(client).submit_run_request(run_request).thenReturn(job_id)
     when(client).wait_for_results(job_id).thenReturn(run_result)
@@ -712,7 +610,6 @@ def test_run_iqm_batch_allows_to_override_polling_timeout(
     )
     timeout = 123
     sampler = IQMSampler(base_url, device=Adonis(), run_sweep_timeout=timeout)
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(client).create_run_request(ANY, **create_run_request_default_kwargs).thenReturn(run_request)
     when(client).submit_run_request(run_request).thenReturn(job_id)
     when(client).wait_for_results(job_id, timeout).thenReturn(run_result)
@@ -740,10 +637,10 @@ def test_credentials_are_passed_to_client(adonis_architecture):
         'password': 'fake-password',
     }
     mock_client = mock(IQMClient)
+    when(mock_client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(module_under_test.iqm_sampler).IQMClient('http://url', client_signature=ANY, **user_auth_args).thenReturn(
         mock_client
     )
-    when(mock_client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     IQMSampler('http://url', device=Adonis(), **user_auth_args)
     verify(module_under_test.iqm_sampler, times=1).IQMClient('http://url', client_signature=ANY, **user_auth_args)
 
@@ -775,7 +672,7 @@ def test_close_client(adonis_architecture):
 
 @pytest.mark.usefixtures('unstub')
 def test_create_run_request_for_run(
-    adonis_sampler, adonis_architecture, iqm_metadata, job_id, create_run_request_default_kwargs, run_request
+    adonis_sampler, iqm_metadata, job_id, create_run_request_default_kwargs, run_request
 ):
     # pylint: disable=too-many-arguments,too-many-positional-arguments
     client = mock(IQMClient)
@@ -793,7 +690,6 @@ def test_create_run_request_for_run(
         [serialize_circuit(circuit)],
         **kwargs,
     ).thenReturn(run_request)
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(client).submit_run_request(run_request).thenReturn(job_id)
     when(client).wait_for_results(job_id).thenReturn(run_result)
 
@@ -805,7 +701,7 @@ def test_create_run_request_for_run(
 
 @pytest.mark.usefixtures('unstub')
 def test_create_run_request_for_run_iqm_batch(
-    adonis_sampler, adonis_architecture, iqm_metadata, job_id, create_run_request_default_kwargs, run_request
+    adonis_sampler, iqm_metadata, job_id, create_run_request_default_kwargs, run_request
 ):
     # pylint: disable=too-many-locals,too-many-arguments,too-many-positional-arguments
     client = mock(IQMClient)
@@ -828,7 +724,6 @@ def test_create_run_request_for_run_iqm_batch(
         [serialize_circuit(c) for c in circuits],
         **kwargs,
     ).thenReturn(run_request)
-    when(client).get_dynamic_quantum_architecture(None).thenReturn(adonis_architecture)
     when(client).submit_run_request(run_request).thenReturn(job_id)
     when(client).wait_for_results(job_id).thenReturn(run_result)
 
@@ -836,3 +731,29 @@ def test_create_run_request_for_run_iqm_batch(
     adonis_sampler.run_iqm_batch(circuits, repetitions=repetitions)
 
     verifyNoUnwantedInteractions()
+
+
+@pytest.mark.usefixtures('unstub')
+def test_create_run_request_for_run_sweep_binds_template(
+    adonis_sampler, adonis_architecture, create_run_request_default_kwargs, run_request
+):
+    client = mock(IQMClient)
+    adonis_sampler._client = client
+    qubit_1 = cirq.NamedQubit('QB1')
+    qubit_2 = cirq.NamedQubit('QB2')
+    circuit = cirq.Circuit(
+        cirq.X(qubit_1) ** sympy.Symbol('t'), cirq.CZ(qubit_1, qubit_2), cirq.measure(qubit_1, qubit_2, key='result')
+    )
+    circuit.iqm_calibration_set_id = adonis_architecture.calibration_set_id
+    param_sweep = cirq.Linspace('t', start=0, stop=1, length=3)
+    expected_circuits = [serialize_circuit(cirq.resolve_parameters(circuit, p)) for p in param_sweep]
+
+    expect(client, times=1).create_run_request(expected_circuits, **create_run_request_default_kwargs).thenReturn(
+        run_request
+    )
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert adonis_sampler.create_run_request(circuit, params=param_sweep) == run_request
+
+    verifyNoUnwantedInteractions()
@@ -0,0 +1,174 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the asyncio interface of IQMSampler, using a local fake IQM server."""
+import asyncio
+
+import cirq
+import numpy as np
+import pytest
+import sympy  # type: ignore
+
+from iqm.cirq_iqm.iqm_sampler import IQMSampler
+from iqm.iqm_client import APITimeoutError, CircuitExecutionError, Status
+
+from .fake_iqm_server import FakeIQMServer
+
+
+async def _wait_for_first_poll(server: FakeIQMServer):
+    while not any(job.status_queries for job in server.jobs.values()):
+        await asyncio.sleep(0.001)
+    return next(iter(server.jobs.values()))
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_run_async(fake_server, circuit_physical, adonis_architecture):
+    fake_server.pending_polls = 2
+    sampler = IQMSampler(fake_server.url)
+    result = asyncio.run(sampler.run_async(circuit_physical, repetitions=3))
+
+    job = fake_server.jobs[result.metadata.job_id]
+    assert job.status == Status.READY.value
+    assert job.status_queries == 3
+    assert result.metadata.calibration_set_id == adonis_architecture.calibration_set_id
+    assert result.metadata.request.shots == 3
+    np.testing.assert_array_equal(result.measurements['result'], np.zeros((3, 2)))
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_run_sweep_async(fake_server, adonis_architecture):
+    qubit = cirq.NamedQubit('QB1')
+    circuit = cirq.Circuit(cirq.rx(sympy.Symbol('t')).on(qubit), cirq.measure(qubit, key='m'))
+    circuit.iqm_calibration_set_id = adonis_architecture.calibration_set_id
+    sweep = cirq.Linspace('t', 0, 1, 3)
+    sampler = IQMSampler(fake_server.url)
+    results = asyncio.run(sampler.run_sweep_async(circuit, sweep))
+
+    assert [result.params for result in results] == list(cirq.to_resolvers(sweep))
+    assert len(fake_server.jobs) == 1
+    assert len(results[0].metadata.request.circuits) == 3
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_run_sweep_async_with_empty_sweep(fake_server, circuit_physical):
+    sampler = IQMSampler(fake_server.url)
+    assert asyncio.run(sampler.run_sweep_async(circuit_physical, [])) == sampler.run_sweep(circuit_physical, []) == []
+    assert len(fake_server.jobs) == 2
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_run_batch_async_polls_jobs_concurrently(fake_server, circuit_physical):
+    fake_server.pending_polls = 20
+    sampler = IQMSampler(fake_server.url)
+    results = asyncio.run(sampler.run_batch_async([circuit_physical] * 5, repetitions=[1, 2, 3, 4, 5]))
+
+    assert fake_server.max_pending_jobs == 5
+    assert [len(sweep_results) for sweep_results in results] == [1] * 5
+    assert [sweep_results[0].repetitions for sweep_results in results] == [1, 2, 3, 4, 5]
+    assert len({sweep_results[0].metadata.job_id for sweep_results in results}) == 5
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_cancel_run_async_aborts_job(fake_server, circuit_physical):
+    fake_server.pending_polls = 10**6
+    sampler = IQMSampler(fake_server.url)
+
+    async def cancel():
+        task = asyncio.create_task(sampler.run_async(circuit_physical))
+        job = await _wait_for_first_poll(fake_server)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return job
+
+    job = asyncio.run(cancel())
+    assert job.status == Status.ABORTED.value
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_cancel_run_async_during_submission_aborts_job(fake_server, circuit_physical):
+    fake_server.pending_polls = 10**6
+    fake_server.submissions_released.clear()
+    sampler = IQMSampler(fake_server.url)
+
+    async def cancel():
+        task = asyncio.create_task(sampler.run_async(circuit_physical))
+        while not fake_server.jobs:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        await asyncio.sleep(0.01)
+        fake_server.submissions_released.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    (job,) = fake_server.jobs.values()
+    assert job.status == Status.ABORTED.value
+    assert job.status_queries == 0
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_cancel_run_batch_async_aborts_all_jobs(fake_server, circuit_physical):
+    fake_server.pending_polls = 10**6
+    sampler = IQMSampler(fake_server.url)
+
+    async def cancel():
+        task = asyncio.create_task(sampler.run_batch_async([circuit_physical] * 3))
+        while sum(1 for job in fake_server.jobs.values() if job.status_queries) < 3:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    assert [job.status for job in fake_server.jobs.values()] == [Status.ABORTED.value] * 3
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_cancel_run_async_abort_fails(fake_server, circuit_physical):
+    fake_server.pending_polls = 10**6
+    sampler = IQMSampler(fake_server.url)
+
+    async def cancel():
+        task = asyncio.create_task(sampler.run_async(circuit_physical))
+        job = await _wait_for_first_poll(fake_server)
+        job.status = Status.READY.value  # the job finishes before it can be aborted
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    with pytest.warns(UserWarning, match='Failed to abort job'):
+        asyncio.run(cancel())
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_run_async_job_fails(fake_server, circuit_physical):
+    fake_server.fail_message = 'Circuit too long'
+    sampler = IQMSampler(fake_server.url)
+    with pytest.raises(CircuitExecutionError, match='Circuit too long'):
+        asyncio.run(sampler.run_async(circuit_physical))
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_run_async_times_out(fake_server, circuit_physical):
+    fake_server.pending_polls = 10**6
+    sampler = IQMSampler(fake_server.url, run_sweep_timeout=0)
+    with pytest.raises(APITimeoutError, match="The job didn't finish in 0 seconds."):
+        asyncio.run(sampler.run_async(circuit_physical))
+
+
+def test_run_with_fake_server(fake_server, circuit_physical):
+    fake_server.pending_polls = 0
+    sampler = IQMSampler(fake_server.url)
+    result = sampler.run(circuit_physical, repetitions=2)
+    np.testing.assert_array_equal(result.measurements['result'], np.zeros((2, 2)))
@@ -0,0 +1,121 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for splitting long parameter sweeps into batches in IQMSampler."""
+import asyncio
+
+import cirq
+from mockito import spy2, verify
+import pytest
+import sympy  # type: ignore
+
+from iqm.cirq_iqm import iqm_sampler
+from iqm.cirq_iqm.iqm_sampler import IQMSampler
+from iqm.iqm_client import CircuitExecutionError, Status
+
+
+@pytest.fixture
+def circuit(adonis_architecture):
+    qubit = cirq.NamedQubit('QB1')
+    circuit = cirq.Circuit(cirq.rx(sympy.Symbol('t')).on(qubit), cirq.measure(qubit, key='m'))
+    circuit.iqm_calibration_set_id = adonis_architecture.calibration_set_id
+    return circuit
+
+
+def _batch_sizes(server):
+    return [len(job.request['circuits']) for job in server.jobs.values()]
+
+
+@pytest.mark.parametrize('max_batch_size, max_batches_in_flight', [(0, 1), (1, 0)])
+def test_invalid_batching_options(max_batch_size, max_batches_in_flight):
+    with pytest.raises(ValueError, match='must be positive'):
+        IQMSampler('https://example.com', max_batch_size=max_batch_size, max_batches_in_flight=max_batches_in_flight)
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_run_sweep_in_batches(fake_server, circuit):
+    fake_server.pending_polls = 20
+    sweep = cirq.Linspace('t', 0, 1, 5)
+    sampler = IQMSampler(fake_server.url, max_batch_size=2)
+    results = sampler.run_sweep(circuit, sweep, repetitions=3)
+
+    assert [result.params for result in results] == list(sweep)
+    assert all(result.repetitions == 3 for result in results)
+    assert _batch_sizes(fake_server) == [2, 2, 1]
+    assert fake_server.max_pending_jobs == 2
+    job_ids = list(fake_server.jobs)
+    assert [result.metadata.job_id for result in results] == [job_ids[0]] * 2 + [job_ids[1]] * 2 + [job_ids[2]]
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_run_sweep_shorter_than_batch_size(fake_server, circuit):
+    sampler = IQMSampler(fake_server.url, max_batch_size=10)
+    results = sampler.run_sweep(circuit, cirq.Linspace('t', 0, 1, 5))
+    assert len(results) == 5
+    assert _batch_sizes(fake_server) == [5]
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_iter_sweep_consumes_sweep_lazily(fake_server, circuit):
+    consumed = []
+
+    def sweep():
+        for i in range(100):
+            consumed.append(i)
+            if i == 2:
+                fake_server.pending_polls = 10**6  # the second batch never finishes
+            yield {'t': i / 100}
+
+    sampler = IQMSampler(fake_server.url, max_batch_size=2)
+    results = sampler.iter_sweep(circuit, sweep())
+    first = next(results)
+    assert first.params == cirq.ParamResolver({'t': 0})
+    assert len(consumed) == 4
+    assert next(results).params == cirq.ParamResolver({'t': 0.01})
+
+    # stopping the iteration aborts the batch still executing
+    results.close()
+    assert [job.status for job in fake_server.jobs.values()] == [Status.READY.value, Status.ABORTED.value]
+    assert len(consumed) == 4
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_iter_sweep_batch_fails(fake_server, circuit):
+    fake_server.fail_message = 'Circuit too long'
+    sampler = IQMSampler(fake_server.url, max_batch_size=2)
+    with pytest.raises(CircuitExecutionError, match='Circuit too long'):
+        list(sampler.iter_sweep(circuit, cirq.Linspace('t', 0, 1, 5)))
+
+
+@pytest.mark.usefixtures('fast_polling')
+def test_run_sweep_async_in_batches(fake_server, circuit):
+    fake_server.pending_polls = 20
+    sweep = cirq.Linspace('t', 0, 1, 7)
+    sampler = IQMSampler(fake_server.url, max_batch_size=2, max_batches_in_flight=3)
+    results = asyncio.run(sampler.run_sweep_async(circuit, sweep))
+
+    assert [result.params for result in results] == list(sweep)
+    assert sorted(_batch_sizes(fake_server)) == [1, 2, 2, 2]
+    assert fake_server.max_pending_jobs == 3
+
+
+@pytest.mark.usefixtures('fast_polling', 'unstub')
+def test_run_sweep_async_prepares_circuit_once(fake_server, circuit):
+    sampler = IQMSampler(fake_server.url, max_batch_size=2)
+    spy2(sampler._check_submission)
+    spy2(iqm_sampler.CircuitTemplate)
+    asyncio.run(sampler.run_sweep_async(circuit, cirq.Linspace('t', 0, 1, 7)))
+
+    assert len(fake_server.jobs) == 4
+    verify(sampler, times=1)._check_submission(...)
+    verify(iqm_sampler, times=1).CircuitTemplate(...)
@@ -14,12 +14,25 @@
 
 """Tests for the circuit optimization passes."""
 # pylint: disable=no-self-use
+import random
 
 import cirq
 from cirq import ops
+from mockito import spy2, verify
+import numpy as np
 import pytest
-
-from iqm.cirq_iqm.optimizers import DropRZBeforeMeasurement, MergeOneParameterGroupGates, simplify_circuit
+import sympy  # type: ignore
+
+from iqm.cirq_iqm.optimizers import (
+    _SETTLED,
+    DropRZBeforeMeasurement,
+    MergeOneParameterGroupGates,
+    SimplifyStats,
+    _settle,
+    drop_rz_before_measurement,
+    merge_one_parameter_group_gates,
+    simplify_circuit,
+)
 
 TOLERANCE = 1e-10  # numerical tolerance
 
@@ -39,7 +52,7 @@ class TestGateOptimization:
             ops.ISwapPowGate,
         ],
     )
-    @pytest.mark.parametrize('a, b', [(0, 0.3), (-0.5, 0.5), (1.0, 2.0), (0.1, -4.1)])
+    @pytest.mark.parametrize('a, b', [(0, 0.3), (-0.5, 0.5), (1.0, 2.0), (0.1, -4.1), (0.5, 1.5), (-0.7, 2.7)])
     def test_gate_merging(self, family, a, b, qubits):
         """Merging one-parameter group gates."""
 
@@ -56,14 +69,62 @@ class TestGateOptimization:
         MergeOneParameterGroupGates().optimize_circuit(c)
         c = cirq.drop_empty_moments(c)
 
-        if abs((a + b) % MergeOneParameterGroupGates.PERIOD) < 1e-10:
+        period = MergeOneParameterGroupGates.PERIODS[family]
+        if abs((a + b) % period) < 1e-10:
             # the gates have canceled each other out
             assert len(c) == 0
         else:
             # the gates have been merged
             assert len(c) == 1
-            expected = MergeOneParameterGroupGates._normalize_par(a + b)
+            expected = MergeOneParameterGroupGates._normalize_par(a + b, period)
             assert c[0].operations[0].gate.exponent == pytest.approx(expected, abs=TOLERANCE)
+            assert -period / 2 < expected <= period / 2
+        # the merged gate is equivalent to the original ones up to a global phase
+        cirq.testing.assert_allclose_up_to_global_phase(
+            cirq.unitary(c) if len(c) else np.eye(4),
+            cirq.unitary(cirq.Circuit(family(exponent=a)(q0, q1), family(exponent=b)(q0, q1))),
+            atol=1e-8,
+        )
+
+    def test_gate_merging_matches_point_optimizer(self, qubits):
+        rng = random.Random(1234)
+        for _ in range(100):
+            c = cirq.Circuit()
+            for _ in range(rng.randint(1, 30)):
+                r = rng.random()
+                pair = rng.sample(qubits, 2)
+                if r < 0.35:
+                    c.append(ops.ZZPowGate(exponent=rng.choice([0.5, 1.0, 1.5, 0.3]))(*pair))
+                elif r < 0.7:
+                    c.append(ops.ISwapPowGate(exponent=rng.choice([0.5, 1.0, 1.5, 2.5]))(*pair))
+                elif r < 0.85:
+                    c.append(cirq.CZ(*pair))
+                else:
+                    c.append((cirq.X ** rng.random())(rng.choice(qubits)))
+            expected = c.copy()
+            # the original PointOptimizer implementation
+            cirq.PointOptimizer.optimize_circuit(MergeOneParameterGroupGates(), expected)
+            assert merge_one_parameter_group_gates(c) == expected
+            new = c.copy()
+            MergeOneParameterGroupGates().optimize_circuit(new)
+            assert new == expected
+
+    def test_gate_merging_parametrized(self, qubits):
+        q0, q1 = qubits[:2]
+        t = sympy.Symbol('t')
+        c = cirq.Circuit(ops.ZZPowGate(exponent=t)(q0, q1), ops.ZZPowGate(exponent=0.5)(q1, q0))
+        new = cirq.drop_empty_moments(merge_one_parameter_group_gates(c))
+        assert new == cirq.Circuit(ops.ZZPowGate(exponent=t + 0.5)(q0, q1))
+
+    def test_gate_merging_tags_to_ignore(self, qubits):
+        q0, q1 = qubits[:2]
+        c = cirq.Circuit(
+            ops.ISwapPowGate(exponent=0.5)(q0, q1),
+            ops.ISwapPowGate(exponent=0.5)(q0, q1).with_tags('keep'),
+            ops.ISwapPowGate(exponent=0.5)(q0, q1),
+        )
+        context = cirq.TransformerContext(tags_to_ignore=('keep',))
+        assert merge_one_parameter_group_gates(c, context=context) == c
 
     @pytest.mark.parametrize(
         'family, ex',
@@ -209,6 +270,43 @@ class TestSimplifyCircuit:
         assert isinstance(op.gate, cirq.XPowGate)
         assert op.qubits == (q0,)
 
+    @pytest.mark.parametrize('drop_final', [False, True])
+    def test_drop_rz_before_measurement_matches_point_optimizer(self, qubits, drop_final):
+        rng = random.Random(4321)
+        for _ in range(100):
+            c = cirq.Circuit()
+            for i in range(rng.randint(1, 30)):
+                r = rng.random()
+                if r < 0.4:
+                    c.append(cirq.ZPowGate(exponent=rng.random())(rng.choice(qubits)))
+                elif r < 0.6:
+                    c.append(cirq.CZ(*rng.sample(qubits, 2)))
+                elif r < 0.8:
+                    c.append(cirq.measure(*rng.sample(qubits, rng.randint(1, 2)), key=f'm{i}'))
+                else:
+                    c.append((cirq.X ** rng.random())(rng.choice(qubits)))
+            optimizer = DropRZBeforeMeasurement(drop_final=drop_final)
+            expected = c.copy()
+            # the original PointOptimizer implementation
+            cirq.PointOptimizer.optimize_circuit(optimizer, expected)
+            new = c.copy()
+            optimizer.optimize_circuit(new)
+            assert new == expected
+            assert drop_rz_before_measurement(c, drop_final=drop_final) == expected
+
+    def test_drop_rz_before_measurement_tags_to_ignore(self, qubits):
+        q0, q1 = qubits[:2]
+        c = cirq.Circuit(
+            (cirq.Z(q0) ** 0.5).with_tags('keep'),
+            cirq.Z(q1) ** 0.5,
+            (cirq.Z(q1) ** 0.5).with_tags('keep'),
+            cirq.measure(q0, q1, key='m'),
+        )
+        context = cirq.TransformerContext(tags_to_ignore=('keep',))
+        new = drop_rz_before_measurement(c, context=context)
+        # the tagged rotations are kept, and block the dropping of the rotations before them
+        assert new == c
+
     def test_simplify_circuit_merge_one_qubit_gates(self, qubits):
         q0 = qubits[0]
         c = cirq.Circuit()
@@ -225,3 +323,91 @@ class TestSimplifyCircuit:
         assert len(new) == 2
         assert isinstance(new[0].operations[0].gate, cirq.PhasedXPowGate)
         assert isinstance(new[1].operations[0].gate, cirq.ZPowGate)
+
+    @pytest.mark.usefixtures('unstub')
+    def test_simplify_circuit_revisits_only_changed_qubits(self, qubits):
+        q0, q1, q2 = qubits
+        layer = [(cirq.X**0.5)(q0), (cirq.Z**0.3)(q0), (cirq.Y**0.25)(q1), cirq.CZ(q0, q1)]
+        c = cirq.Circuit(layer * 20, (cirq.X**0.5)(q2), cirq.measure(q0, q1, q2, key='m'))
+        spy2(cirq.eject_z)
+        new = simplify_circuit(c)
+        # converges in a few rounds instead of running max_iterations times
+        verify(cirq, between=(2, 4)).eject_z(...)
+        cirq.testing.assert_circuits_with_terminal_measurements_are_equivalent(new, c, atol=1e-8)
+
+    def test_settle_reuses_moments(self, qubits):
+        q0, q1, q2 = qubits
+        c = cirq.Circuit(
+            (cirq.X**0.5)(q0), (cirq.Y**0.5)(q2), cirq.CZ(q0, q1), (cirq.X**0.5)(q2).with_tags('keep')
+        )
+        settled = _settle(c, {q0})
+        # only the operations that do not act on the dirty qubits are tagged
+        assert [_SETTLED in op.tags for op in settled.all_operations()] == [False, True, False, True]
+        assert _settle(settled, {q0}) == settled
+        assert all(new is old for new, old in zip(_settle(settled, {q0}), settled))
+        # untagging keeps the other tags
+        assert _settle(settled, {q0, q1, q2}) == c
+
+    def test_simplify_circuit_keeps_tags(self, qubits):
+        q0, q1 = qubits[:2]
+        c = cirq.Circuit(
+            (cirq.X**0.5)(q0).with_tags('keep'),
+            cirq.CZ(q0, q1).with_tags('keep'),
+            cirq.measure(q0, q1, key='m'),
+        )
+        new = simplify_circuit(c)
+        assert cirq.CZ(q0, q1).with_tags('keep') in new.all_operations()
+
+    def test_simplify_circuit_stats(self, qubits):
+        q0, q1 = qubits[:2]
+        layer = [(cirq.X**0.5)(q0), (cirq.Z**0.3)(q0), cirq.CZ(q0, q1)]
+        c = cirq.Circuit(layer * 5, cirq.measure(q0, q1, key='m'))
+        stats = SimplifyStats()
+        new = simplify_circuit(c, stats=stats)
+        assert new == simplify_circuit(c)
+
+        assert stats.converged
+        assert 1 <= stats.iterations < 20
+        round_passes = [
+            'merge_one_parameter_group_gates',
+            'merge_single_qubit_gates_to_phased_x_and_z',
+            'eject_z',
+            'drop_empty_moments',
+        ]
+        assert [p.name for p in stats.passes] == round_passes * stats.iterations + [
+            'drop_rz_before_measurement',
+            'drop_empty_moments',
+        ]
+        assert [p.iteration for p in stats.passes[:4]] == [0] * 4
+        assert stats.passes[-1].iteration is None
+        assert stats.passes[0].operations_before == len(list(c.all_operations()))
+        assert stats.passes[-1].operations_after == len(list(new.all_operations()))
+        assert all(p.wall_time >= 0 for p in stats.passes)
+        assert stats.wall_time == pytest.approx(sum(stats.wall_time_by_pass().values()))
+
+    def test_simplify_circuit_stats_not_converged(self, qubits):
+        q0, q1 = qubits[:2]
+        c = cirq.Circuit([(cirq.X**0.5)(q0), (cirq.Z**0.3)(q0), cirq.CZ(q0, q1)] * 5)
+        stats = SimplifyStats()
+        simplify_circuit(c, max_iterations=1, stats=stats)
+        assert not stats.converged
+        assert stats.iterations == 1
+
+    def test_simplify_circuit_transformer_logger(self, qubits):
+        class RecordingLogger(cirq.TransformerLogger):
+            """Records the names of the transformers run."""
+
+            def __init__(self):
+                super().__init__()
+                self.names = []
+
+            def register_initial(self, circuit, transformer_name):
+                self.names.append(transformer_name)
+                super().register_initial(circuit, transformer_name)
+
+        q0, q1 = qubits[:2]
+        c = cirq.Circuit((cirq.X**0.5)(q0), cirq.CZ(q0, q1), cirq.measure(q0, q1, key='m'))
+        logger = RecordingLogger()
+        simplify_circuit(c, context=cirq.TransformerContext(logger=logger))
+        assert logger.names[0] == 'simplify_circuit'
+        assert {'merge_one_parameter_group_gates', 'eject_z', 'drop_rz_before_measurement'} <= set(logger.names)
@@ -0,0 +1,175 @@
+# Copyright 2020–2024 Cirq on IQM developers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the native MOVE insertion."""
+import random
+from uuid import UUID
+
+import cirq
+import pytest
+
+from iqm.cirq_iqm import Adonis, IQMDevice, IQMDeviceMetadata, IQMMoveGate, transpiler
+from iqm.cirq_iqm.serialize import deserialize_circuit, serialize_circuit
+from iqm.cirq_iqm.transpiler import InsertMoves, transpile_insert_moves_into_circuit
+from iqm.iqm_client import (
+    CircuitTranspilationError,
+    DynamicQuantumArchitecture,
+    ExistingMoveHandlingOptions,
+    GateImplementationInfo,
+    GateInfo,
+    IQMClient,
+    transpile_insert_moves,
+)
+
+
+def _gate_info(*loci: tuple[str, ...]) -> GateInfo:
+    return GateInfo(
+        implementations={'impl': GateImplementationInfo(loci=loci)},
+        default_implementation='impl',
+        override_default_implementation={},
+    )
+
+
+@pytest.fixture
+def device_with_uncoupled_qubits():
+    """Fictional device whose qubits QB4 and QB5 are not coupled to the resonator, and QB4 has no prx."""
+    return IQMDevice(
+        IQMDeviceMetadata.from_architecture(
+            DynamicQuantumArchitecture(
+                calibration_set_id=UUID('26c5e70f-bea0-43af-bd37-6212ec7d04cb'),
+                qubits=['QB1', 'QB2', 'QB3', 'QB4', 'QB5'],
+                computational_resonators=['COMP_R'],
+                gates={
+                    'prx': _gate_info(('QB1',), ('QB2',), ('QB3',), ('QB5',)),
+                    'cz': _gate_info(('QB1', 'COMP_R'), ('QB2', 'COMP_R'), ('QB3', 'QB4'), ('QB4', 'QB5')),
+                    'move': _gate_info(('QB1', 'COMP_R'), ('QB2', 'COMP_R')),
+                    'measure': _gate_info(('QB1',), ('QB2',), ('QB3',), ('QB4',), ('QB5',)),
+                },
+            )
+        )
+    )
+
+
+def _reference(circuit: cirq.Circuit, device: IQMDevice, existing_moves: ExistingMoveHandlingOptions) -> cirq.Circuit:
+    """MOVE insertion using the IQM client implementation."""
+    architecture = device.metadata.architecture
+    assert architecture is not None
+    transpiled = transpile_insert_moves(serialize_circuit(circuit), architecture, existing_moves=existing_moves)
+    return deserialize_circuit(transpiled)
+
+
+def _random_circuit(rng: random.Random, device: IQMDevice, *, with_moves: bool) -> cirq.Circuit:
+    qubits = device.qubits
+    operations = []
+    for i in range(rng.randint(1, 25)):
+        r = rng.random()
+        if r < 0.3:
+            gate = cirq.PhasedXPowGate(exponent=rng.choice([0.5, 1.0]), phase_exponent=rng.choice([0.0, 0.25]))
+            operations.append(gate(rng.choice(qubits)))
+        elif r < 0.75:
+            operations.append(cirq.CZ(*rng.sample(qubits, 2)))
+        elif r < 0.85 and with_moves:
+            operations.append(IQMMoveGate()(rng.choice(qubits), rng.choice(device.resonators)))
+        else:
+            operations.append(cirq.measure(rng.choice(qubits), key=f'm{i}'))
+    return cirq.Circuit(operations)
+
+
+@pytest.mark.parametrize(
+    'device', ['device_with_resonator', 'device_with_multiple_resonators', 'device_with_uncoupled_qubits']
+)
+@pytest.mark.parametrize('existing_moves', list(ExistingMoveHandlingOptions))
+def test_insert_moves_matches_iqm_client(device, existing_moves, request):
+    device = request.getfixturevalue(device)
+    transformer = InsertMoves(device, existing_moves=existing_moves)
+    rng = random.Random(1234)
+    transpiled = 0
+    for _ in range(200):
+        circuit = _random_circuit(rng, device, with_moves=existing_moves != ExistingMoveHandlingOptions.KEEP)
+        try:
+            expected = _reference(circuit, device, existing_moves)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            with pytest.raises(type(e)) as exc_info:
+                transformer(circuit)
+            assert str(exc_info.value) == str(e)
+            continue
+        assert transformer(circuit) == expected
+        transpiled += 1
+    assert transpiled > 0
+
+
+def test_insert_moves_validates_operations_on_uncoupled_qubits(device_with_uncoupled_qubits):
+    qb4 = device_with_uncoupled_qubits.qubits[3]
+    circuit = cirq.Circuit(cirq.X(qb4))
+    with pytest.raises(CircuitTranspilationError, match="'QB4',\\) is not allowed as locus for 'prx'"):
+        _reference(circuit, device_with_uncoupled_qubits, ExistingMoveHandlingOptions.KEEP)
+    with pytest.raises(CircuitTranspilationError, match="'QB4',\\) is not allowed as locus for 'prx'"):
+        transpile_insert_moves_into_circuit(circuit, device_with_uncoupled_qubits)
+
+
+def test_insert_moves_keeps_valid_operations(device_with_multiple_resonators):
+    q = device_with_multiple_resonators.qubits
+    # QB1 and QB3 have a direct CZ, no MOVEs are needed
+    circuit = cirq.Circuit(cirq.CZ(q[0], q[2]), cirq.X(q[1]) ** 0.5, cirq.measure(q[1], key='m'))
+    transpiled = InsertMoves(device_with_multiple_resonators)(circuit)
+    assert transpiled == circuit
+    assert all(a is b for a, b in zip(transpiled.all_operations(), circuit.all_operations()))
+
+
+def test_insert_moves_with_qubit_mapping(device_with_resonator):
+    device_qubits = device_with_resonator.qubits[:3]
+    line_qubits = cirq.LineQubit.range(3)
+    circuit = cirq.Circuit(
+        cirq.CZ(device_qubits[0], device_qubits[1]),
+        cirq.CZ(device_qubits[1], device_qubits[2]),
+        cirq.measure(device_qubits[0], key='m'),
+    )
+    mapping = {str(lq): dq.name for lq, dq in zip(line_qubits, device_qubits)}
+    transpiled = transpile_insert_moves_into_circuit(
+        circuit.transform_qubits(dict(zip(device_qubits, line_qubits))), device_with_resonator, qubit_mapping=mapping
+    )
+    qubit_map = dict(zip(line_qubits, device_qubits))
+    assert transpiled.transform_qubits(lambda q: qubit_map.get(q, q)) == _reference(
+        circuit, device_with_resonator, ExistingMoveHandlingOptions.KEEP
+    )
+
+
+@pytest.mark.parametrize('existing_moves', list(ExistingMoveHandlingOptions))
+def test_insert_moves_falls_back_to_iqm_client(device_with_resonator, existing_moves, monkeypatch):
+    monkeypatch.setattr(transpiler, '_ResonatorStateTracker', None)
+    q = device_with_resonator.qubits
+    circuit = cirq.Circuit(cirq.CZ(q[0], q[1]), cirq.CZ(q[1], q[2]), cirq.measure(q[0], key='m'))
+    transformer = InsertMoves(device_with_resonator, existing_moves=existing_moves)
+    assert not transformer._native
+    assert transformer(circuit) == _reference(circuit, device_with_resonator, existing_moves)
+
+
+def test_native_transpilation_requires_private_iqm_client_api(device_with_resonator, monkeypatch):
+    # guards the private parts of the IQM client that the native implementation depends on
+    assert InsertMoves(device_with_resonator)._native
+    monkeypatch.delattr(IQMClient, '_validate_circuit_moves')
+    assert not InsertMoves(device_with_resonator)._native
+
+
+def test_insert_moves_requires_architecture():
+    with pytest.raises(ValueError, match='dynamic quantum architecture'):
+        InsertMoves(Adonis())
+
+
+def test_insert_moves_is_a_cirq_transformer(device_with_resonator):
+    q = device_with_resonator.qubits
+    circuit = cirq.Circuit(cirq.CZ(q[0], q[1]))
+    context = cirq.TransformerContext(logger=cirq.TransformerLogger())
+    assert InsertMoves(device_with_resonator)(circuit, context=context) == _reference(
+        circuit, device_with_resonator, ExistingMoveHandlingOptions.KEEP
+    )